@@ -0,0 +1,243 @@
+"""
+Admission control for expensive endpoints.
+
+Each limited route gets a `RouteLimit`: at most `max_concurrent` requests
+run at a time, up to `max_queue` more wait (for at most `max_wait` seconds)
+in arrival order, and one user holds at most `max_per_user` of the running
+and waiting places. Anything beyond that is answered at once with 503 and
+Retry-After, before a database session is opened, so a spike of heavy
+listings cannot take the threadpool and connections that cheap requests
+like POST /reviews need.
+
+Routes opt in with `dependencies=[Depends(admission.limit(...))]`; routes
+without a limit are never queued. The place is held until the response has
+been sent (`AdmissionMiddleware` frees it), so a streamed (NDJSON, export)
+body that keeps reading the database counts against the limit until its
+last line. Limits are per process.
+"""
+import asyncio
+import threading
+from collections import Counter, deque
+from typing import Callable, Deque, Dict, List, Optional
+from fastapi import HTTPException, Request
+from app.config import (
+    ADMISSION_MAX_CONCURRENT,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_MAX_WAIT_SECONDS,
+    ADMISSION_MAX_PER_USER,
+    ADMISSION_RETRY_AFTER_SECONDS
+)
+
+class Overloaded(Exception):
+    """The request was refused; `reason` is queue_full, timeout or user_limit"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+class _Waiter:
+    __slots__ = ("future", "granted")
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.granted = False  # A released place was handed to this waiter
+
+class RouteLimit:
+    """
+    Concurrency limit with a bounded FIFO wait queue for one route. A
+    finished request hands its place straight to the oldest waiter, so
+    waiters are never overtaken by new arrivals.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrent: int = ADMISSION_MAX_CONCURRENT,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        max_wait: float = ADMISSION_MAX_WAIT_SECONDS,
+        max_per_user: Optional[int] = ADMISSION_MAX_PER_USER
+    ):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.max_per_user = max_per_user
+        self.active = 0
+        self._waiters: Deque[_Waiter] = deque()
+        self._users: Counter = Counter()  # user id -> running and waiting requests
+        # Released from the event loop or a worker thread, whichever runs the handler
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.queued = 0  # Requests that had to wait before being admitted
+        self.rejected: Counter = Counter()  # reason -> requests
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, user_id: Optional[int] = None) -> None:
+        """Wait for a place, or raise Overloaded"""
+        with self._lock:
+            if user_id is not None and self.max_per_user and self._users[user_id] >= self.max_per_user:
+                self.rejected["user_limit"] += 1
+                raise Overloaded("user_limit")
+            if self.active < self.max_concurrent and not self._waiters:
+                self.active += 1
+                self.admitted += 1
+                self._add_user(user_id)
+                return
+            if len(self._waiters) >= self.max_queue:
+                self.rejected["queue_full"] += 1
+                raise Overloaded("queue_full")
+            waiter = _Waiter(asyncio.get_running_loop().create_future())
+            self._waiters.append(waiter)
+            self._add_user(user_id)
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.max_wait)
+        except asyncio.TimeoutError:
+            with self._lock:
+                # Unless a place was handed over just as the wait ran out
+                if not waiter.granted:
+                    self._waiters.remove(waiter)
+                    self._remove_user(user_id)
+                    self.rejected["timeout"] += 1
+                    raise Overloaded("timeout")
+        except asyncio.CancelledError:
+            # The client went away while waiting
+            with self._lock:
+                if waiter.granted:
+                    self._release_locked(user_id)
+                else:
+                    self._waiters.remove(waiter)
+                    self._remove_user(user_id)
+            raise
+        with self._lock:
+            self.queued += 1
+
+    def release(self, user_id: Optional[int] = None) -> None:
+        with self._lock:
+            self._release_locked(user_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "active": self.active,
+                "waiting": len(self._waiters),
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "rejected": dict(self.rejected),
+            }
+
+    def _release_locked(self, user_id: Optional[int]) -> None:
+        self._remove_user(user_id)
+        if self._waiters:
+            # The place passes to the oldest waiter; `active` stays the same
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+            self.admitted += 1
+            loop = waiter.future.get_loop()
+            loop.call_soon_threadsafe(_wake, waiter.future)
+        else:
+            self.active -= 1
+
+    def _add_user(self, user_id: Optional[int]) -> None:
+        if user_id is not None:
+            self._users[user_id] += 1
+
+    def _remove_user(self, user_id: Optional[int]) -> None:
+        if user_id is not None:
+            self._users[user_id] -= 1
+            if not self._users[user_id]:
+                del self._users[user_id]
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+class _Place:
+    """A place held by one request; released once, whichever path gets there first"""
+    __slots__ = ("route_limit", "user_id", "released")
+
+    def __init__(self, route_limit: RouteLimit, user_id: Optional[int]):
+        self.route_limit = route_limit
+        self.user_id = user_id
+        self.released = False
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self.route_limit.release(self.user_id)
+
+# ASGI scope key of the places a request holds
+PLACES_SCOPE_KEY = "admission.places"
+
+def _request_user(request: Request) -> Optional[int]:
+    """The user the request is for, from the path or the query string (user_id or owner_id)"""
+    user_id = (
+        request.path_params.get("user_id") or
+        request.query_params.get("user_id") or
+        request.query_params.get("owner_id")
+    )
+    try:
+        return int(user_id) if user_id is not None else None
+    except ValueError:
+        return None
+
+class AdmissionControl:
+    """The process's route limits by name, for the routers and /metrics"""
+
+    def __init__(self, retry_after: int = ADMISSION_RETRY_AFTER_SECONDS):
+        self.retry_after = retry_after
+        self.limits: Dict[str, RouteLimit] = {}
+
+    def limit(self, name: str, **options) -> Callable:
+        """
+        A route dependency holding a place in the `name` limit until the
+        response has been sent. Options override the RouteLimit defaults.
+        """
+        route_limit = self.limits[name] = RouteLimit(name, **options)
+
+        async def admit(request: Request):
+            user_id = _request_user(request)
+            try:
+                await route_limit.acquire(user_id)
+            except Overloaded as exc:
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"Server busy ({exc.reason}); retry later",
+                    headers={"Retry-After": str(self.retry_after)}
+                )
+            place = _Place(route_limit, user_id)
+            places: List[_Place] = request.scope.setdefault(PLACES_SCOPE_KEY, [])
+            places.append(place)
+            try:
+                yield
+            except BaseException:
+                place.release()
+                raise
+            # Dependencies exit before the body is sent; AdmissionMiddleware
+            # releases the place after it
+
+        return admit
+
+    def stats(self) -> Dict[str, dict]:
+        return {name: route_limit.stats() for name, route_limit in self.limits.items()}
+
+admission = AdmissionControl()
+
+class AdmissionMiddleware:
+    """ASGI middleware releasing the request's admission places once the response has been sent"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            for place in scope.get(PLACES_SCOPE_KEY, ()):
+                place.release()
@@ -0,0 +1,96 @@
+"""
+Maintenance commands. Run from backend/:
+
+    python -m app.cli rebuild-stats
+    python -m app.cli rescore --workers 4
+    python -m app.cli rebuild-search
+    python -m app.cli dedupe --deck-id 3
+    python -m app.cli upgrade-schema
+"""
+import argparse
+import os
+import time
+from sqlalchemy import select
+from app.config import DATABASE_URL, RESCORE_CHUNK_SIZE
+from app.database import SessionLocal
+from app.models import Deck
+from app.services.dedupe import DedupeResult, dedupe_deck
+from app.services.deck_stats import rebuild_deck_stats
+from app.services.schema import upgrade_schema
+from app.services.search import ensure_search_index, rebuild_search_index
+
+def rebuild_stats(args: argparse.Namespace) -> None:
+    """Recompute user_deck_stats from user_card_progress"""
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        rows = rebuild_deck_stats(db)
+        db.commit()
+    print(f"Rebuilt {rows} user_deck_stats rows in {time.perf_counter() - started:.2f}s")
+
+def rescore(args: argparse.Namespace) -> None:
+    """Recompute confidences from review history with the configured weights"""
+    from app.services.rescoring import rescore_all
+    
+    result = rescore_all(DATABASE_URL, workers=args.workers, chunk_size=args.chunk_size)
+    print(
+        f"Rescored {result.updated} cards from {result.events} review events in "
+        f"{result.elapsed:.2f}s ({result.skipped} skipped: history incomplete)"
+    )
+    # Scores moved, and the learn/recap thresholds may have too
+    rebuild_stats(args)
+
+def rebuild_search(args: argparse.Namespace) -> None:
+    """Create the card full-text index if missing and re-index every card"""
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        rebuild_search_index(db)
+        db.commit()
+    print(f"Rebuilt the card search index in {time.perf_counter() - started:.2f}s")
+
+def dedupe(args: argparse.Namespace) -> None:
+    """Merge duplicate cards within each deck, keeping their progress and history"""
+    started = time.perf_counter()
+    total = DedupeResult()
+    with SessionLocal() as db:
+        deck_ids = [args.deck_id] if args.deck_id else db.scalars(select(Deck.id).order_by(Deck.id)).all()
+        for deck_id in deck_ids:
+            # One transaction per deck
+            total += dedupe_deck(db, deck_id)
+            db.commit()
+    print(
+        f"Removed {total.removed} duplicate cards ({total.merged_progress} progress rows merged, "
+        f"{total.moved_progress} moved, {total.hashed} hashes filled in) in {time.perf_counter() - started:.2f}s"
+    )
+    if total.removed:
+        rebuild_stats(args)
+
+def upgrade(args: argparse.Namespace) -> None:
+    """Add the columns, indexes and search index an older database lacks"""
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        changes = upgrade_schema(db)
+        if ensure_search_index(db):
+            changes.append("built the card search index")
+        db.commit()
+    for change in changes:
+        print(change.capitalize())
+    print(f"Upgraded the schema ({len(changes)} changes) in {time.perf_counter() - started:.2f}s")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Adaptive Flashcards maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild-stats", help=rebuild_stats.__doc__).set_defaults(run=rebuild_stats)
+    rescore_parser = commands.add_parser("rescore", help=rescore.__doc__)
+    rescore_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    rescore_parser.add_argument("--chunk-size", type=int, default=RESCORE_CHUNK_SIZE)
+    rescore_parser.set_defaults(run=rescore)
+    commands.add_parser("rebuild-search", help=rebuild_search.__doc__).set_defaults(run=rebuild_search)
+    dedupe_parser = commands.add_parser("dedupe", help=dedupe.__doc__)
+    dedupe_parser.add_argument("--deck-id", type=int, help="Only this deck (default: every deck)")
+    dedupe_parser.set_defaults(run=dedupe)
+    commands.add_parser("upgrade-schema", help=upgrade.__doc__).set_defaults(run=upgrade)
+    args = parser.parse_args()
+    args.run(args)
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+import os
+
 # Learning thresholds
 CONFIDENCE_THRESHOLD_LEARN = 0.7  # Below this = still learning
 CONFIDENCE_THRESHOLD_RECAP = 0.7  # At or above this = ready for recap
@@ -5,3 +7,108 @@ CONFIDENCE_THRESHOLD_RECAP = 0.7  # At or above this = ready for recap
 # Review scoring weights
 REVIEW_WEIGHT_HISTORY = 0.7  # Weight given to existing score
 REVIEW_WEIGHT_NEW = 0.3      # Weight given to new review
+REVIEW_BATCH_MAX_SIZE = 1000  # Max reviews accepted by POST /reviews/batch
+
+# Scheduling: the review interval grows exponentially with confidence, from
+# the minimum (confidence 0) to the maximum (confidence 1), and stretches a
+# little with every repeated review
+SCHEDULE_MIN_INTERVAL_HOURS = 24   # Low confidence: daily
+SCHEDULE_MAX_INTERVAL_DAYS = 30    # High confidence: monthly
+SCHEDULE_REVIEW_COUNT_BONUS = 0.1  # Extra interval per review after the first
+QUEUE_MAX_SIZE = 200               # Max `n` for GET /users/{id}/queue
+
+# Progress cache: per-(user, deck) snapshots of card ids and confidences
+PROGRESS_CACHE_MAX_BYTES = int(os.getenv("PROGRESS_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+PROGRESS_CACHE_TTL_SECONDS = float(os.getenv("PROGRESS_CACHE_TTL_SECONDS", "60"))
+PROGRESS_CACHE_MAX_SNAPSHOT_CARDS = int(os.getenv("PROGRESS_CACHE_MAX_SNAPSHOT_CARDS", "100000"))  # Larger scopes are filtered in SQL
+
+# Pagination
+MAX_PAGE_SIZE = 1000  # Upper bound for the `limit` query parameter
+
+# Bulk import
+IMPORT_CHUNK_SIZE = 1000        # Rows per INSERT executemany
+IMPORT_MAX_REPORTED_ERRORS = 100  # Rejected rows listed in the response
+
+# Deck export
+EXPORT_GZIP_LEVEL = 6
+
+# Streaming (format=ndjson): rows fetched per server-side cursor batch
+STREAM_BATCH_SIZE = 500
+
+# Database
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./flashcards.db")
+# Defaults to DATABASE_URL with its async driver (aiosqlite / asyncpg)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+# Read replica for GET endpoints; unset = read from the primary. The async
+# URL defaults to READ_REPLICA_URL with its async driver.
+READ_REPLICA_URL = os.getenv("READ_REPLICA_URL")
+ASYNC_READ_REPLICA_URL = os.getenv("ASYNC_READ_REPLICA_URL")
+# After a user's review, that user's reads go to the primary for this long
+# so they see their own write however far the replica lags
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+# Connection pool (server databases such as PostgreSQL; ignored for SQLite)
+DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "5"))
+DATABASE_MAX_OVERFLOW = int(os.getenv("DATABASE_MAX_OVERFLOW", "10"))
+DATABASE_POOL_TIMEOUT = float(os.getenv("DATABASE_POOL_TIMEOUT", "30"))  # Seconds
+DATABASE_POOL_RECYCLE = int(os.getenv("DATABASE_POOL_RECYCLE", "1800"))  # Seconds
+
+# SQLite connection profile: "performance" applies the pragmas below on every
+# connection (WAL lets readers run alongside a writer), "default" leaves
+# SQLite's rollback journal and synchronous=FULL in place
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "performance")
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # Bytes
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# Serve every router through AsyncSession (aiosqlite/asyncpg) instead of the
+# blocking Session running in uvicorn's threadpool
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "false").lower() in ("1", "true", "yes")
+
+# Metrics
+# Add X-Query-Count / X-DB-Time-Ms headers to every response
+METRICS_RESPONSE_HEADERS = os.getenv("METRICS_RESPONSE_HEADERS", "false").lower() in ("1", "true", "yes")
+N_PLUS_ONE_THRESHOLD = 10  # Same statement this many times in one request is flagged
+
+# Write-behind review writer (POST /reviews/events): queued reviews are
+# committed in batches of up to FLUSH_SIZE, at least every FLUSH_INTERVAL
+REVIEW_WRITER_FLUSH_SIZE = int(os.getenv("REVIEW_WRITER_FLUSH_SIZE", "500"))
+REVIEW_WRITER_FLUSH_INTERVAL_SECONDS = float(os.getenv("REVIEW_WRITER_FLUSH_INTERVAL_SECONDS", "0.05"))
+REVIEW_WRITER_QUEUE_SIZE = int(os.getenv("REVIEW_WRITER_QUEUE_SIZE", "10000"))  # Full queue answers 503
+REVIEW_WRITER_RETRY_MAX_SECONDS = float(os.getenv("REVIEW_WRITER_RETRY_MAX_SECONDS", "5"))  # Backoff cap for failed batches
+
+# Deck statistics: confidence histogram resolution; the learn/recap
+# thresholds are always bucket edges so mode counts are exact
+STATS_HISTOGRAM_BUCKETS = 10
+
+# Bulk rescoring (python -m app.cli rescore): review events per chunk
+RESCORE_CHUNK_SIZE = int(os.getenv("RESCORE_CHUNK_SIZE", "100000"))
+
+# Full-text card search
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_QUERY_LENGTH = 200
+
+# Server-side study sessions (POST /users/{id}/sessions): reviews stay in
+# memory until the session ends or sits idle for the TTL, then are written
+# in one batch. At the cap, new sessions are refused with 503. A full session
+# holds about 60 KB, so the cap also bounds the memory of all sessions.
+STUDY_SESSION_MAX_ACTIVE = int(os.getenv("STUDY_SESSION_MAX_ACTIVE", "1000"))
+STUDY_SESSION_TTL_SECONDS = float(os.getenv("STUDY_SESSION_TTL_SECONDS", "1800"))
+STUDY_SESSION_SWEEP_SECONDS = float(os.getenv("STUDY_SESSION_SWEEP_SECONDS", "60"))  # How often idle sessions are written
+STUDY_SESSION_MAX_CARDS = 500     # Cards queued per session
+STUDY_SESSION_MAX_REVIEWS = 2000  # Reviews held per session before it must end
+
+# Delta sync (GET /users/{id}/sync): each token reaches this far back before
+# the previous sync started, so rows written by transactions that were still
+# open at the time are sent (again) instead of skipped
+SYNC_OVERLAP_SECONDS = float(os.getenv("SYNC_OVERLAP_SECONDS", "5"))
+
+# Admission control for expensive endpoints (app/admission.py): per route,
+# at most MAX_CONCURRENT requests run and MAX_QUEUE more wait up to
+# MAX_WAIT_SECONDS; one user holds at most MAX_PER_USER of those places.
+# Beyond that requests get 503 with Retry-After instead of a slow answer.
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "4"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "16"))
+ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "2"))
+ADMISSION_MAX_PER_USER = int(os.getenv("ADMISSION_MAX_PER_USER", "2"))  # 0: no per-user cap
+ADMISSION_RETRY_AFTER_SECONDS = 1
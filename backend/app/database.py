@@ -1,19 +1,226 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import threading
+import time
+from typing import Callable, Dict, Optional, TypeVar
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.util import await_only
+from sqlalchemy.util.concurrency import in_greenlet
+from app.metrics import instrument_engine
+from app.config import (
+    DATABASE_URL,
+    ASYNC_DATABASE_URL,
+    READ_REPLICA_URL,
+    ASYNC_READ_REPLICA_URL,
+    READ_YOUR_WRITES_SECONDS,
+    DATABASE_POOL_SIZE,
+    DATABASE_MAX_OVERFLOW,
+    DATABASE_POOL_TIMEOUT,
+    DATABASE_POOL_RECYCLE,
+    SQLITE_PROFILE,
+    SQLITE_CACHE_SIZE_KB,
+    SQLITE_MMAP_SIZE,
+    SQLITE_BUSY_TIMEOUT_MS
+)
 
-DATABASE_URL = "sqlite:///./flashcards.db"
+SQLITE_PERFORMANCE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",  # Safe with WAL; fsync only at checkpoints
+    "cache_size": -SQLITE_CACHE_SIZE_KB,  # Negative value = size in KiB
+    "mmap_size": SQLITE_MMAP_SIZE,
+    "temp_store": "MEMORY",
+    "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+}
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+# INSERT constructs with ON CONFLICT support, for upserts
+UPSERT_DIALECTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+class DatabaseConfigError(RuntimeError):
+    """The configured database URLs cannot be used"""
+
+def to_async_url(url: str) -> str:
+    """Swap the driver of a sync database URL for its async counterpart"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise DatabaseConfigError(
+            f"No async driver known for '{backend}' databases; set ASYNC_DATABASE_URL "
+            "(and ASYNC_READ_REPLICA_URL) explicitly"
+        )
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+def engine_options(url: str) -> dict:
+    """Pool settings for server databases; SQLite keeps SQLAlchemy's defaults"""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": DATABASE_POOL_SIZE,
+        "max_overflow": DATABASE_MAX_OVERFLOW,
+        "pool_timeout": DATABASE_POOL_TIMEOUT,
+        "pool_recycle": DATABASE_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+def apply_sqlite_profile(engine: Engine, profile: str = SQLITE_PROFILE) -> None:
+    """Run the profile's pragmas on every new SQLite connection"""
+    if engine.dialect.name != "sqlite" or profile != "performance":
+        return
+    
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PERFORMANCE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def create_db_engine(url: str = DATABASE_URL, profile: str = SQLITE_PROFILE) -> Engine:
+    """Create a sync engine with the configured pool and SQLite profile"""
+    is_sqlite = make_url(url).get_backend_name() == "sqlite"
+    connect_args = {"check_same_thread": False} if is_sqlite else {}
+    db_engine = create_engine(url, connect_args=connect_args, **engine_options(url))
+    apply_sqlite_profile(db_engine, profile)
+    instrument_engine(db_engine)
+    return db_engine
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Read replica for GET endpoints; the primary when none is configured
+read_engine = create_db_engine(READ_REPLICA_URL) if READ_REPLICA_URL else engine
+# Replica sessions are marked, so caches are only filled from the primary (see reads_replica)
+ReadSessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=read_engine, info={"replica": bool(READ_REPLICA_URL)}
+)
+
+# Async mode (config.DATABASE_ASYNC): engines are created on first use, so
+# the async drivers are only required when async mode is on
+_async_session_factories: Dict[bool, async_sessionmaker] = {}
+_async_lock = threading.Lock()
+
+def _create_async_session_factory(url: str, replica: bool = False) -> async_sessionmaker:
+    async_engine = create_async_engine(url, **engine_options(url))
+    apply_sqlite_profile(async_engine.sync_engine)
+    instrument_engine(async_engine.sync_engine)
+    # Objects stay loaded after commit so responses can be serialized outside the session
+    return async_sessionmaker(
+        async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False,
+        info={"replica": replica}
+    )
+
+def async_session_factory(read: bool = False) -> async_sessionmaker:
+    """The async primary's session factory, or the async replica's with `read`"""
+    factory = _async_session_factories.get(read)
+    if factory is not None:
+        return factory
+    with _async_lock:
+        if False not in _async_session_factories:
+            url = ASYNC_DATABASE_URL or to_async_url(DATABASE_URL)
+            _async_session_factories[False] = _create_async_session_factory(url)
+        if read and True not in _async_session_factories:
+            if READ_REPLICA_URL:
+                url = ASYNC_READ_REPLICA_URL or to_async_url(READ_REPLICA_URL)
+                _async_session_factories[True] = _create_async_session_factory(url, replica=True)
+            else:
+                _async_session_factories[True] = _async_session_factories[False]
+        return _async_session_factories[read]
+
 Base = declarative_base()
 
+class ReadRouting:
+    """
+    Chooses the session factory for read-only requests: the replica, unless
+    the request's user wrote within the last `window` seconds (read your
+    writes). Users are identified by the `user_id` path or query parameter.
+    """
+
+    def __init__(self, window: float = READ_YOUR_WRITES_SECONDS):
+        self.window = window
+        self._pinned: Dict[int, float] = {}  # user_id -> monotonic deadline
+        self._lock = threading.Lock()
+        self.reads = 0
+        self.pinned_reads = 0
+
+    def pin(self, user_id: int) -> None:
+        """Send the user's reads to the primary for the next `window` seconds"""
+        now = time.monotonic()
+        with self._lock:
+            self._pinned[user_id] = now + self.window
+            if len(self._pinned) > 1024:
+                # Drop expired pins so the map only holds recent writers
+                self._pinned = {user: deadline for user, deadline in self._pinned.items() if deadline > now}
+
+    def is_pinned(self, user_id: Optional[int]) -> bool:
+        if user_id is None:
+            return False
+        with self._lock:
+            deadline = self._pinned.get(user_id)
+        return deadline is not None and deadline > time.monotonic()
+
+    def use_primary(self, request: Request) -> bool:
+        user_id = request.path_params.get("user_id") or request.query_params.get("user_id")
+        try:
+            pinned = self.is_pinned(int(user_id)) if user_id is not None else False
+        except ValueError:
+            pinned = False
+        self.reads += 1
+        if pinned:
+            self.pinned_reads += 1
+        return pinned
+
+    def stats(self) -> dict:
+        return {"reads": self.reads, "pinned_reads": self.pinned_reads}
+
+read_routing = ReadRouting()
+
+def reads_replica(db: Session) -> bool:
+    """Whether the session reads a replica, which may lag the primary"""
+    return db.info.get("replica", False)
+
+T = TypeVar("T")
+
+def run_blocking(fn: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Call blocking work (sync engine sessions, file reads, parsing) from code
+    a handler runs. In async mode handlers run on the event loop inside
+    AsyncSession.run_sync (see routers/async_routes.py), so the call is
+    moved to a worker thread and awaited there; elsewhere it runs in place.
+    """
+    if in_greenlet():
+        return await_only(run_in_threadpool(fn, *args, **kwargs))
+    return fn(*args, **kwargs)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
-        
\ No newline at end of file
+
+def get_read_db(request: Request):
+    """Session for GET endpoints: the read replica, or the primary for a user who just wrote"""
+    db = SessionLocal() if read_routing.use_primary(request) else ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with async_session_factory()() as db:
+        yield db
+
+async def get_async_read_db(request: Request):
+    factory = async_session_factory(read=not read_routing.use_primary(request))
+    async with factory() as db:
+        yield db
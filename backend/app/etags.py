@@ -0,0 +1,29 @@
+from hashlib import blake2b
+from typing import Optional
+from fastapi import Request, Response
+
+ETAG_HEADER = "ETag"
+
+def make_etag(*parts) -> str:
+    """
+    A strong entity tag built from version components, hashed so the header
+    stays short however many components (e.g. one per row of a page) go in
+    """
+    digest = blake2b("-".join(str(part) for part in parts).encode(), digest_size=16)
+    return '"' + digest.hexdigest() + '"'
+
+def is_not_modified(request: Optional[Request], etag: str) -> bool:
+    """Whether the request's If-None-Match already names this entity tag"""
+    if request is None:
+        return False
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={ETAG_HEADER: etag})
@@ -1,25 +1,129 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
-from app.routers import users, decks, cards, progress
+from app.config import DATABASE_ASYNC
+from app.database import engine, Base, SessionLocal, async_session_factory, read_routing
+from app.routers import users, decks, cards, progress, search, sessions, subscriptions
+from app.routers.async_routes import async_router
+from app.services.progress_cache import progress_cache
+from app.services.review_writer import review_writer
+from app.services.schema import upgrade_schema
+from app.services.search import ensure_search_index
+from app.services.study_sessions import study_sessions
+from app.metrics import MetricsMiddleware, metrics
+from app.admission import AdmissionMiddleware, admission
 
 Base.metadata.create_all(bind=engine)
+# create_all leaves existing tables alone, so older databases get their new
+# columns, indexes and the search index here
+with SessionLocal() as db:
+    upgraded = upgrade_schema(db)
+    if ensure_search_index(db) or upgraded:
+        db.commit()
 
-app = FastAPI(title="Adaptive Flashcards API")
+def _progress_cache_metrics():
+    stats = progress_cache.stats()
+    return [
+        ("flashcards_progress_cache_hits_total", "counter", "Progress cache hits", stats["hits"]),
+        ("flashcards_progress_cache_misses_total", "counter", "Progress cache misses", stats["misses"]),
+        ("flashcards_progress_cache_evictions_total", "counter", "Progress cache LRU evictions", stats["evictions"]),
+        ("flashcards_progress_cache_bytes", "gauge", "Bytes held by progress cache snapshots", stats["bytes"]),
+    ]
 
-app.add_middleware(
-       CORSMiddleware,
-       allow_origins=["http://localhost:5173"],  # Vite dev server
-       allow_credentials=True,
-       allow_methods=["*"],
-       allow_headers=["*"],
-   )
+def _review_writer_metrics():
+    stats = review_writer.stats()
+    return [
+        ("flashcards_review_writer_queued", "gauge", "Committed reviews waiting for the write-behind writer", stats["queued"]),
+        ("flashcards_review_writer_written_total", "counter", "Queued reviews folded into progress", stats["written"]),
+        ("flashcards_review_writer_rejected_total", "counter", "Queued reviews whose user or card was deleted before folding", stats["rejected"]),
+        ("flashcards_review_writer_failed_total", "counter", "Writer batches that failed and were retried", stats["failed"]),
+    ]
 
-app.include_router(users.router)
-app.include_router(decks.router)
-app.include_router(cards.router)
-app.include_router(progress.router)
+def _study_session_metrics():
+    stats = study_sessions.stats()
+    return [
+        ("flashcards_study_sessions_active", "gauge", "Open study sessions", stats["active"]),
+        ("flashcards_study_sessions_bytes", "gauge", "Bytes held by study session queues", stats["bytes"]),
+        ("flashcards_study_sessions_expired_total", "counter", "Study sessions ended by the idle TTL", stats["expired"]),
+        ("flashcards_study_sessions_refused_total", "counter", "Study sessions refused at the cap", stats["refused"]),
+    ]
 
-@app.get("/")
-def root():
-    return {"message": "Adaptive Flashcards API"}
+def _read_routing_metrics():
+    stats = read_routing.stats()
+    return [
+        ("flashcards_read_sessions_total", "counter", "Sessions opened for GET endpoints", stats["reads"]),
+        ("flashcards_read_sessions_pinned_total", "counter", "GET sessions sent to the primary to read a recent write", stats["pinned_reads"]),
+    ]
+
+def _admission_metrics():
+    stats = admission.stats()
+    samples = []
+    # Grouped by metric so each one's samples follow its HELP line
+    for metric, kind, help_text, key in (
+        ("flashcards_admission_active", "gauge", "Requests running under a route limit", "active"),
+        ("flashcards_admission_waiting", "gauge", "Requests waiting for a place (queue depth)", "waiting"),
+        ("flashcards_admission_queued_total", "counter", "Requests admitted after waiting", "queued"),
+    ):
+        for route, route_stats in sorted(stats.items()):
+            samples.append((f'{metric}{{route="{route}"}}', kind, help_text, route_stats[key]))
+    for route, route_stats in sorted(stats.items()):
+        for reason in ("queue_full", "timeout", "user_limit"):
+            samples.append((
+                f'flashcards_admission_rejected_total{{route="{route}",reason="{reason}"}}', "counter",
+                "Requests refused with 503 by a route limit", route_stats["rejected"].get(reason, 0)
+            ))
+    return samples
+
+metrics.collectors["progress_cache"] = _progress_cache_metrics
+metrics.collectors["review_writer"] = _review_writer_metrics
+metrics.collectors["study_sessions"] = _study_session_metrics
+metrics.collectors["read_routing"] = _read_routing_metrics
+metrics.collectors["admission"] = _admission_metrics
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Commit every acknowledged review before the process exits
+    await run_in_threadpool(study_sessions.close)
+    await run_in_threadpool(review_writer.stop)
+
+def create_app(async_db: bool = DATABASE_ASYNC) -> FastAPI:
+    if async_db:
+        # Fail at startup on a missing driver or an unsupported URL, not on the first request
+        async_session_factory(read=True)
+    app = FastAPI(title="Adaptive Flashcards API", lifespan=lifespan)
+    
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:5173"],  # Vite dev server
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.add_middleware(MetricsMiddleware)
+    app.add_middleware(AdmissionMiddleware)
+    
+    for module in (users, decks, cards, progress, search, sessions, subscriptions):
+        app.include_router(async_router(module.router) if async_db else module.router)
+    
+    @app.get("/")
+    def root():
+        return {"message": "Adaptive Flashcards API"}
+    
+    @app.get("/cache/stats")
+    def cache_stats():
+        """Hit, miss and eviction counters of the in-process progress cache"""
+        return progress_cache.stats()
+    
+    @app.get("/metrics", response_class=PlainTextResponse)
+    def prometheus_metrics():
+        """Request latency, SQL and cache metrics in Prometheus text format"""
+        return PlainTextResponse(
+            metrics.render(), media_type="text/plain; version=0.0.4"
+        )
+    
+    return app
+
+app = create_app()
@@ -0,0 +1,200 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.config import METRICS_RESPONSE_HEADERS, N_PLUS_ONE_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # Seconds
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+QUERY_COUNT_HEADER = "X-Query-Count"
+DB_TIME_HEADER = "X-DB-Time-Ms"
+
+@dataclass
+class RequestStats:
+    """SQL activity of the request currently being handled"""
+    query_count: int = 0
+    db_time: float = 0.0  # Seconds
+    statements: Counter = field(default_factory=Counter)
+
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class MetricsRegistry:
+    """Process-wide request and SQL metrics, rendered in Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.queries: Dict[Tuple[str, str], Histogram] = {}
+        self.requests: Counter = Counter()  # (method, route, status)
+        self.db_time: Counter = Counter()  # (method, route) -> seconds
+        self.n_plus_one: Counter = Counter()  # (method, route)
+        # Extra gauges/counters: name -> callable returning (metric, type, help, value) tuples;
+        # the metric may carry labels, e.g. 'name{route="x"}'
+        self.collectors: Dict[str, Callable[[], List[Tuple[str, str, str, float]]]] = {}
+
+    def observe_request(self, method: str, route: str, status: int, duration: float, stats: RequestStats) -> None:
+        key = (method, route)
+        with self._lock:
+            self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(duration)
+            self.queries.setdefault(key, Histogram(QUERY_COUNT_BUCKETS)).observe(stats.query_count)
+            self.requests[(method, route, status)] += 1
+            self.db_time[key] += stats.db_time
+            if stats.statements and max(stats.statements.values()) >= N_PLUS_ONE_THRESHOLD:
+                self.n_plus_one[key] += 1
+                statement, repeats = stats.statements.most_common(1)[0]
+                logger.warning(
+                    "Possible N+1 query pattern on %s %s: %d executions of %.200s",
+                    method, route, repeats, statement
+                )
+
+    def reset(self) -> None:
+        with self._lock:
+            self.latency.clear()
+            self.queries.clear()
+            self.requests.clear()
+            self.db_time.clear()
+            self.n_plus_one.clear()
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            self._render_histograms(
+                lines, "flashcards_http_request_duration_seconds",
+                "Request latency by route", self.latency
+            )
+            self._render_histograms(
+                lines, "flashcards_db_queries_per_request",
+                "SQL statements executed per request", self.queries
+            )
+            lines += [
+                "# HELP flashcards_http_requests_total Requests by route and status",
+                "# TYPE flashcards_http_requests_total counter",
+            ]
+            for (method, route, status), value in sorted(self.requests.items()):
+                lines.append(
+                    f'flashcards_http_requests_total{{method="{method}",route="{route}",status="{status}"}} {value}'
+                )
+            lines += [
+                "# HELP flashcards_db_time_seconds_total Time spent executing SQL by route",
+                "# TYPE flashcards_db_time_seconds_total counter",
+            ]
+            for (method, route), value in sorted(self.db_time.items()):
+                lines.append(f'flashcards_db_time_seconds_total{{method="{method}",route="{route}"}} {value:.6f}')
+            lines += [
+                "# HELP flashcards_n_plus_one_requests_total Requests repeating one statement "
+                f"at least {N_PLUS_ONE_THRESHOLD} times",
+                "# TYPE flashcards_n_plus_one_requests_total counter",
+            ]
+            for (method, route), value in sorted(self.n_plus_one.items()):
+                lines.append(f'flashcards_n_plus_one_requests_total{{method="{method}",route="{route}"}} {value}')
+            collectors = list(self.collectors.values())
+
+        described = set()
+        for collect in collectors:
+            for name, kind, help_text, value in collect():
+                # Labelled samples of one metric share its HELP and TYPE lines
+                family = name.split("{", 1)[0]
+                if family not in described:
+                    described.add(family)
+                    lines += [f"# HELP {family} {help_text}", f"# TYPE {family} {kind}"]
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histograms(lines, name, help_text, histograms):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for (method, route), histogram in sorted(histograms.items()):
+            labels = f'method="{method}",route="{route}"'
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"{name}_sum{{{labels}}} {histogram.sum:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+metrics = MetricsRegistry()
+
+def instrument_engine(engine: Engine) -> None:
+    """Count statements and time spent in SQL for the request being handled"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        stats = _current_request.get()
+        if stats is not None:
+            stats.query_count += 1
+            stats.db_time += elapsed
+            stats.statements[statement] += 1
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency, SQL statement counts and DB
+    time. With METRICS_RESPONSE_HEADERS enabled it also reports the request's
+    query count and DB time (up to the start of the response) in headers.
+    """
+
+    def __init__(self, app, response_headers: Optional[bool] = None):
+        self.app = app
+        self.response_headers = response_headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_metrics(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                enabled = self.response_headers
+                if enabled is None:
+                    enabled = METRICS_RESPONSE_HEADERS
+                if enabled:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (QUERY_COUNT_HEADER.lower().encode(), str(stats.query_count).encode()),
+                        (DB_TIME_HEADER.lower().encode(), f"{stats.db_time * 1000:.3f}".encode()),
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            _current_request.reset(token)
+            route = scope.get("route")
+            metrics.observe_request(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                status,
+                time.perf_counter() - started,
+                stats
+            )
@@ -2,3 +2,10 @@ from .user import User
 from .deck import Deck
 from .card import Card
 from .user_card_progress import UserCardProgress
+from .review_event import ReviewEvent
+from .pending_review import PendingReview
+from .user_deck_stats import UserDeckStats
+from .deck_subscription import DeckSubscription
+from .card_override import CardOverride
+from .deletion import Deletion
+from . import card_search  # Registers the full-text index DDL on the cards table
@@ -1,8 +1,19 @@
-from sqlalchemy import Column, Integer, Text, ForeignKey, DateTime
+import hashlib
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from app.database import Base
 
+def content_hash(question: str, answer: str) -> str:
+    """Hash of a card's text, ignoring case and whitespace differences"""
+    normalized = "\x1f".join(" ".join(text.split()).casefold() for text in (question, answer))
+    return hashlib.blake2b(normalized.encode(), digest_size=16).hexdigest()
+
+def _default_content_hash(context) -> str:
+    # Runs for ORM adds and Core (executemany) inserts alike
+    params = context.get_current_parameters()
+    return content_hash(params["question"], params["answer"])
+
 class Card(Base):
     __tablename__ = "cards"
     
@@ -11,6 +22,23 @@ class Card(Base):
     question = Column(Text, nullable=False)
     answer = Column(Text, nullable=False)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    content_hash = Column(String(32), nullable=True, default=_default_content_hash)
+    # Set on every write: GET /users/{id}/sync returns rows changed since a token
+    updated_at = Column(
+        DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc)
+    )
     
     # Relationship
     deck = relationship("Deck", backref="cards")
+    
+    __table_args__ = (
+        # One copy of each question/answer pair per deck; also the duplicate lookup
+        UniqueConstraint("deck_id", "content_hash", name="uq_cards_deck_content_hash"),
+        # Keyset pages of a deck's cards (WHERE deck_id = ? AND id > ? ORDER BY id),
+        # and the per-deck scans of the progress snapshot and export
+        Index("ix_cards_deck_id_id", "deck_id", "id"),
+        # Delta sync: range scan of each of the user's decks' cards changed since a token
+        Index("ix_cards_deck_id_updated_at", "deck_id", "updated_at"),
+    )
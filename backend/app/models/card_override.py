@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, Text, ForeignKey, DateTime, Index
+from datetime import datetime, timezone
+from app.database import Base
+
+class CardOverride(Base):
+    """
+    A user's personal edit of a card (copy-on-write): only the fields the
+    user changed are stored, the rest still come from the shared card
+    """
+    __tablename__ = "card_overrides"
+    
+    # Primary key (user_id, card_id): the outer join from a user's cards is a point lookup
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    card_id = Column(Integer, ForeignKey("cards.id"), primary_key=True)
+    question = Column(Text, nullable=True)  # None: the card's own question
+    answer = Column(Text, nullable=True)
+    updated_at = Column(
+        DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc)
+    )
+    
+    __table_args__ = (
+        # Delta sync: range scan of a user's overrides changed since a token
+        Index("ix_card_overrides_user_updated", "user_id", "updated_at"),
+    )
@@ -0,0 +1,57 @@
+"""
+Full-text index over card questions and answers, created alongside the
+cards table (see services/search.py for the queries).
+
+SQLite: an external-content FTS5 table that stores only the index, kept in
+sync with cards by triggers. PostgreSQL: a generated tsvector column with
+a GIN index. Databases created before the index existed get it when the
+app starts (see services/search.py, ensure_search_index), or with
+`python -m app.cli rebuild-search`.
+"""
+from sqlalchemy import DDL, event
+from app.models.card import Card
+
+SQLITE_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS cards_fts USING fts5(
+        question, answer, content='cards', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS cards_fts_insert AFTER INSERT ON cards BEGIN
+        INSERT INTO cards_fts(rowid, question, answer) VALUES (new.id, new.question, new.answer);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS cards_fts_delete AFTER DELETE ON cards BEGIN
+        INSERT INTO cards_fts(cards_fts, rowid, question, answer) VALUES ('delete', old.id, old.question, old.answer);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS cards_fts_update AFTER UPDATE OF question, answer ON cards BEGIN
+        INSERT INTO cards_fts(cards_fts, rowid, question, answer) VALUES ('delete', old.id, old.question, old.answer);
+        INSERT INTO cards_fts(rowid, question, answer) VALUES (new.id, new.question, new.answer);
+    END
+    """,
+]
+
+POSTGRESQL_SEARCH_DDL = [
+    """
+    ALTER TABLE cards ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', question), 'A') || setweight(to_tsvector('english', answer), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_cards_search_vector ON cards USING GIN (search_vector)",
+]
+
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(Card.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+for statement in POSTGRESQL_SEARCH_DDL:
+    event.listen(Card.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+
+# The index would otherwise outlive the rows it points at
+event.listen(
+    Card.__table__, "before_drop",
+    DDL("DROP TABLE IF EXISTS cards_fts").execute_if(dialect="sqlite")
+)
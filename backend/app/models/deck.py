@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from app.database import Base
@@ -11,6 +11,19 @@ class Deck(Base):
     description = Column(String, nullable=True)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    # Set on every write: GET /users/{id}/sync returns rows changed since a token
+    updated_at = Column(
+        DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc)
+    )
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # Bumped by deck and card writes
     
     # Relationship
     owner = relationship("User", backref="decks")
+    
+    __table_args__ = (
+        # Keyset pages of one owner's decks: WHERE owner_id = ? AND id > ? ORDER BY id
+        # (delta sync probes a user's decks by primary key)
+        Index("ix_decks_owner_id_id", "owner_id", "id"),
+    )
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Index
+from datetime import datetime, timezone
+from app.database import Base
+
+class DeckSubscription(Base):
+    """A user studying someone else's deck by reference, without copying its cards"""
+    __tablename__ = "deck_subscriptions"
+    
+    # Primary key (user_id, deck_id): a user's subscriptions are one range scan
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    deck_id = Column(Integer, ForeignKey("decks.id"), primary_key=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    
+    __table_args__ = (
+        # A deck's subscribers
+        Index("ix_deck_subscriptions_deck", "deck_id"),
+    )
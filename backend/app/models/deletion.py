@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
+from datetime import datetime, timezone
+from app.database import Base
+
+class Deletion(Base):
+    """
+    Tombstone of a deleted row, so delta sync can tell clients to drop it:
+    a card (for everyone studying its deck) or one user's override or
+    subscription
+    """
+    __tablename__ = "deletions"
+    
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(16), nullable=False)  # card, override or subscription
+    object_id = Column(Integer, nullable=False)  # Card id, or deck id for a subscription
+    deck_id = Column(Integer, nullable=True)  # Set for cards: who sees the tombstone
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Set for a user's own rows
+    deleted_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    
+    __table_args__ = (
+        # Delta sync: range scans of the user's decks' and the user's own tombstones since a token
+        Index("ix_deletions_deck_deleted", "deck_id", "deleted_at"),
+        Index("ix_deletions_user_deleted", "user_id", "deleted_at"),
+    )
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, ForeignKey
+from app.database import Base
+
+class PendingReview(Base):
+    """
+    A review event the write-behind writer has acknowledged but not yet
+    folded into user_card_progress. Deleted in the transaction that folds it.
+    """
+    __tablename__ = "pending_reviews"
+    
+    event_id = Column(Integer, ForeignKey("review_events.id"), primary_key=True)
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, Index
+from app.database import Base
+
+class ReviewEvent(Base):
+    """Append-only history: one row per rating, never updated"""
+    __tablename__ = "review_events"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    card_id = Column(Integer, ForeignKey("cards.id"), nullable=False)
+    confidence = Column(Float, nullable=False)  # The rating as submitted, 0.0 to 1.0
+    reviewed_at = Column(DateTime, nullable=False)
+    
+    __table_args__ = (
+        # A user's history of one card, in time order
+        Index("ix_review_events_user_card_time", "user_id", "card_id", "reviewed_at"),
+    )
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
+from datetime import datetime, timezone
 from app.database import Base
 
 class UserCardProgress(Base):
@@ -11,7 +12,27 @@ class UserCardProgress(Base):
     confidence_score = Column(Float, default=0.0)  # 0.0 to 1.0
     review_count = Column(Integer, default=0)
     last_reviewed_at = Column(DateTime, nullable=True)
+    next_due_at = Column(DateTime, nullable=True)  # See services/scheduling.py
+    # Set on every write: GET /users/{id}/sync returns rows changed since a token
+    updated_at = Column(
+        DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc)
+    )
+    stats_bucket = Column(Integer, nullable=True)  # Bucket this row is counted in by user_deck_stats
     
     # Relationships
     user = relationship("User", backref="card_progress")
     card = relationship("Card", backref="user_progress")
+    
+    __table_args__ = (
+        # One row per user and card; also serves the outer join in get_user_cards
+        # and the conflict target of the review upsert
+        UniqueConstraint("user_id", "card_id", name="uq_user_card_progress_user_card"),
+        # Recap mode range scan on a user's confident cards
+        Index("ix_user_card_progress_user_confidence", "user_id", "confidence_score"),
+        # Due-date queue: range scan of a user's most overdue cards
+        Index("ix_user_card_progress_user_due", "user_id", "next_due_at"),
+        # Delta sync: range scan of a user's rows changed since a token
+        Index("ix_user_card_progress_user_updated", "user_id", "updated_at"),
+    )
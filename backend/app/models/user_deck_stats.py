@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, ForeignKey
+from app.database import Base
+
+class UserDeckStats(Base):
+    """
+    Number of a user's reviewed cards in a deck per confidence bucket (see
+    services/deck_stats.py), kept up to date by every review
+    """
+    __tablename__ = "user_deck_stats"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    deck_id = Column(Integer, ForeignKey("decks.id"), primary_key=True)
+    bucket = Column(Integer, primary_key=True)
+    card_count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,75 @@
+import base64
+import binascii
+import json
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+from fastapi import HTTPException
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def _encode(payload: dict) -> str:
+    data = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+def _decode(cursor: str, key: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return int(payload[key])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def encode_cursor(last_id: int) -> str:
+    """Encode the id of the last row on a page as an opaque cursor"""
+    return _encode({"id": last_id})
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Decode a cursor produced by encode_cursor, returning the last seen id"""
+    if not cursor:
+        return None
+    return _decode(cursor, "id")
+
+def keyset_page(query, id_column, cursor: Optional[str], limit: Optional[int]):
+    """
+    Restrict a select to the page after `cursor`, in id order. With an index
+    led by the query's filter columns and ending in id, every page is a
+    range scan of `limit` + 1 rows however deep it is; the extra row tells
+    split_page whether another page follows.
+    """
+    after_id = decode_cursor(cursor)
+    if after_id is not None:
+        query = query.where(id_column > after_id)
+    query = query.order_by(id_column)
+    return query.limit(limit + 1) if limit else query
+
+def split_page(rows: List[Sequence], limit: Optional[int]) -> Tuple[List[Sequence], Dict[str, str]]:
+    """Drop keyset_page's extra row, returning the X-Next-Cursor header if there was one"""
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        return rows, {NEXT_CURSOR_HEADER: encode_cursor(rows[-1].id)}
+    return rows, {}
+
+def encode_sync_token(watermark: datetime) -> str:
+    """Token for GET /users/{id}/sync: rows changed at or after `watermark` are sent next time"""
+    return _encode({"since": int(watermark.timestamp() * 1_000_000)})
+
+def decode_sync_token(token: Optional[str]) -> Optional[datetime]:
+    if not token:
+        return None
+    micros = _decode(token, "since")
+    try:
+        return datetime.fromtimestamp(micros / 1_000_000, timezone.utc)
+    except (OverflowError, OSError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+
+def encode_offset_cursor(offset: int) -> str:
+    """Cursor for result lists with no stable key order, such as ranked search"""
+    return _encode({"offset": offset})
+
+def decode_offset_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    offset = _decode(cursor, "offset")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return offset
@@ -0,0 +1,101 @@
+import inspect
+from functools import wraps
+from typing import Any, AsyncIterator, Callable, Dict, Iterator
+from fastapi import APIRouter, Depends, params
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.util import greenlet_spawn
+from app.database import get_db, get_async_db, get_read_db, get_async_read_db
+from app.streaming import SessionStreamingResponse
+
+# Sync session dependencies and the async dependency that replaces each one
+ASYNC_SESSION_DEPENDENCIES: Dict[Callable, Callable] = {
+    get_db: get_async_db,
+    get_read_db: get_async_read_db,
+}
+
+def _session_param(signature: inspect.Signature):
+    names = [
+        name for name, param in signature.parameters.items()
+        if isinstance(param.default, params.Depends)
+        and param.default.dependency in ASYNC_SESSION_DEPENDENCIES
+    ]
+    if len(names) > 1:
+        raise ValueError("Async routes support a single database session parameter")
+    return names[0] if names else None
+
+async def _drive_sync_iterator(iterator: Iterator) -> AsyncIterator:
+    """Advance a database-reading sync iterator one step at a time on the event loop"""
+    done = object()
+    while True:
+        chunk = await greenlet_spawn(next, iterator, done)
+        if chunk is done:
+            break
+        yield chunk
+
+def async_endpoint(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Wrap a sync endpoint as an `async def` endpoint backed by an AsyncSession.
+
+    The handler body runs through `AsyncSession.run_sync`, so every query is
+    awaited on the async driver from the event loop instead of blocking a
+    threadpool worker; other blocking work in it goes through
+    `run_blocking`. Endpoints without a session run in the threadpool as
+    FastAPI runs sync endpoints. The wrapper keeps the original signature
+    (with the session dependency swapped) so validation and OpenAPI are
+    unchanged.
+    """
+    signature = inspect.signature(endpoint)
+    session_name = _session_param(signature)
+    
+    @wraps(endpoint)
+    async def wrapper(**kwargs):
+        if session_name is None:
+            return await run_in_threadpool(endpoint, **kwargs)
+        db: AsyncSession = kwargs.pop(session_name)
+        result = await db.run_sync(
+            lambda session: endpoint(**kwargs, **{session_name: session})
+        )
+        if isinstance(result, SessionStreamingResponse):
+            # The body reads through the async driver, which needs a greenlet
+            result.body_iterator = _drive_sync_iterator(result.sync_iterator)
+        return result
+    
+    if session_name is not None:
+        session_param = signature.parameters[session_name]
+        dependency = ASYNC_SESSION_DEPENDENCIES[session_param.default.dependency]
+        signature = signature.replace(parameters=[
+            param.replace(annotation=AsyncSession, default=Depends(dependency))
+            if name == session_name else param
+            for name, param in signature.parameters.items()
+        ])
+    wrapper.__signature__ = signature
+    return wrapper
+
+def async_router(router: APIRouter) -> APIRouter:
+    """Mirror a router of sync endpoints with async endpoints on AsyncSession"""
+    mirrored = APIRouter()
+    for route in router.routes:
+        if not isinstance(route, APIRoute):
+            mirrored.routes.append(route)
+            continue
+        mirrored.add_api_route(
+            route.path,
+            async_endpoint(route.endpoint),
+            response_model=route.response_model,
+            status_code=route.status_code,
+            tags=route.tags,
+            dependencies=route.dependencies,
+            summary=route.summary,
+            description=route.description,
+            response_description=route.response_description,
+            responses=route.responses,
+            deprecated=route.deprecated,
+            methods=route.methods,
+            operation_id=route.operation_id,
+            include_in_schema=route.include_in_schema,
+            response_class=route.response_class,
+            name=route.name,
+        )
+    return mirrored
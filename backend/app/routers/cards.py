@@ -1,31 +1,209 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
-from app.models import Card, Deck
-from app.schemas import CardCreate, CardResponse
+from typing import List, Optional
+from app.admission import admission
+from app.database import get_db, get_read_db, read_routing
+from app.models import Card, Deck, User
+from app.models.card import content_hash
+from app.schemas import CardCreate, CardResponse, CardImportResult
+from app.services.card_import import IMPORT_FORMATS, ImportFormatError, detect_format, import_cards
+from app.services.card_export import EXPORT_FORMATS, EXPORT_MEDIA_TYPES, export_deck
+from app.services.progress_cache import progress_cache
+from app.services.decks import bump_deck_version
+from app.serialization import FastJSONResponse, row_dicts, schema_columns
+from app.etags import ETAG_HEADER, is_not_modified, make_etag, not_modified
+from app.streaming import (
+    FORMAT_PATTERN, NDJSON_RESPONSES, ndjson_response, session_stream, wants_ndjson
+)
+from app.pagination import keyset_page, split_page
+from app.config import MAX_PAGE_SIZE, STREAM_BATCH_SIZE
 
 router = APIRouter(prefix="/decks", tags=["cards"])
 
-@router.post("/{deck_id}/cards", response_model=CardResponse, status_code=201)
-def create_card(deck_id: int, card: CardCreate, db: Session = Depends(get_db)):
+CARD_FIELDS = tuple(CardResponse.model_fields)
+
+def _find_duplicate(db: Session, deck_id: int, digest: str) -> Optional[Card]:
+    # Point lookup on the (deck_id, content_hash) unique index
+    return db.query(Card).filter(Card.deck_id == deck_id, Card.content_hash == digest).first()
+
+@router.post(
+    "/{deck_id}/cards",
+    response_model=CardResponse,
+    status_code=201,
+    responses={200: {"model": CardResponse, "description": "The deck already has this card"}}
+)
+def create_card(deck_id: int, card: CardCreate, response: Response, db: Session = Depends(get_db)):
+    """
+    Add a card to the deck. If the deck already has the same question and
+    answer (ignoring case and whitespace), that card is returned with 200
+    instead of adding a duplicate.
+    """
     # Verify deck exists
     deck = db.query(Deck).filter(Deck.id == deck_id).first()
     if not deck:
         raise HTTPException(status_code=404, detail="Deck not found")
     
-    db_card = Card(deck_id=deck_id, **card.model_dump())
+    digest = content_hash(card.question, card.answer)
+    existing = _find_duplicate(db, deck_id, digest)
+    if existing:
+        response.status_code = 200
+        return existing
+    
+    db_card = Card(deck_id=deck_id, content_hash=digest, **card.model_dump())
     db.add(db_card)
-    db.commit()
+    bump_deck_version(db, deck_id)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        # A concurrent request added the same card first
+        existing = _find_duplicate(db, deck_id, digest)
+        if existing is None:
+            # Some other constraint, e.g. the deck was deleted meanwhile
+            if not db.query(Deck).filter(Deck.id == deck_id).first():
+                raise HTTPException(status_code=404, detail="Deck not found")
+            raise
+        response.status_code = 200
+        return existing
     db.refresh(db_card)
+    progress_cache.invalidate_deck(deck_id)
     return db_card
 
-@router.get("/{deck_id}/cards", response_model=List[CardResponse])
-def list_cards(deck_id: int, db: Session = Depends(get_db)):
+@router.get(
+    "/{deck_id}/cards",
+    response_model=List[CardResponse],
+    responses=NDJSON_RESPONSES,
+    dependencies=[Depends(admission.limit("list_cards"))]
+)
+def list_cards(
+    deck_id: int,
+    request: Request,
+    format: Optional[str] = Query(None, pattern=FORMAT_PATTERN),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Cards in id order. When `limit` is given, the cursor for the next page is
+    returned in the X-Next-Cursor header.
+
+    Every card write bumps the deck's version, which is the ETag (with the
+    page): a matching If-None-Match is answered with 304 without loading
+    any cards.
+    """
+    # Verify deck exists
+    deck = db.query(Deck).filter(Deck.id == deck_id).first()
+    if not deck:
+        raise HTTPException(status_code=404, detail="Deck not found")
+    
+    ndjson = wants_ndjson(request, format)
+    etag = make_etag("deck", deck_id, deck.version, "ndjson" if ndjson else "json", cursor or "", limit or "")
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    
+    # Plain column tuples, encoded directly; CardResponse stays the documented schema.
+    # Pages are range scans on ix_cards_deck_id_id.
+    query = keyset_page(
+        select(*schema_columns(Card, CardResponse)).where(Card.deck_id == deck_id), Card.id, cursor, limit
+    )
+    if limit:
+        rows, headers = split_page(db.execute(query).all(), limit)
+        headers[ETAG_HEADER] = etag
+        cards = [dict(zip(CARD_FIELDS, row)) for row in rows]
+        if ndjson:
+            stream = ndjson_response(db, lambda session: iter(cards))
+            stream.headers.update(headers)
+            return stream
+        return FastJSONResponse(cards, headers=headers)
+    
+    if ndjson:
+        # Server-side cursor: only one batch of rows is in memory at a time
+        query = query.execution_options(yield_per=STREAM_BATCH_SIZE)
+        stream = ndjson_response(db, lambda session: (
+            dict(zip(CARD_FIELDS, row)) for row in session.execute(query)
+        ))
+        stream.headers[ETAG_HEADER] = etag
+        return stream
+    
+    return FastJSONResponse(row_dicts(db.execute(query), CARD_FIELDS), headers={ETAG_HEADER: etag})
+
+@router.post(
+    "/{deck_id}/import",
+    response_model=CardImportResult,
+    status_code=201,
+    dependencies=[Depends(admission.limit("import_cards"))]
+)
+def import_deck_cards(
+    deck_id: int,
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern=f"^({'|'.join(IMPORT_FORMATS)})$"),
+    user_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Bulk-add cards from a CSV (question,answer header) or JSON-lines upload,
+    plain or gzip-compressed. The format comes from `format`, else the file
+    extension or content type. Files written by the deck export are accepted
+    as-is; pass `user_id` to restore the progress they carry for that user.
+    """
+    # Verify deck exists
+    deck = db.query(Deck).filter(Deck.id == deck_id).first()
+    if not deck:
+        raise HTTPException(status_code=404, detail="Deck not found")
+    
+    if user_id is not None:
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+    
+    fmt = format or detect_format(file.filename, file.content_type)
+    if fmt is None:
+        raise HTTPException(status_code=400, detail="Unknown file format; use .csv or .jsonl")
+    
+    try:
+        result = import_cards(db, deck_id, file.file, fmt, user_id)
+    except ImportFormatError as exc:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(exc))
+    if result.inserted:
+        bump_deck_version(db, deck_id)
+    db.commit()
+    progress_cache.invalidate_deck(deck_id)
+    if user_id is not None and result.inserted:
+        # Restored progress: the user's next reads should see it
+        read_routing.pin(user_id)
+    return result
+
+@router.get("/{deck_id}/export", dependencies=[Depends(admission.limit("export_cards"))])
+def export_deck_cards(
+    deck_id: int,
+    format: str = Query("jsonl", pattern=f"^({'|'.join(EXPORT_FORMATS)})$"),
+    user_id: Optional[int] = None,
+    compress: bool = True,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Stream the deck's metadata and cards, plus one user's progress when
+    `user_id` is given, as gzip-compressed JSON-lines or CSV. Rows are read
+    with a server-side cursor, so memory use does not grow with deck size.
+    The file can be loaded back with POST /decks/{deck_id}/import.
+    """
     # Verify deck exists
     deck = db.query(Deck).filter(Deck.id == deck_id).first()
     if not deck:
         raise HTTPException(status_code=404, detail="Deck not found")
     
-    cards = db.query(Card).filter(Card.deck_id == deck_id).all()
-    return cards
+    if user_id is not None:
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+    
+    filename = f"deck-{deck_id}.{format}" + (".gz" if compress else "")
+    return session_stream(
+        db,
+        export_deck(db, deck, user_id, format, compress),
+        media_type="application/gzip" if compress else EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -1,12 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.database import get_db
+from app.admission import admission
+from app.database import get_db, get_read_db
 from app.models import Deck, User
 from app.schemas import DeckCreate, DeckResponse
+from app.serialization import FastJSONResponse, row_dicts, schema_columns
+from app.etags import ETAG_HEADER, is_not_modified, make_etag, not_modified
+from app.pagination import NEXT_CURSOR_HEADER, keyset_page, split_page
+from app.services.subscriptions import user_deck_ids
+from app.config import MAX_PAGE_SIZE
 
 router = APIRouter(prefix="/decks", tags=["decks"])
 
+DECK_FIELDS = tuple(DeckResponse.model_fields)
+
+def _filter_decks(query, owner_id: Optional[int], user_id: Optional[int]):
+    if owner_id:
+        query = query.where(Deck.owner_id == owner_id)
+    if user_id:
+        # Owned and subscribed decks, both from index range scans
+        query = query.where(Deck.id.in_(user_deck_ids(user_id)))
+    return query
+
 @router.post("/", response_model=DeckResponse, status_code=201)
 def create_deck(deck: DeckCreate, db: Session = Depends(get_db)):
     # Verify owner exists
@@ -20,15 +37,53 @@ def create_deck(deck: DeckCreate, db: Session = Depends(get_db)):
     db.refresh(db_deck)
     return db_deck
 
-@router.get("/", response_model=List[DeckResponse])
-def list_decks(owner_id: Optional[int] = None, db: Session = Depends(get_db)):
-    query = db.query(Deck)
-    if owner_id:
-        query = query.filter(Deck.owner_id == owner_id)
-    return query.all()
+@router.get("/", response_model=List[DeckResponse], dependencies=[Depends(admission.limit("list_decks"))])
+def list_decks(
+    request: Request,
+    owner_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Decks in id order; `user_id` lists the decks the user owns or subscribes
+    to. When `limit` is given, the cursor for the next page is returned in
+    the X-Next-Cursor header.
+
+    The ETag of the full listing summarises the decks' count, ids and
+    versions, so a matching If-None-Match is answered with 304 before any
+    deck is loaded. A page's ETag comes from the ids and versions on it.
+    """
+    columns = schema_columns(Deck, DeckResponse)
+    if limit:
+        query = _filter_decks(select(*columns, Deck.version), owner_id, user_id)
+        # Range scan on ix_decks_owner_id_id (or the primary key), however deep the page
+        rows, headers = split_page(db.execute(keyset_page(query, Deck.id, cursor, limit)).all(), limit)
+        etag = make_etag(
+            "decks", owner_id or "all", user_id or "", cursor or "", limit, headers.get(NEXT_CURSOR_HEADER, ""),
+            *(f"{row.id}.{row.version}" for row in rows)
+        )
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+        headers[ETAG_HEADER] = etag
+        return FastJSONResponse([dict(zip(DECK_FIELDS, row)) for row in rows], headers=headers)
+    
+    # The id sum changes when a subscription swaps one deck for another
+    summary = _filter_decks(
+        select(func.count(Deck.id), func.max(Deck.id), func.sum(Deck.id), func.sum(Deck.version)),
+        owner_id, user_id
+    )
+    count, max_id, id_sum, versions = db.execute(summary).one()
+    etag = make_etag("decks", owner_id or "all", user_id or "", count, max_id or 0, id_sum or 0, versions or 0)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    
+    query = _filter_decks(select(*columns), owner_id, user_id).order_by(Deck.id)
+    return FastJSONResponse(row_dicts(db.execute(query), DECK_FIELDS), headers={ETAG_HEADER: etag})
 
 @router.get("/{deck_id}", response_model=DeckResponse)
-def get_deck(deck_id: int, db: Session = Depends(get_db)):
+def get_deck(deck_id: int, db: Session = Depends(get_read_db)):
     deck = db.query(Deck).filter(Deck.id == deck_id).first()
     if not deck:
         raise HTTPException(status_code=404, detail="Deck not found")
@@ -1,74 +1,231 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import and_, or_, select
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import datetime, timezone
-from app.database import get_db
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+from app.admission import admission
+from app.database import get_db, get_read_db, read_routing
 from app.models import Card, User, UserCardProgress, Deck
-from app.schemas import ReviewCreate, ProgressResponse, CardWithProgress, CardResponse
+from app.schemas import (
+    ReviewCreate, ProgressResponse, CardWithProgress, CardResponse, ReviewResult, ReviewAck
+)
+from app.services.reviews import upsert_review, apply_review_batch
+from app.services.review_writer import ReviewQueueFull, review_writer
+from app.services.scheduling import utcnow
+from app.services.progress_cache import load_snapshot, progress_cache
+from app.services.subscriptions import join_overrides, personal_card_columns, user_deck_ids
+from app.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from app.streaming import FORMAT_PATTERN, NDJSON_RESPONSES, ndjson_response, wants_ndjson
+from app.serialization import FastJSONResponse, schema_columns
 from app.config import (
     CONFIDENCE_THRESHOLD_LEARN, 
     CONFIDENCE_THRESHOLD_RECAP,
-    REVIEW_WEIGHT_HISTORY,
-    REVIEW_WEIGHT_NEW
+    REVIEW_BATCH_MAX_SIZE,
+    QUEUE_MAX_SIZE,
+    MAX_PAGE_SIZE,
+    PROGRESS_CACHE_MAX_SNAPSHOT_CARDS,
+    STREAM_BATCH_SIZE
 )
 
 router = APIRouter(tags=["progress"])
 
-@router.get("/users/{user_id}/cards", response_model=List[CardWithProgress])
+CARD_LOAD_CHUNK_SIZE = 500  # Bound on the IN (...) list when loading selected cards
+
+# CardWithProgress read as one flat tuple: the card's columns (with the user's
+# overrides, see join_overrides), then the progress columns
+CARD_FIELDS = tuple(CardResponse.model_fields)
+PROGRESS_FIELDS = tuple(ProgressResponse.model_fields)
+CARD_WITH_PROGRESS_COLUMNS = (
+    personal_card_columns() + schema_columns(UserCardProgress, ProgressResponse)
+)
+_CARD_ID = CARD_FIELDS.index("id")
+_PROGRESS_ID = len(CARD_FIELDS) + PROGRESS_FIELDS.index("id")
+_CONFIDENCE = len(CARD_FIELDS) + PROGRESS_FIELDS.index("confidence_score")
+
+def _card_with_progress(row: Sequence) -> Dict[str, Any]:
+    """A CardWithProgress-shaped dict; progress is None for an unseen card"""
+    return {
+        "card": dict(zip(CARD_FIELDS, row)),
+        "progress": (
+            dict(zip(PROGRESS_FIELDS, row[len(CARD_FIELDS):]))
+            if row[_PROGRESS_ID] is not None else None
+        ),
+    }
+
+def _matches_mode(mode: str, confidence: Optional[float]) -> bool:
+    if mode == "learn":
+        return confidence is None or confidence < CONFIDENCE_THRESHOLD_LEARN
+    return confidence is not None and confidence >= CONFIDENCE_THRESHOLD_RECAP
+
+def _load_cards_with_progress(
+    db: Session,
+    user_id: int,
+    mode: str,
+    card_ids: List[int]
+) -> Iterator[Dict[str, Any]]:
+    """Load the selected cards and the user's progress by primary key, in chunks"""
+    for start in range(0, len(card_ids), CARD_LOAD_CHUNK_SIZE):
+        rows = db.execute(
+            join_overrides(
+                select(*CARD_WITH_PROGRESS_COLUMNS).select_from(Card).outerjoin(
+                    UserCardProgress,
+                    and_(
+                        UserCardProgress.card_id == Card.id,
+                        UserCardProgress.user_id == user_id
+                    )
+                ),
+                user_id
+            ).where(
+                Card.id.in_(card_ids[start:start + CARD_LOAD_CHUNK_SIZE])
+            ).order_by(Card.id)
+        )
+        for row in rows:
+            # The snapshot may lag writes made by another worker process
+            if _matches_mode(mode, row[_CONFIDENCE]):
+                yield _card_with_progress(row)
+
+def _mode_filtered_query(user_id: int, deck_id: Optional[int], mode: str, after_id: Optional[int]):
+    """The scope's cards matching the mode, after the cursor in id order, filtered in SQL"""
+    query = join_overrides(
+        select(*CARD_WITH_PROGRESS_COLUMNS).select_from(Card).outerjoin(
+            UserCardProgress,
+            and_(
+                UserCardProgress.card_id == Card.id,
+                UserCardProgress.user_id == user_id
+            )
+        ),
+        user_id
+    ).where(Card.deck_id == deck_id if deck_id else Card.deck_id.in_(user_deck_ids(user_id)))
+    if mode == "learn":
+        query = query.where(or_(
+            UserCardProgress.id.is_(None),
+            UserCardProgress.confidence_score < CONFIDENCE_THRESHOLD_LEARN
+        ))
+    else:
+        query = query.where(UserCardProgress.confidence_score >= CONFIDENCE_THRESHOLD_RECAP)
+    if after_id is not None:
+        query = query.where(Card.id > after_id)
+    return query.order_by(Card.id)
+
+@router.get(
+    "/users/{user_id}/cards",
+    response_model=List[CardWithProgress],
+    responses=NDJSON_RESPONSES,
+    dependencies=[Depends(admission.limit("user_cards"))]
+)
 def get_user_cards(
     user_id: int,
+    request: Request,
     mode: str = Query(..., pattern="^(learn|recap)$"),
     deck_id: Optional[int] = None,
-    db: Session = Depends(get_db)
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    format: Optional[str] = Query(None, pattern=FORMAT_PATTERN),
+    db: Session = Depends(get_read_db)
 ):
     """
     Get cards for a user based on mode:
     - learn: Cards never seen or low confidence
     - recap: Cards with sufficient confidence for review
+
+    Cards are returned in id order. When `limit` is given, the cursor for the
+    next page is returned in the X-Next-Cursor header. `format=ndjson` (or
+    Accept: application/x-ndjson) streams one card per line.
     """
     # Verify user exists
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Build base query
-    query = db.query(Card)
+    # Verify deck exists
     if deck_id:
         deck = db.query(Deck).filter(Deck.id == deck_id).first()
         if not deck:
             raise HTTPException(status_code=404, detail="Deck not found")
-        query = query.filter(Card.deck_id == deck_id)
     
-    cards = query.all()
+    # Ids and confidences of every card in scope, cached per (user, deck)
+    snapshot = load_snapshot(db, user_id, deck_id or None, max_cards=PROGRESS_CACHE_MAX_SNAPSHOT_CARDS)
+    after_id = decode_cursor(cursor)
+    headers = {}
+    if snapshot is not None:
+        # Filter based on mode, fetching one extra id to know whether another page exists
+        card_ids = snapshot.select(mode, after_id, limit + 1 if limit else None)
+        if limit and len(card_ids) > limit:
+            card_ids = card_ids[:limit]
+            headers[NEXT_CURSOR_HEADER] = encode_cursor(card_ids[-1])
+        load = lambda session: _load_cards_with_progress(session, user_id, mode, card_ids)
+    else:
+        # Too many cards to snapshot, or a replica read: filter and page in SQL
+        query = _mode_filtered_query(user_id, deck_id or None, mode, after_id)
+        if limit:
+            rows = db.execute(query.limit(limit + 1)).all()
+            if len(rows) > limit:
+                rows = rows[:limit]
+                headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1][_CARD_ID])
+            load = lambda session: map(_card_with_progress, rows)
+        else:
+            # Server-side cursor: only one batch of rows is in memory at a time
+            query = query.execution_options(yield_per=STREAM_BATCH_SIZE)
+            load = lambda session: map(_card_with_progress, session.execute(query))
+    
+    if wants_ndjson(request, format):
+        stream = ndjson_response(db, load)
+        stream.headers.update(headers)
+        return stream
+    
+    return FastJSONResponse(list(load(db)), headers=headers)
+
+@router.get(
+    "/users/{user_id}/queue",
+    response_model=List[CardWithProgress],
+    dependencies=[Depends(admission.limit("review_queue"))]
+)
+def get_review_queue(
+    user_id: int,
+    n: int = Query(20, ge=1, le=QUEUE_MAX_SIZE),
+    deck_id: Optional[int] = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get the next N cards to study: the most overdue reviewed cards first,
+    then unseen cards in id order to fill the remaining slots.
+    """
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    if deck_id:
+        deck = db.query(Deck).filter(Deck.id == deck_id).first()
+        if not deck:
+            raise HTTPException(status_code=404, detail="Deck not found")
     
-    # Get progress for all cards
-    card_ids = [card.id for card in cards]
-    progress_records = db.query(UserCardProgress).filter(
+    # Range scan on (user_id, next_due_at), oldest due date first
+    due_query = join_overrides(
+        select(*CARD_WITH_PROGRESS_COLUMNS).select_from(UserCardProgress).join(
+            Card, Card.id == UserCardProgress.card_id
+        ),
+        user_id
+    ).where(
         UserCardProgress.user_id == user_id,
-        UserCardProgress.card_id.in_(card_ids)
-    ).all()
-    progress_map = {progress.card_id: progress for progress in progress_records}
+        UserCardProgress.next_due_at <= utcnow()
+    )
+    # Without a deck: the decks the user owns or subscribes to
+    deck_scope = Card.deck_id == deck_id if deck_id else Card.deck_id.in_(user_deck_ids(user_id))
+    due_query = due_query.where(deck_scope)
+    rows = db.execute(due_query.order_by(UserCardProgress.next_due_at).limit(n)).all()
     
-    # Filter based on mode
-    result = []
-    for card in cards:
-        progress = progress_map.get(card.id)
-        
-        if mode == "learn":
-            if progress is None or progress.confidence_score < CONFIDENCE_THRESHOLD_LEARN:
-                result.append(CardWithProgress(
-                    card=CardResponse.model_validate(card),
-                    progress=ProgressResponse.model_validate(progress) if progress else None
-                ))
-        
-        elif mode == "recap":
-            if progress and progress.confidence_score >= CONFIDENCE_THRESHOLD_RECAP:
-                result.append(CardWithProgress(
-                    card=CardResponse.model_validate(card),
-                    progress=ProgressResponse.model_validate(progress)
-                ))
+    if len(rows) < n:
+        unseen_query = join_overrides(
+            select(*CARD_WITH_PROGRESS_COLUMNS).select_from(Card).outerjoin(
+                UserCardProgress,
+                and_(
+                    UserCardProgress.card_id == Card.id,
+                    UserCardProgress.user_id == user_id
+                )
+            ),
+            user_id
+        ).where(UserCardProgress.id.is_(None), deck_scope)
+        rows.extend(db.execute(unseen_query.order_by(Card.id).limit(n - len(rows))))
     
-    return result
+    return FastJSONResponse([_card_with_progress(row) for row in rows])
 
 @router.post("/reviews", response_model=ProgressResponse, status_code=201)
 def record_review(review: ReviewCreate, db: Session = Depends(get_db)):
@@ -86,31 +243,63 @@ def record_review(review: ReviewCreate, db: Session = Depends(get_db)):
     if not 0.0 <= review.confidence <= 1.0:
         raise HTTPException(status_code=400, detail="Confidence must be between 0.0 and 1.0")
     
-    # Find or create progress record
-    progress = db.query(UserCardProgress).filter(
-        UserCardProgress.user_id == review.user_id,
-        UserCardProgress.card_id == review.card_id
-    ).first()
-    
-    if progress:
-        # Update existing: weighted average
-        progress.confidence_score = (
-            REVIEW_WEIGHT_HISTORY * progress.confidence_score + 
-            REVIEW_WEIGHT_NEW * review.confidence
-        )
-        progress.review_count += 1
-        progress.last_reviewed_at = datetime.now(timezone.utc)
-    else:
-        # Create new
-        progress = UserCardProgress(
-            user_id=review.user_id,
-            card_id=review.card_id,
-            confidence_score=review.confidence,
-            review_count=1,
-            last_reviewed_at=datetime.now(timezone.utc)
+    progress = upsert_review(
+        db, review.user_id, review.card_id, review.confidence, utcnow()
+    )
+    # Snapshot before commit so the expired row is not reloaded
+    result = ProgressResponse.model_validate(progress)
+    db.commit()
+    progress_cache.record_review(result.user_id, result.card_id, result.confidence_score)
+    read_routing.pin(result.user_id)
+    return result
+
+@router.post("/reviews/batch", response_model=List[ReviewResult])
+def record_reviews_batch(reviews: List[ReviewCreate], db: Session = Depends(get_db)):
+    """
+    Record many reviews in one transaction, e.g. an offline client replaying
+    its queue. Reviews are applied in order; each item gets its own result.
+    """
+    if len(reviews) > REVIEW_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch exceeds {REVIEW_BATCH_MAX_SIZE} reviews"
         )
-        db.add(progress)
     
+    results = apply_review_batch(db, reviews)
     db.commit()
-    db.refresh(progress)
-    return progress
+    for result in results:
+        if result.progress:
+            progress_cache.record_review(
+                result.progress.user_id,
+                result.progress.card_id,
+                result.progress.confidence_score
+            )
+            read_routing.pin(result.progress.user_id)
+    return results
+
+@router.post("/reviews/events", response_model=ReviewAck, status_code=202)
+def enqueue_review(review: ReviewCreate, db: Session = Depends(get_db)):
+    """
+    Commit a review to review_events and acknowledge it; the progress update
+    follows in the write-behind writer's next batch.
+    """
+    if not db.get(User, review.user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+    if not db.get(Card, review.card_id):
+        raise HTTPException(status_code=404, detail="Card not found")
+    
+    # Validate confidence
+    if not 0.0 <= review.confidence <= 1.0:
+        raise HTTPException(status_code=400, detail="Confidence must be between 0.0 and 1.0")
+    
+    try:
+        reviewed_at = review_writer.submit(db, review)
+    except ReviewQueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Review queue is full",
+            headers={"Retry-After": "1"}
+        )
+    # Pinned from now, so the window also covers the writer's flush interval
+    read_routing.pin(review.user_id)
+    return ReviewAck(status="queued", reviewed_at=reviewed_at, queue_depth=review_writer.depth)
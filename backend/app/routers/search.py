@@ -0,0 +1,59 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from app.admission import admission
+from app.database import get_read_db
+from app.models import Deck, User
+from app.schemas import CardSearchResult
+from app.services.search import SearchIndexMissing, SearchQueryError, search_cards
+from app.serialization import FastJSONResponse
+from app.pagination import NEXT_CURSOR_HEADER, decode_offset_cursor, encode_offset_cursor
+from app.config import MAX_PAGE_SIZE, SEARCH_DEFAULT_LIMIT, SEARCH_MAX_QUERY_LENGTH
+
+router = APIRouter(prefix="/cards", tags=["search"])
+
+SEARCH_RESULT_FIELDS = tuple(CardSearchResult.model_fields)
+
+@router.get("/search", response_model=List[CardSearchResult], dependencies=[Depends(admission.limit("search"))])
+def search(
+    q: str = Query(..., min_length=1, max_length=SEARCH_MAX_QUERY_LENGTH),
+    user_id: Optional[int] = None,
+    deck_id: Optional[int] = None,
+    limit: int = Query(SEARCH_DEFAULT_LIMIT, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Full-text search over card questions and answers, best match first.
+    Every word must match, the last one as a prefix. `user_id` searches
+    the decks the user owns or subscribes to, `deck_id` a single deck. Pass the X-Next-Cursor
+    response header back as `cursor` for the next page.
+    """
+    if user_id:
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+    
+    # Verify deck exists
+    if deck_id:
+        deck = db.query(Deck).filter(Deck.id == deck_id).first()
+        if not deck:
+            raise HTTPException(status_code=404, detail="Deck not found")
+    
+    offset = decode_offset_cursor(cursor)
+    try:
+        # One extra row tells whether another page exists
+        rows = search_cards(db, q, user_id, deck_id, offset, limit + 1)
+    except SearchQueryError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except SearchIndexMissing:
+        raise HTTPException(
+            status_code=503,
+            detail="Card search index is missing; run `python -m app.cli rebuild-search`"
+        )
+    
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers[NEXT_CURSOR_HEADER] = encode_offset_cursor(offset + limit)
+    return FastJSONResponse([dict(zip(SEARCH_RESULT_FIELDS, row)) for row in rows], headers=headers)
@@ -0,0 +1,153 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.admission import admission
+from app.database import get_db, read_routing
+from app.models import Card, Deck, User
+from app.schemas import (
+    CardResponse, StudySessionCreate, StudySessionResponse, StudySessionCard, StudySessionReview,
+    StudySessionReviewResult, StudySessionSummary
+)
+from app.serialization import FastJSONResponse
+from app.config import PROGRESS_CACHE_MAX_SNAPSHOT_CARDS
+from app.services.progress_cache import load_selection, load_snapshot
+from app.services.subscriptions import join_overrides, personal_card_columns
+from app.services.study_sessions import (
+    CardNotInSession, SessionReviewLimit, TooManySessions, study_sessions, update_progress_cache, write_session_reviews
+)
+
+router = APIRouter(tags=["sessions"])
+
+CARD_FIELDS = tuple(CardResponse.model_fields)
+
+def _session_not_found() -> HTTPException:
+    return HTTPException(status_code=404, detail="Session not found")
+
+@router.post(
+    "/users/{user_id}/sessions",
+    response_model=StudySessionResponse,
+    status_code=201,
+    dependencies=[Depends(admission.limit("start_session"))]
+)
+def start_session(user_id: int, options: StudySessionCreate, db: Session = Depends(get_db)):
+    """
+    Open a study session: the cards matching the mode are queued in memory
+    once, from the same snapshot get_user_cards uses (or, for a scope too
+    large to snapshot, filtered in SQL). Reviews posted to the
+    session stay in memory and are written in one batch when it ends.
+    """
+    # Verify user exists
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # Verify deck exists
+    if options.deck_id:
+        deck = db.query(Deck).filter(Deck.id == options.deck_id).first()
+        if not deck:
+            raise HTTPException(status_code=404, detail="Deck not found")
+    
+    snapshot = load_snapshot(db, user_id, options.deck_id or None, max_cards=PROGRESS_CACHE_MAX_SNAPSHOT_CARDS)
+    if snapshot is None:
+        # Too many cards to snapshot: read only the session's cards, filtered in SQL
+        snapshot = load_selection(db, user_id, options.deck_id or None, options.mode, options.size)
+    card_ids = snapshot.select(options.mode, None, options.size)
+    try:
+        session = study_sessions.open(
+            user_id, options.deck_id, options.mode, card_ids,
+            [snapshot.confidence(card_id) for card_id in card_ids]
+        )
+    except TooManySessions:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many active study sessions",
+            headers={"Retry-After": "30"}
+        )
+    return StudySessionResponse(
+        session_id=session.session_id,
+        user_id=user_id,
+        deck_id=options.deck_id,
+        mode=options.mode,
+        card_count=len(card_ids),
+        ttl_seconds=study_sessions.ttl
+    )
+
+@router.get(
+    "/sessions/{session_id}/next",
+    response_model=StudySessionCard,
+    responses={204: {"description": "The session's queue is empty"}}
+)
+def next_session_card(session_id: str, db: Session = Depends(get_db)):
+    """
+    Pop the next card of the session's queue. Cards deleted (or merged away
+    by dedupe) since the session was opened are skipped. Read from the
+    primary, which the session's cards were queued from.
+    """
+    while True:
+        try:
+            popped, remaining, user_id = study_sessions.next_card(session_id)
+        except KeyError:
+            raise _session_not_found()
+        if popped is None:
+            return Response(status_code=204)
+        
+        card_id, confidence = popped
+        # Primary key lookups for the card's text and the user's override; the queue only holds ids
+        row = db.execute(
+            join_overrides(select(*personal_card_columns()).select_from(Card), user_id).where(Card.id == card_id)
+        ).first()
+        if row is not None:
+            break
+    return FastJSONResponse({
+        "card": dict(zip(CARD_FIELDS, row)),
+        "confidence": None if confidence != confidence else confidence,
+        "remaining": remaining,
+    })
+
+@router.post("/sessions/{session_id}/reviews", response_model=StudySessionReviewResult)
+def review_session_card(session_id: str, review: StudySessionReview):
+    """
+    Rate one of the session's cards. The session's queue and confidences
+    are updated in memory; nothing is written until the session ends.
+    """
+    # Validate confidence
+    if not 0.0 <= review.confidence <= 1.0:
+        raise HTTPException(status_code=400, detail="Confidence must be between 0.0 and 1.0")
+    
+    try:
+        confidence, requeued, remaining = study_sessions.review(session_id, review.card_id, review.confidence)
+    except KeyError:
+        raise _session_not_found()
+    except CardNotInSession:
+        raise HTTPException(status_code=404, detail="Card not in session")
+    except SessionReviewLimit:
+        raise HTTPException(status_code=409, detail="Session review limit reached; end the session")
+    return StudySessionReviewResult(
+        card_id=review.card_id, confidence=confidence, requeued=requeued, remaining=remaining
+    )
+
+@router.delete("/sessions/{session_id}", response_model=StudySessionSummary)
+def end_session(session_id: str, db: Session = Depends(get_db)):
+    """End the session and write its reviews to user_card_progress in one transaction"""
+    try:
+        session = study_sessions.end(session_id)
+    except KeyError:
+        raise _session_not_found()
+    
+    try:
+        results = write_session_reviews(db, session)
+        db.commit()
+    except Exception:
+        # The session is gone from the store: hand it to the sweeper rather than lose its reviews
+        db.rollback()
+        study_sessions.retry([session])
+        raise
+    update_progress_cache(results)
+    read_routing.pin(session.user_id)
+    written = sum(1 for result in results if result.progress)
+    return StudySessionSummary(
+        session_id=session_id,
+        reviews=len(results),
+        written=written,
+        rejected=len(results) - written
+    )
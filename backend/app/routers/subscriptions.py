@@ -0,0 +1,120 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import List
+from app.database import get_db, get_read_db, read_routing
+from app.models import Card, CardOverride, Deck, DeckSubscription, User
+from app.schemas import (
+    SubscriptionCreate, SubscriptionResponse, CardOverrideUpdate, CardOverrideResponse
+)
+from app.services.progress_cache import progress_cache
+from app.services.subscriptions import OVERRIDABLE_FIELDS, studies_deck
+from app.services.sync import record_deletions
+
+router = APIRouter(tags=["subscriptions"])
+
+def _get_user(db: Session, user_id: int) -> User:
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+@router.post(
+    "/users/{user_id}/subscriptions",
+    response_model=SubscriptionResponse,
+    status_code=201,
+    responses={200: {"description": "Already subscribed"}}
+)
+def subscribe(user_id: int, subscription: SubscriptionCreate, response: Response, db: Session = Depends(get_db)):
+    """
+    Study someone else's deck by reference: its cards show up in the user's
+    cards, queue and sessions without being copied. Progress stays per user.
+    """
+    _get_user(db, user_id)
+    
+    # Verify deck exists
+    deck = db.query(Deck).filter(Deck.id == subscription.deck_id).first()
+    if not deck:
+        raise HTTPException(status_code=404, detail="Deck not found")
+    if deck.owner_id == user_id:
+        raise HTTPException(status_code=400, detail="Cannot subscribe to your own deck")
+    
+    existing = db.get(DeckSubscription, (user_id, deck.id))
+    if existing is None:
+        db_subscription = DeckSubscription(user_id=user_id, deck_id=deck.id)
+        db.add(db_subscription)
+        try:
+            db.commit()
+        except IntegrityError:
+            # A concurrent request subscribed first
+            db.rollback()
+            existing = db.get(DeckSubscription, (user_id, deck.id))
+        else:
+            db.refresh(db_subscription)
+            progress_cache.invalidate_user(user_id)
+            read_routing.pin(user_id)
+            return db_subscription
+    response.status_code = 200
+    return existing
+
+@router.get("/users/{user_id}/subscriptions", response_model=List[SubscriptionResponse])
+def list_subscriptions(user_id: int, db: Session = Depends(get_read_db)):
+    _get_user(db, user_id)
+    return db.query(DeckSubscription).filter(
+        DeckSubscription.user_id == user_id
+    ).order_by(DeckSubscription.deck_id).all()
+
+@router.delete("/users/{user_id}/subscriptions/{deck_id}", status_code=204)
+def unsubscribe(user_id: int, deck_id: int, db: Session = Depends(get_db)):
+    """Stop studying the deck. Progress and overrides are kept for a later subscription."""
+    subscription = db.get(DeckSubscription, (user_id, deck_id))
+    if subscription is None:
+        raise HTTPException(status_code=404, detail="Subscription not found")
+    
+    db.delete(subscription)
+    record_deletions(db, "subscription", [deck_id], user_id=user_id)
+    db.commit()
+    progress_cache.invalidate_user(user_id)
+    read_routing.pin(user_id)
+    return Response(status_code=204)
+
+@router.put("/users/{user_id}/cards/{card_id}/override", response_model=CardOverrideResponse)
+def override_card(user_id: int, card_id: int, edit: CardOverrideUpdate, db: Session = Depends(get_db)):
+    """
+    Personal edit of a card in a deck the user owns or subscribes to. Only
+    this user sees it; the shared card and everyone else's view are unchanged.
+    """
+    if all(getattr(edit, name) is None for name in OVERRIDABLE_FIELDS):
+        raise HTTPException(status_code=400, detail="Nothing to override")
+    _get_user(db, user_id)
+    
+    # Verify card exists
+    card = db.query(Card).filter(Card.id == card_id).first()
+    if not card:
+        raise HTTPException(status_code=404, detail="Card not found")
+    if not studies_deck(db, user_id, card.deck_id):
+        raise HTTPException(status_code=403, detail="Not subscribed to this deck")
+    
+    override = db.get(CardOverride, (user_id, card_id))
+    if override is None:
+        override = CardOverride(user_id=user_id, card_id=card_id)
+        db.add(override)
+    for name in OVERRIDABLE_FIELDS:
+        setattr(override, name, getattr(edit, name))
+    db.commit()
+    db.refresh(override)
+    read_routing.pin(user_id)
+    return override
+
+@router.delete("/users/{user_id}/cards/{card_id}/override", status_code=204)
+def delete_card_override(user_id: int, card_id: int, db: Session = Depends(get_db)):
+    """Go back to the shared card's text"""
+    override = db.get(CardOverride, (user_id, card_id))
+    if override is None:
+        raise HTTPException(status_code=404, detail="Override not found")
+    
+    db.delete(override)
+    record_deletions(db, "override", [card_id], user_id=user_id)
+    db.commit()
+    read_routing.pin(user_id)
+    return Response(status_code=204)
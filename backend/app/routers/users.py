@@ -1,8 +1,17 @@
+from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import User
-from app.schemas import UserCreate, UserResponse
+from typing import List, Optional
+from app.admission import admission
+from app.database import get_db, get_read_db
+from app.models import Deck, User
+from app.schemas import UserCreate, UserResponse, DeckStats, SyncResponse
+from app.services.deck_stats import user_deck_stats
+from app.services.scheduling import utcnow
+from app.services.sync import changes_since
+from app.pagination import decode_sync_token, encode_sync_token
+from app.serialization import FastJSONResponse
+from app.config import SYNC_OVERLAP_SECONDS
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -21,8 +30,44 @@ def create_user(user: UserCreate, db: Session = Depends(get_db)):
     return db_user
 
 @router.get("/{user_id}", response_model=UserResponse)
-def get_user(user_id: int, db: Session = Depends(get_db)):
+def get_user(user_id: int, db: Session = Depends(get_read_db)):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
+
+@router.get("/{user_id}/stats", response_model=List[DeckStats])
+def get_user_stats(user_id: int, deck_id: Optional[int] = None, db: Session = Depends(get_read_db)):
+    """
+    Unseen, learning and recap counts plus a confidence histogram for each
+    deck the user owns or has reviewed (or just `deck_id`), read from the
+    incrementally maintained user_deck_stats summary.
+    """
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # Verify deck exists
+    if deck_id:
+        deck = db.query(Deck).filter(Deck.id == deck_id).first()
+        if not deck:
+            raise HTTPException(status_code=404, detail="Deck not found")
+    
+    return user_deck_stats(db, user_id, deck_id)
+
+@router.get("/{user_id}/sync", response_model=SyncResponse, dependencies=[Depends(admission.limit("sync"))])
+def sync_user(user_id: int, since: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Decks, cards and the user's progress and overrides changed since the
+    `since` token (everything without one), plus the token for next time.
+    Rows can be sent again by a later sync; clients apply them by id.
+    Reads the primary: a lagging replica could miss rows older than the
+    token's overlap.
+    """
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    watermark = utcnow() - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+    changes = changes_since(db, user_id, decode_sync_token(since))
+    return FastJSONResponse({"token": encode_sync_token(watermark), **changes})
@@ -1,4 +1,14 @@
 from .user import UserCreate, UserResponse
 from .deck import DeckCreate, DeckResponse
-from .card import CardCreate, CardResponse
-from .progress import ReviewCreate, ProgressResponse, CardWithProgress
+from .card import CardCreate, CardResponse, CardSearchResult, CardImportResult, RejectedRow
+from .progress import (
+    ReviewCreate, ProgressResponse, CardWithProgress, ReviewResult, ReviewAck, ProgressRecord,
+    CardImportRow
+)
+from .stats import HistogramBucket, DeckStats
+from .session import (
+    StudySessionCreate, StudySessionResponse, StudySessionCard, StudySessionReview,
+    StudySessionReviewResult, StudySessionSummary
+)
+from .sync import DeletionResponse, SyncResponse
+from .subscription import SubscriptionCreate, SubscriptionResponse, CardOverrideUpdate, CardOverrideResponse
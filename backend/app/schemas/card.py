@@ -1,5 +1,6 @@
 from pydantic import BaseModel, ConfigDict
 from datetime import datetime
+from typing import List
 
 class CardCreate(BaseModel):
     question: str
@@ -13,3 +14,17 @@ class CardResponse(BaseModel):
     created_at: datetime
     
     model_config = ConfigDict(from_attributes=True)
+
+class CardSearchResult(CardResponse):
+    score: float  # Relevance to the query; higher is better
+
+class RejectedRow(BaseModel):
+    line: int  # 1-based line number in the uploaded file
+    detail: str
+
+class CardImportResult(BaseModel):
+    inserted: int
+    duplicates: int  # Valid rows skipped because the deck already has the card
+    rejected_count: int
+    rejected: List[RejectedRow]  # First IMPORT_MAX_REPORTED_ERRORS rejections
+    elapsed_ms: float
@@ -1,7 +1,7 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 from typing import Optional
-from app.schemas.card import CardResponse
+from app.schemas.card import CardCreate, CardResponse
 
 class ReviewCreate(BaseModel):
     user_id: int
@@ -15,6 +15,7 @@ class ProgressResponse(BaseModel):
     confidence_score: float
     review_count: int
     last_reviewed_at: Optional[datetime]
+    next_due_at: Optional[datetime] = None
     
     model_config = ConfigDict(from_attributes=True)
 
@@ -24,3 +25,27 @@ class CardWithProgress(BaseModel):
     progress: Optional[ProgressResponse] = None
     
     model_config = ConfigDict(from_attributes=True)
+
+class ReviewResult(BaseModel):
+    """Outcome of one item in a batch of reviews"""
+    index: int
+    status: str  # "ok" or "error"
+    detail: Optional[str] = None
+    progress: Optional[ProgressResponse] = None
+
+class ReviewAck(BaseModel):
+    """Acknowledgment of a review queued for the write-behind writer"""
+    status: str  # "queued"
+    reviewed_at: datetime
+    queue_depth: int
+
+class ProgressRecord(BaseModel):
+    """A user's progress on one card as written by deck export"""
+    confidence_score: float = Field(ge=0.0, le=1.0)
+    review_count: int = Field(ge=0)
+    last_reviewed_at: Optional[datetime] = None
+    next_due_at: Optional[datetime] = None
+
+class CardImportRow(CardCreate):
+    """One imported card, optionally carrying exported progress"""
+    progress: Optional[ProgressRecord] = None
@@ -0,0 +1,40 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from app.config import STUDY_SESSION_MAX_CARDS
+from app.schemas.card import CardResponse
+
+class StudySessionCreate(BaseModel):
+    mode: str = Field("learn", pattern="^(learn|recap)$")
+    deck_id: Optional[int] = None
+    size: int = Field(STUDY_SESSION_MAX_CARDS, ge=1, le=STUDY_SESSION_MAX_CARDS)  # Cards queued
+
+class StudySessionResponse(BaseModel):
+    session_id: str
+    user_id: int
+    deck_id: Optional[int]
+    mode: str
+    card_count: int
+    ttl_seconds: float  # Idle time after which the session is ended and written
+
+class StudySessionCard(BaseModel):
+    """The next card of a session, with the session's view of its confidence"""
+    card: CardResponse
+    confidence: Optional[float]  # None: not reviewed yet
+    remaining: int  # Cards left in the queue after this one
+
+class StudySessionReview(BaseModel):
+    card_id: int
+    confidence: float  # 0.0 to 1.0
+
+class StudySessionReviewResult(BaseModel):
+    card_id: int
+    confidence: float  # Score after this review, not yet written
+    requeued: bool  # Still below the learn threshold: the card comes round again
+    remaining: int
+
+class StudySessionSummary(BaseModel):
+    """Reviews written when the session ended"""
+    session_id: str
+    reviews: int
+    written: int
+    rejected: int  # Cards removed since the session started (e.g. merged by dedupe)
@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import List
+
+class HistogramBucket(BaseModel):
+    lower: float  # Inclusive
+    upper: float  # Exclusive, except for the last bucket
+    count: int
+
+class DeckStats(BaseModel):
+    """A user's mastery of one deck"""
+    deck_id: int
+    title: str
+    total_cards: int
+    unseen: int
+    learning: int  # Reviewed, confidence below the learn threshold
+    recap: int     # Confidence at or above the recap threshold
+    histogram: List[HistogramBucket]  # Reviewed cards by confidence
@@ -0,0 +1,27 @@
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+from typing import Optional
+
+class SubscriptionCreate(BaseModel):
+    deck_id: int
+
+class SubscriptionResponse(BaseModel):
+    user_id: int
+    deck_id: int
+    created_at: datetime
+    
+    model_config = ConfigDict(from_attributes=True)
+
+class CardOverrideUpdate(BaseModel):
+    """Personal edit of a shared card; fields left out keep the card's own text"""
+    question: Optional[str] = None
+    answer: Optional[str] = None
+
+class CardOverrideResponse(BaseModel):
+    user_id: int
+    card_id: int
+    question: Optional[str]  # None: the card's own question
+    answer: Optional[str]
+    updated_at: datetime
+    
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import List
+from app.schemas.card import CardResponse
+from app.schemas.deck import DeckResponse
+from app.schemas.progress import ProgressResponse
+from app.schemas.subscription import CardOverrideResponse
+
+class DeletionResponse(BaseModel):
+    """A row the client should drop; a dropped card takes its progress and override with it"""
+    kind: str  # card, override (id is the card's) or subscription (id is the deck's)
+    id: int
+    deleted_at: datetime
+
+class SyncResponse(BaseModel):
+    """Rows created or changed since the request's token; pass `token` next time"""
+    token: str
+    decks: List[DeckResponse]
+    cards: List[CardResponse]
+    progress: List[ProgressResponse]  # The user's progress rows
+    overrides: List[CardOverrideResponse]  # The user's personal edits of cards
+    deleted: List[DeletionResponse]  # Since the token only; apply before the rows above
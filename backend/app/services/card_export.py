@@ -0,0 +1,97 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+from sqlalchemy import and_, select
+from sqlalchemy.orm import Session
+from app.models import Card, Deck, UserCardProgress
+from app.config import EXPORT_GZIP_LEVEL, STREAM_BATCH_SIZE
+
+EXPORT_FORMATS = ("jsonl", "csv")
+EXPORT_MEDIA_TYPES = {"jsonl": "application/x-ndjson", "csv": "text/csv"}
+
+CARD_FIELDS = ["question", "answer"]
+PROGRESS_FIELDS = ["confidence_score", "review_count", "last_reviewed_at", "next_due_at"]
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+def _rows(db: Session, deck_id: int, user_id: Optional[int]):
+    """Server-side cursor over the deck's cards (and the user's progress)"""
+    columns = [Card.question, Card.answer]
+    if user_id is not None:
+        columns += [getattr(UserCardProgress, field) for field in PROGRESS_FIELDS]
+    query = select(*columns).where(Card.deck_id == deck_id).order_by(Card.id)
+    if user_id is not None:
+        query = query.outerjoin(
+            UserCardProgress,
+            and_(
+                UserCardProgress.card_id == Card.id,
+                UserCardProgress.user_id == user_id
+            )
+        )
+    return db.execute(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+
+def _jsonl_chunks(db: Session, deck: dict, user_id: Optional[int]) -> Iterator[str]:
+    yield json.dumps({"type": "deck", **deck, "user_id": user_id}) + "\n"
+    for partition in _rows(db, deck["id"], user_id).partitions():
+        lines = []
+        for row in partition:
+            record = {"type": "card", "question": row.question, "answer": row.answer}
+            if user_id is not None and row.confidence_score is not None:
+                record["progress"] = {
+                    "confidence_score": row.confidence_score,
+                    "review_count": row.review_count,
+                    "last_reviewed_at": _isoformat(row.last_reviewed_at),
+                    "next_due_at": _isoformat(row.next_due_at),
+                }
+            lines.append(json.dumps(record))
+        yield "\n".join(lines) + "\n"
+
+def _csv_chunks(db: Session, deck: dict, user_id: Optional[int]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CARD_FIELDS + (PROGRESS_FIELDS if user_id is not None else []))
+    for partition in _rows(db, deck["id"], user_id).partitions():
+        for row in partition:
+            writer.writerow(
+                _isoformat(value) if isinstance(value, datetime) else value
+                for value in row
+            )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _gzip(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(EXPORT_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def export_deck(
+    db: Session,
+    deck: Deck,
+    user_id: Optional[int],
+    fmt: str,
+    compress: bool
+):
+    """
+    Build a `produce` callable for streaming.session_stream that writes the
+    deck as JSON-lines (a deck header line, then one line per card) or CSV
+    (one row per card), with the user's progress when `user_id` is given.
+    The output is accepted unchanged by services.card_import.
+    """
+    meta = {"id": deck.id, "title": deck.title, "description": deck.description}
+    chunks = _jsonl_chunks if fmt == "jsonl" else _csv_chunks
+    
+    def produce(stream_db: Session) -> Iterator[bytes]:
+        encoded = (chunk.encode() for chunk in chunks(stream_db, meta, user_id))
+        return _gzip(encoded) if compress else encoded
+    
+    return produce
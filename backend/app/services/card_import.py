@@ -0,0 +1,205 @@
+import csv
+import gzip
+import io
+import json
+import time
+import zlib
+from collections import Counter
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from app.database import run_blocking
+from app.models import Card, UserCardProgress
+from app.models.card import content_hash
+from app.schemas import CardImportRow, CardImportResult, RejectedRow
+from app.config import IMPORT_CHUNK_SIZE, IMPORT_MAX_REPORTED_ERRORS
+from app.services.deck_stats import apply_stats_deltas, confidence_bucket
+
+IMPORT_FORMATS = ("csv", "jsonl")
+GZIP_MAGIC = b"\x1f\x8b"
+PROGRESS_COLUMNS = ("confidence_score", "review_count", "last_reviewed_at", "next_due_at")
+
+class ImportFormatError(ValueError):
+    """The upload cannot be parsed at all (as opposed to a single bad row)"""
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    name = (filename or "").lower()
+    if name.endswith(".gz"):
+        name = name[:-len(".gz")]
+    if name.endswith(".csv") or content_type == "text/csv":
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")) or content_type in (
+        "application/x-ndjson", "application/jsonl"
+    ):
+        return "jsonl"
+    return None
+
+def _read_csv(text: io.TextIOBase) -> Iterator[Tuple[int, object]]:
+    reader = csv.DictReader(text)
+    if not reader.fieldnames or not {"question", "answer"} <= set(reader.fieldnames):
+        raise ImportFormatError("CSV header must include question and answer columns")
+    has_progress = "confidence_score" in reader.fieldnames
+    for record in reader:
+        row = {"question": record["question"], "answer": record["answer"]}
+        # Progress columns written by deck export; empty for unseen cards
+        if has_progress and record.get("confidence_score"):
+            row["progress"] = {
+                column: record.get(column) or None for column in PROGRESS_COLUMNS
+            }
+        yield reader.line_num, row
+
+def _read_jsonl(text: io.TextIOBase) -> Iterator[Tuple[int, object]]:
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield line_number, exc
+            continue
+        # Deck header line written by deck export
+        if isinstance(record, dict) and record.get("type") == "deck":
+            continue
+        yield line_number, record
+
+def _open_upload(upload: BinaryIO) -> BinaryIO:
+    """Transparently decompress gzip uploads (e.g. a deck export)"""
+    magic = upload.read(len(GZIP_MAGIC))
+    upload.seek(0)
+    return gzip.GzipFile(fileobj=upload, mode="rb") if magic == GZIP_MAGIC else upload
+
+def _drop_duplicates(db: Session, deck_id: int, rows: List[CardImportRow]) -> Tuple[List[CardImportRow], List[str]]:
+    """Rows whose card is neither in the deck nor earlier in the chunk, and their hashes"""
+    digests = [content_hash(row.question, row.answer) for row in rows]
+    # One lookup on the (deck_id, content_hash) index for the whole chunk
+    seen = set(db.scalars(
+        select(Card.content_hash).where(Card.deck_id == deck_id, Card.content_hash.in_(set(digests)))
+    ))
+    unique_rows, unique_digests = [], []
+    for row, digest in zip(rows, digests):
+        if digest not in seen:
+            seen.add(digest)
+            unique_rows.append(row)
+            unique_digests.append(digest)
+    return unique_rows, unique_digests
+
+def _insert_chunk(db: Session, deck_id: int, rows: List[CardImportRow], user_id: Optional[int]) -> int:
+    """Insert the chunk's new cards, returning how many were inserted"""
+    rows, digests = _drop_duplicates(db, deck_id, rows)
+    if not rows:
+        return 0
+    cards = [
+        {"deck_id": deck_id, "question": row.question, "answer": row.answer, "content_hash": digest}
+        for row, digest in zip(rows, digests)
+    ]
+    if user_id is None or not any(row.progress for row in rows):
+        db.execute(insert(Card), cards)
+        return len(cards)
+    
+    # Restoring progress needs the new card ids, in parameter order
+    card_ids = db.scalars(
+        insert(Card).returning(Card.id, sort_by_parameter_order=True), cards
+    ).all()
+    progress_rows = [
+        {
+            "user_id": user_id,
+            "card_id": card_id,
+            "stats_bucket": confidence_bucket(row.progress.confidence_score),
+            **row.progress.model_dump()
+        }
+        for card_id, row in zip(card_ids, rows) if row.progress
+    ]
+    db.execute(insert(UserCardProgress), progress_rows)
+    apply_stats_deltas(db, Counter(
+        (user_id, deck_id, progress["stats_bucket"]) for progress in progress_rows
+    ))
+    return len(cards)
+
+def _describe(exc: Exception) -> str:
+    if isinstance(exc, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+            for error in exc.errors()
+        )
+    return f"Invalid JSON: {exc}"
+
+def import_cards(
+    db: Session,
+    deck_id: int,
+    upload: BinaryIO,
+    fmt: str,
+    user_id: Optional[int] = None
+) -> CardImportResult:
+    """
+    Parse an uploaded CSV or JSON-lines file (optionally gzip-compressed) as
+    a stream and insert its question/answer pairs into the deck.
+
+    Each record is validated against CardImportRow; invalid records are
+    reported by line number and skipped. Cards the deck already has (or
+    that repeat within the file) are counted as duplicates and skipped.
+    The rest are inserted with one executemany per IMPORT_CHUNK_SIZE rows
+    inside the caller's transaction.
+    Progress written by deck export is restored for `user_id` when given.
+    """
+    started = time.perf_counter()
+    # utf-8-sig drops the byte order mark Excel writes before the header
+    text = io.TextIOWrapper(_open_upload(upload), encoding="utf-8-sig", newline="")
+    records = _read_csv(text) if fmt == "csv" else _read_jsonl(text)
+    
+    inserted = 0
+    valid = 0
+    rejected_count = 0
+    rejected = []
+    
+    def read_chunk() -> List[CardImportRow]:
+        """The next IMPORT_CHUNK_SIZE valid rows (fewer at the end); invalid records are counted"""
+        nonlocal rejected_count
+        chunk = []
+        for line_number, record in records:
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                row = CardImportRow.model_validate(record)
+            except (ValidationError, json.JSONDecodeError) as exc:
+                rejected_count += 1
+                if len(rejected) < IMPORT_MAX_REPORTED_ERRORS:
+                    rejected.append(RejectedRow(line=line_number, detail=_describe(exc)))
+                continue
+            
+            chunk.append(row)
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                break
+        return chunk
+    
+    chunk = []
+    try:
+        while True:
+            # Reading, decompressing and validating block: off the event loop in async mode
+            chunk = run_blocking(read_chunk)
+            if len(chunk) < IMPORT_CHUNK_SIZE:
+                break
+            inserted += _insert_chunk(db, deck_id, chunk, user_id)
+            valid += len(chunk)
+    except UnicodeDecodeError:
+        raise ImportFormatError("File must be UTF-8 encoded")
+    except csv.Error as exc:
+        raise ImportFormatError(f"Malformed CSV: {exc}")
+    except (OSError, EOFError, zlib.error):
+        # zlib.error: a valid gzip header followed by a corrupt deflate stream
+        raise ImportFormatError("Corrupt gzip file")
+    finally:
+        # Leave the upload open; FastAPI closes it after the request
+        text.detach()
+    
+    if chunk:
+        inserted += _insert_chunk(db, deck_id, chunk, user_id)
+        valid += len(chunk)
+    
+    return CardImportResult(
+        inserted=inserted,
+        duplicates=valid - inserted,
+        rejected_count=rejected_count,
+        rejected=rejected,
+        elapsed_ms=(time.perf_counter() - started) * 1000
+    )
@@ -0,0 +1,141 @@
+from bisect import bisect_right
+from collections import Counter
+from functools import reduce
+from operator import add
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import case, delete, func, insert, literal_column, or_, select, update
+from sqlalchemy.orm import Session
+from app.config import CONFIDENCE_THRESHOLD_LEARN, CONFIDENCE_THRESHOLD_RECAP, STATS_HISTOGRAM_BUCKETS
+from app.database import UPSERT_DIALECTS
+from app.models import Card, Deck, UserCardProgress, UserDeckStats
+from app.schemas import DeckStats, HistogramBucket
+from app.services.subscriptions import user_deck_ids
+
+# Upper edges of every bucket but the last. The mode thresholds are edges
+# too, so a bucket is either entirely learning, entirely recap, or neither.
+BUCKET_EDGES = tuple(sorted(
+    {i / STATS_HISTOGRAM_BUCKETS for i in range(1, STATS_HISTOGRAM_BUCKETS)} |
+    {CONFIDENCE_THRESHOLD_LEARN, CONFIDENCE_THRESHOLD_RECAP}
+))
+LEARNING_BUCKETS = range(0, BUCKET_EDGES.index(CONFIDENCE_THRESHOLD_LEARN) + 1)
+RECAP_BUCKETS = range(BUCKET_EDGES.index(CONFIDENCE_THRESHOLD_RECAP) + 1, len(BUCKET_EDGES) + 1)
+
+StatsKey = Tuple[int, int, int]  # (user_id, deck_id, bucket)
+
+def confidence_bucket(confidence: float) -> int:
+    return bisect_right(BUCKET_EDGES, confidence)
+
+def bucket_expression(confidence):
+    """SQL equivalent of confidence_bucket: the number of edges at or below the score"""
+    return reduce(add, [
+        case((confidence >= literal_column(repr(edge)), 1), else_=0) for edge in BUCKET_EDGES
+    ])
+
+def record_bucket_move(
+    deltas: Counter,
+    user_id: int,
+    deck_id: int,
+    old_bucket: Optional[int],
+    new_bucket: int
+) -> None:
+    """Count a card moving from `old_bucket` (None: first review) to `new_bucket`"""
+    if old_bucket == new_bucket:
+        return
+    if old_bucket is not None:
+        deltas[(user_id, deck_id, old_bucket)] -= 1
+    deltas[(user_id, deck_id, new_bucket)] += 1
+
+def apply_stats_deltas(db: Session, deltas: Dict[StatsKey, int]) -> None:
+    """Add the bucket count changes to user_deck_stats with one upsert executemany"""
+    rows = [
+        {"user_id": user_id, "deck_id": deck_id, "bucket": bucket, "card_count": delta}
+        for (user_id, deck_id, bucket), delta in deltas.items() if delta
+    ]
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect not in UPSERT_DIALECTS:
+        raise NotImplementedError(f"Deck stats upsert is not supported on {dialect}")
+    table = UserDeckStats.__table__
+    stmt = UPSERT_DIALECTS[dialect](UserDeckStats)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.deck_id, table.c.bucket],
+            set_={"card_count": table.c.card_count + stmt.excluded.card_count}
+        ),
+        rows
+    )
+
+def rebuild_deck_stats(db: Session) -> int:
+    """
+    Recompute user_deck_stats from user_card_progress with one GROUP BY,
+    inside the caller's transaction. Returns the number of summary rows.
+    """
+    bucket = bucket_expression(UserCardProgress.confidence_score)
+    db.execute(delete(UserDeckStats))
+    # Keep updated_at: the bucket is bookkeeping, not a change clients need to sync
+    db.execute(update(UserCardProgress).values(stats_bucket=bucket, updated_at=UserCardProgress.updated_at))
+    result = db.execute(insert(UserDeckStats).from_select(
+        ["user_id", "deck_id", "bucket", "card_count"],
+        select(
+            UserCardProgress.user_id, Card.deck_id, UserCardProgress.stats_bucket, func.count()
+        ).join(
+            Card, Card.id == UserCardProgress.card_id
+        ).group_by(
+            UserCardProgress.user_id, Card.deck_id, UserCardProgress.stats_bucket
+        )
+    ))
+    return result.rowcount
+
+def _histogram(counts: Dict[int, int]) -> List[HistogramBucket]:
+    bounds = (0.0,) + BUCKET_EDGES + (1.0,)
+    return [
+        HistogramBucket(lower=bounds[index], upper=bounds[index + 1], count=counts.get(index, 0))
+        for index in range(len(bounds) - 1)
+    ]
+
+def user_deck_stats(db: Session, user_id: int, deck_id: Optional[int] = None) -> List[DeckStats]:
+    """
+    Mastery of the given deck, or of every deck the user owns, subscribes
+    to or has reviewed, from the summary table and one card count per deck
+    """
+    decks = select(Deck.id, Deck.title)
+    if deck_id:
+        decks = decks.where(Deck.id == deck_id)
+    else:
+        decks = decks.where(or_(
+            Deck.id.in_(user_deck_ids(user_id)),
+            Deck.id.in_(select(UserDeckStats.deck_id).where(UserDeckStats.user_id == user_id))
+        ))
+    titles = dict(db.execute(decks.order_by(Deck.id)).all())
+    if not titles:
+        return []
+    
+    totals = dict(db.execute(
+        select(Card.deck_id, func.count(Card.id)).where(
+            Card.deck_id.in_(titles)
+        ).group_by(Card.deck_id)
+    ).all())
+    buckets: Dict[int, Dict[int, int]] = {}
+    for row_deck_id, bucket, card_count in db.execute(
+        select(UserDeckStats.deck_id, UserDeckStats.bucket, UserDeckStats.card_count).where(
+            UserDeckStats.user_id == user_id,
+            UserDeckStats.deck_id.in_(titles)
+        )
+    ):
+        buckets.setdefault(row_deck_id, {})[bucket] = card_count
+    
+    stats = []
+    for row_deck_id, title in titles.items():
+        counts = buckets.get(row_deck_id, {})
+        total = totals.get(row_deck_id, 0)
+        stats.append(DeckStats(
+            deck_id=row_deck_id,
+            title=title,
+            total_cards=total,
+            unseen=total - sum(counts.values()),
+            learning=sum(counts.get(bucket, 0) for bucket in LEARNING_BUCKETS),
+            recap=sum(counts.get(bucket, 0) for bucket in RECAP_BUCKETS),
+            histogram=_histogram(counts)
+        ))
+    return stats
@@ -0,0 +1,11 @@
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app.models import Deck
+
+def bump_deck_version(db: Session, deck_id: int) -> None:
+    """Invalidate cached listings of the deck; call inside the write's transaction"""
+    db.execute(
+        # The deck row itself is unchanged, so delta sync need not send it again
+        update(Deck).where(Deck.id == deck_id).values(version=Deck.version + 1, updated_at=Deck.updated_at),
+        execution_options={"synchronize_session": False}
+    )
@@ -0,0 +1,142 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from sqlalchemy import bindparam, delete, func, select, tuple_, update
+from sqlalchemy.orm import Session
+from app.models import Card, CardOverride, ReviewEvent, UserCardProgress
+from app.models.card import content_hash
+from app.services.decks import bump_deck_version
+from app.services.sync import record_deletions
+
+@dataclass
+class DedupeResult:
+    removed: int = 0  # Duplicate cards deleted
+    merged_progress: int = 0  # Progress rows folded into the surviving card's
+    moved_progress: int = 0  # Progress rows handed over to the surviving card
+    hashed: int = 0  # Cards whose content_hash was missing or stale
+
+    def __add__(self, other: "DedupeResult") -> "DedupeResult":
+        return DedupeResult(
+            self.removed + other.removed,
+            self.merged_progress + other.merged_progress,
+            self.moved_progress + other.moved_progress,
+            self.hashed + other.hashed
+        )
+
+def _merge_progress(survivor: UserCardProgress, duplicate: UserCardProgress) -> None:
+    """Fold a duplicate's progress into the survivor's: counts add up, the latest review wins"""
+    survivor.review_count = (survivor.review_count or 0) + (duplicate.review_count or 0)
+    if duplicate.last_reviewed_at and (
+        survivor.last_reviewed_at is None or duplicate.last_reviewed_at > survivor.last_reviewed_at
+    ):
+        survivor.last_reviewed_at = duplicate.last_reviewed_at
+        survivor.confidence_score = duplicate.confidence_score
+        survivor.next_due_at = duplicate.next_due_at
+
+def merge_duplicate_progress(db: Session) -> int:
+    """
+    Fold progress rows of the same (user, card) into the oldest one, inside
+    the caller's transaction, so the unique index can be built on a database
+    from before it existed. Returns the number of rows merged away.
+    """
+    pairs = select(UserCardProgress.user_id, UserCardProgress.card_id).group_by(
+        UserCardProgress.user_id, UserCardProgress.card_id
+    ).having(func.count() > 1)
+    rows = db.query(UserCardProgress).filter(
+        tuple_(UserCardProgress.user_id, UserCardProgress.card_id).in_(pairs)
+    ).order_by(UserCardProgress.id).all()
+    kept: Dict[tuple, UserCardProgress] = {}
+    merged = 0
+    for row in rows:
+        survivor = kept.setdefault((row.user_id, row.card_id), row)
+        if survivor is not row:
+            _merge_progress(survivor, row)
+            db.delete(row)
+            merged += 1
+    db.flush()
+    return merged
+
+def dedupe_deck(db: Session, deck_id: int) -> DedupeResult:
+    """
+    Merge cards of the deck with the same content_hash into the oldest one,
+    inside the caller's transaction. Progress, review events and overrides
+    of the duplicates move to the surviving card, and each duplicate gets a
+    tombstone for delta sync; missing hashes are filled in.
+    Deck stats are not touched; rebuild them afterwards.
+    """
+    result = DedupeResult()
+    survivors: Dict[str, int] = {}
+    duplicate_of: Dict[int, int] = {}
+    hashes: List[dict] = []
+    for card_id, question, answer, stored in db.execute(
+        select(Card.id, Card.question, Card.answer, Card.content_hash).where(
+            Card.deck_id == deck_id
+        ).order_by(Card.id)
+    ):
+        digest = content_hash(question, answer)
+        if digest in survivors:
+            duplicate_of[card_id] = survivors[digest]
+            continue
+        survivors[digest] = card_id
+        if stored != digest:
+            hashes.append({"b_id": card_id, "b_hash": digest})
+
+    if duplicate_of:
+        progress = db.query(UserCardProgress).filter(
+            UserCardProgress.card_id.in_(set(duplicate_of) | set(duplicate_of.values()))
+        ).order_by(UserCardProgress.card_id).all()
+        kept = {(row.user_id, row.card_id): row for row in progress if row.card_id not in duplicate_of}
+        for row in progress:
+            if row.card_id not in duplicate_of:
+                continue
+            survivor_id = duplicate_of[row.card_id]
+            existing: Optional[UserCardProgress] = kept.get((row.user_id, survivor_id))
+            if existing is None:
+                row.card_id = survivor_id
+                kept[(row.user_id, survivor_id)] = row
+                result.moved_progress += 1
+            else:
+                _merge_progress(existing, row)
+                db.delete(row)
+                result.merged_progress += 1
+        
+        # A user's override moves with their progress, unless they already edited the survivor
+        overrides = db.query(CardOverride).filter(
+            CardOverride.card_id.in_(set(duplicate_of) | set(duplicate_of.values()))
+        ).order_by(CardOverride.card_id).all()
+        edited = {(row.user_id, row.card_id) for row in overrides if row.card_id not in duplicate_of}
+        for row in overrides:
+            if row.card_id not in duplicate_of:
+                continue
+            survivor_id = duplicate_of[row.card_id]
+            if (row.user_id, survivor_id) in edited:
+                db.delete(row)
+            else:
+                row.card_id = survivor_id
+                edited.add((row.user_id, survivor_id))
+        db.flush()
+
+        events = ReviewEvent.__table__
+        db.execute(
+            update(events).where(events.c.card_id == bindparam("b_from")).values(card_id=bindparam("b_to")),
+            [{"b_from": duplicate, "b_to": survivor} for duplicate, survivor in duplicate_of.items()]
+        )
+        db.execute(
+            delete(Card).where(Card.id.in_(duplicate_of)),
+            execution_options={"synchronize_session": False}
+        )
+        # Synced clients drop the duplicates (and their progress and overrides)
+        record_deletions(db, "card", duplicate_of, deck_id=deck_id)
+        result.removed = len(duplicate_of)
+
+    # After the deletes, so a stale hash cannot collide with a duplicate's
+    if hashes:
+        cards = Card.__table__
+        db.execute(
+            update(cards).where(cards.c.id == bindparam("b_id")).values(content_hash=bindparam("b_hash")),
+            hashes
+        )
+        result.hashed = len(hashes)
+
+    if result.removed or result.hashed:
+        bump_deck_version(db, deck_id)
+    return result
@@ -0,0 +1,262 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+from app.config import (
+    CONFIDENCE_THRESHOLD_LEARN,
+    CONFIDENCE_THRESHOLD_RECAP,
+    PROGRESS_CACHE_MAX_BYTES,
+    PROGRESS_CACHE_TTL_SECONDS
+)
+from app.database import reads_replica
+from app.models import Card, UserCardProgress
+from app.services.subscriptions import user_deck_ids
+
+UNSEEN = float("nan")  # Confidence placeholder for cards without progress
+
+CacheKey = Tuple[int, Optional[int]]  # (user_id, deck_id); deck_id None = all decks
+
+class ProgressSnapshot:
+    """
+    Compact view of one user's cards: ids in ascending order and the matching
+    confidence scores (NaN for unseen) in two typed arrays, 16 bytes per card.
+    """
+    __slots__ = ("card_ids", "confidences", "created_at")
+
+    OVERHEAD_BYTES = 256  # Rough per-entry cost of the key, arrays and slots
+
+    def __init__(self, rows: Iterable[Tuple[int, Optional[float]]]):
+        self.card_ids = array("q")
+        self.confidences = array("d")
+        for card_id, confidence in rows:
+            self.card_ids.append(card_id)
+            self.confidences.append(UNSEEN if confidence is None else confidence)
+        self.created_at = time.monotonic()
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            self.OVERHEAD_BYTES +
+            self.card_ids.itemsize * len(self.card_ids) +
+            self.confidences.itemsize * len(self.confidences)
+        )
+
+    def update(self, card_id: int, confidence: float) -> None:
+        index = bisect_left(self.card_ids, card_id)
+        if index < len(self.card_ids) and self.card_ids[index] == card_id:
+            self.confidences[index] = confidence
+
+    def confidence(self, card_id: int) -> float:
+        """The card's confidence; NaN if it is unseen or not in the snapshot"""
+        index = bisect_left(self.card_ids, card_id)
+        if index < len(self.card_ids) and self.card_ids[index] == card_id:
+            return self.confidences[index]
+        return UNSEEN
+
+    def select(self, mode: str, after_id: Optional[int], limit: Optional[int]) -> List[int]:
+        """Card ids matching the mode, in id order, after the cursor"""
+        start = bisect_right(self.card_ids, after_id) if after_id is not None else 0
+        selected = []
+        for index in range(start, len(self.card_ids)):
+            confidence = self.confidences[index]
+            if mode == "learn":
+                # NaN != NaN marks an unseen card
+                matches = confidence != confidence or confidence < CONFIDENCE_THRESHOLD_LEARN
+            else:
+                matches = confidence >= CONFIDENCE_THRESHOLD_RECAP
+            if matches:
+                selected.append(self.card_ids[index])
+                if limit is not None and len(selected) == limit:
+                    break
+        return selected
+
+class ProgressCache:
+    """
+    In-process LRU cache of ProgressSnapshot keyed by (user_id, deck_id),
+    bounded by the approximate bytes held by all snapshots.
+
+    Reviews update cached snapshots in place; new cards invalidate every
+    snapshot that could contain them. Entries also expire after a TTL so
+    that writes handled by other worker processes are picked up. Scopes too
+    large to snapshot are remembered for the TTL, so listings go straight
+    to SQL instead of loading them again.
+    """
+
+    def __init__(self, max_bytes: int = PROGRESS_CACHE_MAX_BYTES, ttl: float = PROGRESS_CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[CacheKey, ProgressSnapshot]" = OrderedDict()
+        self._user_keys: Dict[int, Set[CacheKey]] = {}
+        self._oversized: Dict[CacheKey, float] = {}  # Scope -> monotonic expiry
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_id: int, deck_id: Optional[int]) -> Optional[ProgressSnapshot]:
+        key = (user_id, deck_id)
+        with self._lock:
+            snapshot = self._entries.get(key)
+            if snapshot is not None and time.monotonic() - snapshot.created_at > self.ttl:
+                self._remove(key)
+                snapshot = None
+            if snapshot is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return snapshot
+
+    def put(self, user_id: int, deck_id: Optional[int], snapshot: ProgressSnapshot) -> None:
+        if snapshot.nbytes > self.max_bytes:
+            return
+        key = (user_id, deck_id)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = snapshot
+            self._user_keys.setdefault(user_id, set()).add(key)
+            self._bytes += snapshot.nbytes
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def mark_oversized(self, user_id: int, deck_id: Optional[int]) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._oversized[(user_id, deck_id)] = now + self.ttl
+            if len(self._oversized) > 1024:
+                # Drop expired marks so the map only holds recent scopes
+                self._oversized = {key: expiry for key, expiry in self._oversized.items() if expiry > now}
+
+    def is_oversized(self, user_id: int, deck_id: Optional[int]) -> bool:
+        with self._lock:
+            expiry = self._oversized.get((user_id, deck_id))
+        return expiry is not None and expiry > time.monotonic()
+
+    def record_review(self, user_id: int, card_id: int, confidence: float) -> None:
+        """Write-through: apply a committed review to the user's snapshots"""
+        with self._lock:
+            for key in self._user_keys.get(user_id, ()):
+                self._entries[key].update(card_id, confidence)
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drop the user's all-decks snapshot after the set of decks changes"""
+        with self._lock:
+            # Fewer decks may fit in a snapshot again
+            self._oversized.pop((user_id, None), None)
+            if (user_id, None) in self._entries:
+                self._remove((user_id, None))
+                self.invalidations += 1
+
+    def invalidate_deck(self, deck_id: int) -> None:
+        """Drop snapshots that could miss a card newly added to the deck"""
+        with self._lock:
+            stale = [key for key in self._entries if key[1] in (deck_id, None)]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+            self._oversized.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, key: CacheKey) -> None:
+        snapshot = self._entries.pop(key)
+        self._bytes -= snapshot.nbytes
+        user_keys = self._user_keys[key[0]]
+        user_keys.discard(key)
+        if not user_keys:
+            del self._user_keys[key[0]]
+
+progress_cache = ProgressCache()
+
+def _scope_query(user_id: int, deck_id: Optional[int]):
+    """Ids and confidences of the scope's cards in id order"""
+    # Single LEFT OUTER JOIN: unseen cards come back with a NULL score.
+    # Two plain columns, so skip the ORM and read them on the Core connection.
+    query = select(Card.id, UserCardProgress.confidence_score).outerjoin(
+        UserCardProgress,
+        and_(
+            UserCardProgress.card_id == Card.id,
+            UserCardProgress.user_id == user_id
+        )
+    )
+    if deck_id:
+        query = query.where(Card.deck_id == deck_id)
+    else:
+        # Every deck the user owns or subscribes to
+        query = query.where(Card.deck_id.in_(user_deck_ids(user_id)))
+    return query.order_by(Card.id)
+
+def load_snapshot(
+    db: Session,
+    user_id: int,
+    deck_id: Optional[int],
+    max_cards: Optional[int] = None
+) -> Optional[ProgressSnapshot]:
+    """
+    Ids and confidences of every card in scope, cached per (user, deck).
+    A snapshot read from a replica is used for this request only: cached, a
+    lagging replica's view would outlive the lag by up to the TTL.
+
+    With `max_cards`, a miss returns None instead of loading a snapshot that
+    would not pay off: the scope has more cards than that, or the session
+    reads a replica so the snapshot could not be cached. The caller then
+    filters in SQL.
+    """
+    snapshot = progress_cache.get(user_id, deck_id)
+    if snapshot is not None:
+        return snapshot
+    if max_cards is not None and (reads_replica(db) or progress_cache.is_oversized(user_id, deck_id)):
+        return None
+    
+    query = _scope_query(user_id, deck_id)
+    if max_cards is not None:
+        # One row past the cap tells an oversized scope without reading all of it
+        query = query.limit(max_cards + 1)
+    rows = db.connection().execute(query).all()
+    if max_cards is not None and len(rows) > max_cards:
+        progress_cache.mark_oversized(user_id, deck_id)
+        return None
+    
+    snapshot = ProgressSnapshot(rows)
+    if not reads_replica(db):
+        progress_cache.put(user_id, deck_id, snapshot)
+    return snapshot
+
+def load_selection(db: Session, user_id: int, deck_id: Optional[int], mode: str, limit: int) -> ProgressSnapshot:
+    """
+    The first `limit` cards of the scope matching the mode, filtered in SQL,
+    as an uncached snapshot: for a scope load_snapshot declines to load.
+    """
+    query = _scope_query(user_id, deck_id)
+    if mode == "learn":
+        query = query.where(or_(
+            UserCardProgress.id.is_(None),
+            UserCardProgress.confidence_score < CONFIDENCE_THRESHOLD_LEARN
+        ))
+    else:
+        query = query.where(UserCardProgress.confidence_score >= CONFIDENCE_THRESHOLD_RECAP)
+    return ProgressSnapshot(db.connection().execute(query.limit(limit)))
@@ -0,0 +1,213 @@
+"""
+Bulk rescoring: recompute every confidence score from review_events after
+REVIEW_WEIGHT_HISTORY / REVIEW_WEIGHT_NEW change.
+
+Folding a card's ratings x0..x(n-1) with weighted_confidence gives
+
+    confidence = h^(n-1) * x0 + sum(k = 1..n-1) w * h^(n-1-k) * xk
+
+for h = weight of history and w = weight of the new rating, so each card's
+score is a weighted sum of its ratings. Events are read in (user, card,
+time) order in chunks of whole cards, the sums are taken with NumPy, and
+the results are written back with one executemany UPDATE per chunk. User
+ranges are rescored in parallel worker processes.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import numpy as np
+from sqlalchemy import and_, bindparam, func, or_, select, update
+from sqlalchemy.engine import Engine
+from app.config import (
+    REVIEW_WEIGHT_HISTORY,
+    REVIEW_WEIGHT_NEW,
+    SCHEDULE_MIN_INTERVAL_HOURS,
+    SCHEDULE_MAX_INTERVAL_DAYS,
+    SCHEDULE_REVIEW_COUNT_BONUS,
+    RESCORE_CHUNK_SIZE
+)
+from app.database import create_db_engine
+from app.models import ReviewEvent, UserCardProgress
+
+@dataclass
+class RescoreResult:
+    events: int = 0
+    updated: int = 0  # Progress rows rewritten
+    skipped: int = 0  # Cards whose history is incomplete (reviewed before review_events)
+    elapsed: float = 0.0
+
+    def __add__(self, other: "RescoreResult") -> "RescoreResult":
+        return RescoreResult(
+            self.events + other.events,
+            self.updated + other.updated,
+            self.skipped + other.skipped,
+            max(self.elapsed, other.elapsed)
+        )
+
+def score_events(
+    user_ids: np.ndarray,
+    card_ids: np.ndarray,
+    ratings: np.ndarray,
+    weight_history: float = REVIEW_WEIGHT_HISTORY,
+    weight_new: float = REVIEW_WEIGHT_NEW
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Confidence of every (user, card) run in events sorted by user, card and
+    time. Returns the start index of each run, its length and its score.
+    """
+    boundary = np.empty(len(user_ids), dtype=bool)
+    boundary[0] = True
+    boundary[1:] = (user_ids[1:] != user_ids[:-1]) | (card_ids[1:] != card_ids[:-1])
+    starts = np.flatnonzero(boundary)
+    lengths = np.diff(np.append(starts, len(user_ids)))
+
+    position = np.arange(len(user_ids)) - np.repeat(starts, lengths)
+    later_reviews = np.repeat(lengths, lengths) - 1 - position
+    weights = np.power(weight_history, later_reviews)
+    weights[position > 0] *= weight_new
+    return starts, lengths, np.add.reduceat(ratings * weights, starts)
+
+def due_dates(confidences: np.ndarray, review_counts: np.ndarray, last_reviewed: np.ndarray) -> np.ndarray:
+    """Vectorized services.scheduling.next_due_at"""
+    max_hours = SCHEDULE_MAX_INTERVAL_DAYS * 24
+    hours = SCHEDULE_MIN_INTERVAL_HOURS * (max_hours / SCHEDULE_MIN_INTERVAL_HOURS) ** confidences
+    hours *= 1 + SCHEDULE_REVIEW_COUNT_BONUS * np.maximum(review_counts - 1, 0)
+    micros = np.round(np.minimum(hours, max_hours) * 3600e6).astype("timedelta64[us]")
+    return last_reviewed + micros
+
+def _read_chunk(engine: Engine, first_user: int, last_user: int, after: Optional[Tuple[int, int]], limit: Optional[int]):
+    query = select(
+        ReviewEvent.user_id, ReviewEvent.card_id, ReviewEvent.confidence, ReviewEvent.reviewed_at
+    ).where(ReviewEvent.user_id.between(first_user, last_user))
+    if after is not None:
+        query = query.where(or_(
+            ReviewEvent.user_id > after[0],
+            and_(ReviewEvent.user_id == after[0], ReviewEvent.card_id > after[1])
+        ))
+    query = query.order_by(
+        ReviewEvent.user_id, ReviewEvent.card_id, ReviewEvent.reviewed_at, ReviewEvent.id
+    )
+    with engine.connect() as conn:
+        return conn.execute(query.limit(limit) if limit else query).all()
+
+def _read_card(engine: Engine, user_id: int, card_id: int):
+    query = select(
+        ReviewEvent.user_id, ReviewEvent.card_id, ReviewEvent.confidence, ReviewEvent.reviewed_at
+    ).where(
+        ReviewEvent.user_id == user_id, ReviewEvent.card_id == card_id
+    ).order_by(ReviewEvent.reviewed_at, ReviewEvent.id)
+    with engine.connect() as conn:
+        return conn.execute(query).all()
+
+_progress = UserCardProgress.__table__
+# Only rows whose review count matches the history: older reviews are not in review_events
+_UPDATE_PROGRESS = update(_progress).where(
+    _progress.c.user_id == bindparam("b_user_id"),
+    _progress.c.card_id == bindparam("b_card_id"),
+    _progress.c.review_count == bindparam("b_review_count")
+).values(
+    confidence_score=bindparam("b_confidence"),
+    next_due_at=bindparam("b_next_due_at")
+)
+
+def _rescore_rows(engine: Engine, rows, weight_history: float, weight_new: float) -> RescoreResult:
+    user_ids, card_ids, ratings, reviewed_at = zip(*rows)
+    user_ids = np.array(user_ids, dtype=np.int64)
+    card_ids = np.array(card_ids, dtype=np.int64)
+    starts, lengths, confidences = score_events(
+        user_ids, card_ids, np.array(ratings, dtype=np.float64), weight_history, weight_new
+    )
+    last_reviewed = np.array(reviewed_at, dtype="datetime64[us]")[starts + lengths - 1]
+    due = due_dates(confidences, lengths, last_reviewed).astype(object)
+
+    with engine.begin() as conn:
+        result = conn.execute(_UPDATE_PROGRESS, [
+            {
+                "b_user_id": int(user_id),
+                "b_card_id": int(card_id),
+                "b_review_count": int(length),
+                "b_confidence": float(confidence),
+                "b_next_due_at": next_due,
+            }
+            for user_id, card_id, length, confidence, next_due in zip(
+                user_ids[starts], card_ids[starts], lengths, confidences, due
+            )
+        ])
+    return RescoreResult(events=len(rows), updated=result.rowcount, skipped=len(starts) - result.rowcount)
+
+def rescore_user_range(
+    database_url: str,
+    first_user: int,
+    last_user: int,
+    chunk_size: int = RESCORE_CHUNK_SIZE,
+    weight_history: float = REVIEW_WEIGHT_HISTORY,
+    weight_new: float = REVIEW_WEIGHT_NEW
+) -> RescoreResult:
+    """
+    Rescore the cards of users first_user..last_user, about chunk_size
+    events at a time. Runs in a worker process with an engine of its own.
+    """
+    started = time.perf_counter()
+    engine = create_db_engine(database_url)
+    total = RescoreResult()
+    after = None
+    try:
+        while True:
+            rows = _read_chunk(engine, first_user, last_user, after, chunk_size)
+            if not rows:
+                break
+            if len(rows) == chunk_size:
+                # The last card may continue in the next chunk: leave it for then
+                last = (rows[-1].user_id, rows[-1].card_id)
+                complete = [row for row in rows if (row.user_id, row.card_id) != last]
+                rows = complete or _read_card(engine, *last)
+            after = (rows[-1].user_id, rows[-1].card_id)
+            total += _rescore_rows(engine, rows, weight_history, weight_new)
+    finally:
+        engine.dispose()
+    total.elapsed = time.perf_counter() - started
+    return total
+
+def user_ranges(first_user: int, last_user: int, parts: int) -> List[Tuple[int, int]]:
+    """Split first_user..last_user into at most `parts` contiguous ranges"""
+    size = max(1, -(-(last_user - first_user + 1) // parts))
+    return [
+        (start, min(start + size - 1, last_user))
+        for start in range(first_user, last_user + 1, size)
+    ]
+
+def rescore_all(
+    database_url: str,
+    workers: int = 1,
+    chunk_size: int = RESCORE_CHUNK_SIZE,
+    weight_history: float = REVIEW_WEIGHT_HISTORY,
+    weight_new: float = REVIEW_WEIGHT_NEW
+) -> RescoreResult:
+    """
+    Rescore every user's cards, in `workers` processes. Deck stats buckets
+    are not touched; rebuild them afterwards (the thresholds may have moved).
+    """
+    started = time.perf_counter()
+    engine = create_db_engine(database_url)
+    with engine.connect() as conn:
+        first_user, last_user = conn.execute(
+            select(func.min(ReviewEvent.user_id), func.max(ReviewEvent.user_id))
+        ).one()
+    engine.dispose()
+    if first_user is None:
+        return RescoreResult()
+
+    # Several ranges per worker so one busy range does not hold up the rest
+    ranges = user_ranges(first_user, last_user, workers * 4)
+    args = [(database_url, first, last, chunk_size, weight_history, weight_new) for first, last in ranges]
+    total = RescoreResult()
+    if workers <= 1:
+        for range_args in args:
+            total += rescore_user_range(*range_args)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for result in pool.map(rescore_user_range, *zip(*args)):
+                total += result
+    total.elapsed = time.perf_counter() - started
+    return total
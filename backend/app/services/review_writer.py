@@ -0,0 +1,214 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Optional
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+from app.config import (
+    REVIEW_WRITER_FLUSH_SIZE,
+    REVIEW_WRITER_FLUSH_INTERVAL_SECONDS,
+    REVIEW_WRITER_QUEUE_SIZE,
+    REVIEW_WRITER_RETRY_MAX_SECONDS
+)
+from app.database import SessionLocal, run_blocking
+from app.models import PendingReview, ReviewEvent
+from app.schemas import ReviewCreate
+from app.services.progress_cache import progress_cache
+from app.services.reviews import apply_review_batch
+from app.services.scheduling import utcnow
+
+logger = logging.getLogger(__name__)
+
+class ReviewQueueFull(Exception):
+    """The writer is behind by REVIEW_WRITER_QUEUE_SIZE reviews"""
+
+class ReviewWriter:
+    """
+    Write-behind writer for reviews: requests commit the rating and return,
+    and a background thread folds the ratings into user_card_progress in
+    batched transactions.
+
+    `submit` commits the review_events row together with a pending_reviews
+    marker in the request's session before the request is acknowledged, so an acknowledged review
+    survives a crash. The thread claims up to `flush_size` markers at most
+    `flush_interval` seconds after the first, deletes them and applies the
+    ratings with the review upsert (see apply_review_batch) in one
+    transaction. A failed batch rolls back with its markers and is retried
+    with backoff; markers left by a crash or a failed shutdown are picked up
+    when the writer next starts.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        flush_size: int = REVIEW_WRITER_FLUSH_SIZE,
+        flush_interval: float = REVIEW_WRITER_FLUSH_INTERVAL_SECONDS,
+        max_queued: int = REVIEW_WRITER_QUEUE_SIZE,
+        retry_max: float = REVIEW_WRITER_RETRY_MAX_SECONDS
+    ):
+        self.session_factory = session_factory
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_queued = max_queued
+        self.retry_max = retry_max
+        self._backlog = 0  # Pending markers not yet folded, as far as this process knows
+        self._changed = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self.written = 0
+        self.rejected = 0
+        self.failed = 0
+        self.batches = 0
+
+    def submit(self, db: Session, review: ReviewCreate) -> datetime:
+        """
+        Commit a review's event and pending marker in `db`, starting the
+        writer if needed; returns its review time
+        """
+        if self.depth >= self.max_queued:
+            raise ReviewQueueFull()
+        if not self.running:
+            # start() counts leftovers through a sync session, under the lock
+            run_blocking(self.start)
+        reviewed_at = utcnow()
+        event = ReviewEvent(
+            user_id=review.user_id,
+            card_id=review.card_id,
+            confidence=review.confidence,
+            reviewed_at=reviewed_at
+        )
+        db.add(event)
+        db.flush()
+        db.add(PendingReview(event_id=event.id))
+        db.commit()
+        with self._changed:
+            self._backlog += 1
+            self._changed.notify_all()
+        return reviewed_at
+
+    @property
+    def depth(self) -> int:
+        return self._backlog
+
+    @property
+    def running(self) -> bool:
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+    def start(self) -> None:
+        with self._lock:
+            if not self.running:
+                # Markers left by a crash or an earlier failed shutdown; counted
+                # before this process submits anything, so none is counted twice
+                with self.session_factory() as db:
+                    leftover = db.scalar(select(func.count()).select_from(PendingReview))
+                with self._changed:
+                    self._backlog = leftover
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="review-writer", daemon=True)
+                self._thread.start()
+
+    def flush(self) -> None:
+        """Block until every review submitted so far has been folded"""
+        with self._changed:
+            self._changed.wait_for(lambda: not self._backlog)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Fold the backlog and stop the writer thread"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            self._stopping.set()
+            with self._changed:
+                self._changed.notify_all()
+            thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.depth,
+            "written": self.written,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
+
+    def _run(self) -> None:
+        retry_delay = self.flush_interval
+        while True:
+            self._wait_for_batch()
+            with self._changed:
+                if not self._backlog and self._stopping.is_set():
+                    return
+            try:
+                self._write()
+                retry_delay = self.flush_interval
+            except Exception:
+                self.failed += 1
+                if self._stopping.is_set():
+                    logger.exception("Review writer stopped with %d reviews pending", self._backlog)
+                    return
+                logger.exception("Review writer batch failed; retrying in %.2fs", retry_delay)
+                self._stopping.wait(retry_delay)
+                retry_delay = min(retry_delay * 2, self.retry_max)
+
+    def _wait_for_batch(self) -> None:
+        """Wait for one review, then for more until the batch is full or the interval ends"""
+        with self._changed:
+            while not self._backlog and not self._stopping.is_set():
+                self._changed.wait(self.flush_interval)
+            deadline = time.monotonic() + self.flush_interval
+            while self._backlog < self.flush_size and not self._stopping.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._changed.wait(remaining)
+
+    def _write(self) -> None:
+        """Claim the oldest pending markers and fold their ratings in one transaction"""
+        table = PendingReview.__table__
+        with self.session_factory() as db:
+            try:
+                event_ids = db.scalars(
+                    delete(table).where(table.c.event_id.in_(
+                        select(table.c.event_id).order_by(table.c.event_id).limit(self.flush_size)
+                    )).returning(table.c.event_id)
+                ).all()
+                events = db.scalars(
+                    select(ReviewEvent).where(ReviewEvent.id.in_(event_ids)).order_by(ReviewEvent.id)
+                ).all()
+                reviews = [
+                    ReviewCreate(user_id=event.user_id, card_id=event.card_id, confidence=event.confidence)
+                    for event in events
+                ]
+                results = apply_review_batch(
+                    db, reviews, [event.reviewed_at for event in events], record_events=False
+                )
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+        
+        with self._changed:
+            # Nothing left to claim: whatever is still counted was folded elsewhere
+            self._backlog = max(self._backlog - len(event_ids), 0) if event_ids else 0
+            self._changed.notify_all()
+        if not event_ids:
+            return
+        self.batches += 1
+        for result in results:
+            if result.progress:
+                self.written += 1
+                progress_cache.record_review(
+                    result.progress.user_id,
+                    result.progress.card_id,
+                    result.progress.confidence_score
+                )
+            else:
+                # The card or user was deleted after the review was acknowledged
+                self.rejected += 1
+                logger.warning("Review writer rejected %s: %s", reviews[result.index], result.detail)
+
+review_writer = ReviewWriter()
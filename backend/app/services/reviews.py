@@ -0,0 +1,277 @@
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional, Sequence
+from sqlalchemy import bindparam, insert, or_, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from app.database import UPSERT_DIALECTS
+from app.models import Card, ReviewEvent, User, UserCardProgress
+from app.schemas import ReviewCreate, ReviewResult, ProgressResponse
+from app.config import REVIEW_WEIGHT_HISTORY, REVIEW_WEIGHT_NEW
+from app.services.scheduling import next_due_at, utcnow
+from app.services.deck_stats import apply_stats_deltas, confidence_bucket, record_bucket_move
+
+def weighted_confidence(old_confidence: float, new_confidence: float) -> float:
+    """Blend a new rating into the existing confidence score"""
+    return REVIEW_WEIGHT_HISTORY * old_confidence + REVIEW_WEIGHT_NEW * new_confidence
+
+def _on_review_conflict(stmt, in_order: bool = False):
+    """
+    Fold a review into an existing (user, card) row instead of inserting it.
+    With `in_order`, a review older than the row's last one is not folded.
+    """
+    table = UserCardProgress.__table__
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.card_id],
+        where=or_(
+            table.c.last_reviewed_at.is_(None),
+            table.c.last_reviewed_at <= stmt.excluded.last_reviewed_at
+        ) if in_order else None,
+        set_={
+            "confidence_score": (
+                REVIEW_WEIGHT_HISTORY * table.c.confidence_score +
+                REVIEW_WEIGHT_NEW * stmt.excluded.confidence_score
+            ),
+            "review_count": table.c.review_count + 1,
+            "last_reviewed_at": stmt.excluded.last_reviewed_at,
+            # ON CONFLICT skips Python-side onupdate; the insert's default carries the time
+            "updated_at": stmt.excluded.updated_at,
+        }
+    )
+
+def review_upsert_statement(
+    dialect: str,
+    user_id: int,
+    card_id: int,
+    confidence: float,
+    reviewed_at: datetime
+):
+    """Build the INSERT ... ON CONFLICT DO UPDATE ... RETURNING for one review"""
+    if dialect not in UPSERT_DIALECTS:
+        raise NotImplementedError(f"Review upsert is not supported on {dialect}")
+    
+    stmt = UPSERT_DIALECTS[dialect](UserCardProgress).values(
+        user_id=user_id,
+        card_id=card_id,
+        confidence_score=confidence,
+        review_count=1,
+        last_reviewed_at=reviewed_at
+    )
+    return _on_review_conflict(stmt).returning(UserCardProgress)
+
+def review_upsert_many_statement(dialect: str, in_order: bool = False):
+    """
+    The same upsert for an executemany of reviews of distinct (user, card)
+    pairs. Rows carry user_id, card_id, confidence_score, review_count (1)
+    and last_reviewed_at; RETURNING gives the new scores, counts and review
+    times with the stats bucket the card is still counted in. With `in_order`, reviews
+    older than the row's last review return nothing.
+    """
+    if dialect not in UPSERT_DIALECTS:
+        raise NotImplementedError(f"Review upsert is not supported on {dialect}")
+    
+    table = UserCardProgress.__table__
+    return _on_review_conflict(UPSERT_DIALECTS[dialect](table), in_order).returning(
+        table.c.id,
+        table.c.user_id,
+        table.c.card_id,
+        table.c.confidence_score,
+        table.c.review_count,
+        table.c.last_reviewed_at,
+        table.c.stats_bucket
+    )
+
+def review_settle_statement():
+    """
+    Build the UPDATE writing a reviewed row's next due date and stats bucket.
+
+    It only matches while review_count is still the count the upsert
+    returned (b_review_count), so it can never overwrite the due date of a
+    later review. Parameters: b_id, b_review_count, b_next_due_at and
+    b_stats_bucket.
+    """
+    table = UserCardProgress.__table__
+    return update(table).where(
+        table.c.id == bindparam("b_id"),
+        table.c.review_count == bindparam("b_review_count")
+    ).values(
+        next_due_at=bindparam("b_next_due_at"),
+        stats_bucket=bindparam("b_stats_bucket"),
+        # The upsert already stamped the review time
+        updated_at=table.c.updated_at
+    )
+
+def upsert_review(
+    db: Session,
+    user_id: int,
+    card_id: int,
+    confidence: float,
+    reviewed_at: datetime
+) -> UserCardProgress:
+    """
+    Record one review with a single INSERT ... ON CONFLICT DO UPDATE.
+
+    The weighted average and review count are computed by the database
+    against the current row, so concurrent reviews of the same card can
+    neither create duplicate rows nor lose an update. The resulting row is
+    returned through RETURNING without a follow-up SELECT. The next due
+    date depends on the new score, so it is written by a second UPDATE that
+    only matches while review_count is still the returned count: if another
+    review has updated the row in between, that review writes its own, newer
+    due date instead. The rating is also appended to review_events.
+
+    The upsert leaves stats_bucket alone, so RETURNING reports the bucket
+    user_deck_stats counts the card in. The count only moves to the new
+    bucket when the guarded UPDATE wrote it, so a review that lost the race
+    leaves the move to the one that overtook it.
+    """
+    stmt = review_upsert_statement(
+        db.get_bind().dialect.name, user_id, card_id, confidence, reviewed_at
+    )
+    progress = db.scalars(
+        stmt, execution_options={"populate_existing": True}
+    ).one()
+    # From the returned review time, so the due date has the same (stored) form
+    due = next_due_at(progress.confidence_score, progress.review_count, progress.last_reviewed_at)
+    bucket = confidence_bucket(progress.confidence_score)
+    settled = db.execute(review_settle_statement(), {
+        "b_id": progress.id,
+        "b_review_count": progress.review_count,
+        "b_next_due_at": due,
+        "b_stats_bucket": bucket,
+    }).rowcount == 1
+    # Already in the database; the ORM must not write them again at flush
+    set_committed_value(progress, "next_due_at", due)
+    if settled and bucket != progress.stats_bucket:
+        deltas = Counter()
+        # The router has loaded the card already, so this is an identity map hit
+        deck_id = db.get(Card, card_id).deck_id
+        record_bucket_move(deltas, user_id, deck_id, progress.stats_bucket, bucket)
+        set_committed_value(progress, "stats_bucket", bucket)
+        apply_stats_deltas(db, deltas)
+    db.add(ReviewEvent(
+        user_id=user_id, card_id=card_id, confidence=confidence, reviewed_at=reviewed_at
+    ))
+    db.flush()
+    return progress
+
+def apply_review_batch(
+    db: Session,
+    reviews: List[ReviewCreate],
+    reviewed_at: Optional[Sequence[datetime]] = None,
+    record_events: bool = True,
+    skip_superseded: bool = False
+) -> List[ReviewResult]:
+    """
+    Apply a list of reviews in order inside the caller's transaction.
+
+    Users and cards are checked with one query each. Valid reviews are then
+    written with the upsert upsert_review uses, as one executemany per
+    round: the first review of every (user, card) pair goes in round one,
+    the second in round two and so on, so repeated reviews of a card fold in
+    submission order and the database does all the arithmetic against the
+    current row. Due dates and stats buckets follow with one guarded UPDATE
+    executemany per round, and the deck stats move by the buckets the
+    returned rows report, so concurrent single reviews and batches neither
+    collide on the unique constraint nor lose counts. Invalid items are
+    reported in their result and do not affect the rest of the batch. Valid
+    ratings are appended to review_events with one executemany.
+
+    `reviewed_at` gives each review's time (e.g. when it was queued);
+    by default they all share the current time. `record_events=False` folds
+    ratings whose review_events rows exist already (see review_writer).
+    """
+    user_ids = {review.user_id for review in reviews}
+    card_ids = {review.card_id for review in reviews}
+    known_users = {
+        row.id for row in db.query(User.id).filter(User.id.in_(user_ids))
+    }
+    card_decks = dict(
+        db.query(Card.id, Card.deck_id).filter(Card.id.in_(card_ids)).all()
+    )
+    
+    if reviewed_at is None:
+        reviewed_at = [utcnow()] * len(reviews)
+    results = []
+    rounds = []  # rounds[n]: the (n+1)-th review of each pair, as (index, review)
+    seen = Counter()
+    events = []
+    for index, review in enumerate(reviews):
+        if review.user_id not in known_users:
+            results.append(ReviewResult(index=index, status="error", detail="User not found"))
+            continue
+        if review.card_id not in card_decks:
+            results.append(ReviewResult(index=index, status="error", detail="Card not found"))
+            continue
+        if not 0.0 <= review.confidence <= 1.0:
+            results.append(ReviewResult(
+                index=index, status="error", detail="Confidence must be between 0.0 and 1.0"
+            ))
+            continue
+        
+        key = (review.user_id, review.card_id)
+        if seen[key] == len(rounds):
+            rounds.append([])
+        rounds[seen[key]].append((index, review))
+        seen[key] += 1
+        events.append({
+            "user_id": review.user_id,
+            "card_id": review.card_id,
+            "confidence": review.confidence,
+            "reviewed_at": reviewed_at[index],
+        })
+    
+    upsert = review_upsert_many_statement(db.get_bind().dialect.name, in_order=skip_superseded)
+    deltas = Counter()
+    for items in rounds:
+        returned = {
+            (row.user_id, row.card_id): row
+            for row in db.execute(upsert, [
+                {
+                    "user_id": review.user_id,
+                    "card_id": review.card_id,
+                    "confidence_score": review.confidence,
+                    "review_count": 1,
+                    "last_reviewed_at": reviewed_at[index],
+                }
+                for index, review in items
+            ])
+        }
+        settles = []
+        for index, review in items:
+            row = returned.get((review.user_id, review.card_id))
+            if row is None:
+                results.append(ReviewResult(index=index, status="error", detail="Superseded by a later review"))
+                continue
+            # Times as the database returns them, like upsert_review's
+            due = next_due_at(row.confidence_score, row.review_count, row.last_reviewed_at)
+            bucket = confidence_bucket(row.confidence_score)
+            record_bucket_move(deltas, row.user_id, card_decks[row.card_id], row.stats_bucket, bucket)
+            settles.append({
+                "b_id": row.id,
+                "b_review_count": row.review_count,
+                "b_next_due_at": due,
+                "b_stats_bucket": bucket,
+            })
+            results.append(ReviewResult(
+                index=index,
+                status="ok",
+                progress=ProgressResponse(
+                    id=row.id,
+                    user_id=row.user_id,
+                    card_id=row.card_id,
+                    confidence_score=row.confidence_score,
+                    review_count=row.review_count,
+                    last_reviewed_at=row.last_reviewed_at,
+                    next_due_at=due
+                )
+            ))
+        # The upsert keeps each row locked until commit, so every guard matches
+        if settles:
+            db.execute(review_settle_statement(), settles)
+    
+    apply_stats_deltas(db, deltas)
+    if events and record_events:
+        db.execute(insert(ReviewEvent), events)
+    results.sort(key=lambda result: result.index)
+    return results
@@ -0,0 +1,19 @@
+from datetime import datetime, timedelta, timezone
+from app.config import (
+    SCHEDULE_MIN_INTERVAL_HOURS,
+    SCHEDULE_MAX_INTERVAL_DAYS,
+    SCHEDULE_REVIEW_COUNT_BONUS
+)
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+def review_interval(confidence: float, review_count: int) -> timedelta:
+    """Time until a card with this confidence and review count is due again"""
+    max_hours = SCHEDULE_MAX_INTERVAL_DAYS * 24
+    hours = SCHEDULE_MIN_INTERVAL_HOURS * (max_hours / SCHEDULE_MIN_INTERVAL_HOURS) ** confidence
+    hours *= 1 + SCHEDULE_REVIEW_COUNT_BONUS * max(review_count - 1, 0)
+    return timedelta(hours=min(hours, max_hours))
+
+def next_due_at(confidence: float, review_count: int, last_reviewed_at: datetime) -> datetime:
+    return last_reviewed_at + review_interval(confidence, review_count)
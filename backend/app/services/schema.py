@@ -0,0 +1,94 @@
+"""
+Bring a database created by an older version up to the current models.
+
+`Base.metadata.create_all` only creates missing tables. upgrade_schema
+adds the columns, indexes and unique constraints added to existing tables
+since, and fills in the new columns that are derived from existing rows:
+due dates, and stats buckets with user_deck_stats. Duplicate progress rows
+are merged before the (user, card) unique index is built. Card content
+hashes are left to `python -m app.cli dedupe`, which also merges duplicates.
+"""
+import logging
+from typing import List
+from sqlalchemy import UniqueConstraint, bindparam, inspect, select, text, update
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn
+from app.database import Base
+from app.models import UserCardProgress
+from app.services.dedupe import merge_duplicate_progress
+from app.services.deck_stats import rebuild_deck_stats
+from app.services.scheduling import next_due_at
+
+logger = logging.getLogger(__name__)
+
+def _fill_due_dates(db: Session) -> None:
+    """Due dates of the rows reviewed before next_due_at existed"""
+    table = UserCardProgress.__table__
+    rows = db.execute(
+        select(table.c.id, table.c.confidence_score, table.c.review_count, table.c.last_reviewed_at).where(
+            table.c.next_due_at.is_(None), table.c.last_reviewed_at.is_not(None)
+        )
+    ).all()
+    if rows:
+        db.execute(
+            update(table).where(table.c.id == bindparam("b_id")).values(
+                next_due_at=bindparam("b_next_due_at"), updated_at=table.c.updated_at
+            ),
+            [
+                {
+                    "b_id": row.id,
+                    "b_next_due_at": next_due_at(row.confidence_score or 0.0, row.review_count or 0, row.last_reviewed_at),
+                }
+                for row in rows
+            ]
+        )
+
+def upgrade_schema(db: Session) -> List[str]:
+    """
+    Add what the current models have and the database lacks, inside the
+    caller's transaction; run after create_all. Cheap when nothing is
+    missing. Returns a description of each change.
+    """
+    inspector = inspect(db.connection())
+    dialect = db.get_bind().dialect
+    changes = []
+    added_columns = set()
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                db.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {CreateColumn(column).compile(dialect=dialect)}"))
+                added_columns.add((table.name, column.name))
+                changes.append(f"added column {table.name}.{column.name}")
+
+        indexed = {index["name"] for index in inspector.get_indexes(table.name)}
+        indexed |= {constraint["name"] for constraint in inspector.get_unique_constraints(table.name)}
+        for index in table.indexes:
+            if index.name not in indexed:
+                index.create(db.connection())
+                changes.append(f"added index {index.name}")
+        for constraint in table.constraints:
+            if not isinstance(constraint, UniqueConstraint) or not constraint.name or constraint.name in indexed:
+                continue
+            if constraint.name == "uq_user_card_progress_user_card":
+                merged = merge_duplicate_progress(db)
+                if merged:
+                    changes.append(f"merged {merged} duplicate progress rows")
+            # A unique index of the same name: ALTER TABLE cannot add constraints on SQLite,
+            # and ON CONFLICT accepts the index as its target
+            columns = ", ".join(column.name for column in constraint.columns)
+            db.execute(text(f"CREATE UNIQUE INDEX {constraint.name} ON {table.name} ({columns})"))
+            changes.append(f"added unique index {constraint.name}")
+
+    if ("user_card_progress", "next_due_at") in added_columns:
+        _fill_due_dates(db)
+    if ("user_card_progress", "stats_bucket") in added_columns:
+        rebuild_deck_stats(db)
+        changes.append("rebuilt user_deck_stats")
+    if ("cards", "content_hash") in added_columns:
+        logger.warning("Card content hashes are missing: run `python -m app.cli dedupe`")
+    for change in changes:
+        logger.info("Schema upgrade: %s", change)
+    return changes
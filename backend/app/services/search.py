@@ -0,0 +1,124 @@
+import logging
+import re
+from typing import List, Optional, Sequence
+from sqlalchemy import column, func, inspect, literal_column, select, table, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import Session
+from app.models import Card
+from app.models.card_search import POSTGRESQL_SEARCH_DDL, SQLITE_SEARCH_DDL
+from app.schemas import CardResponse
+from app.serialization import schema_columns
+from app.services.subscriptions import user_deck_ids
+
+logger = logging.getLogger(__name__)
+
+QUESTION_WEIGHT = 2.0  # Relative to the answer, for SQLite's bm25
+
+_cards_fts = table("cards_fts", column("rowid"))
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+class SearchQueryError(ValueError):
+    """The query has nothing to search for"""
+
+class SearchIndexMissing(RuntimeError):
+    """The database has no full-text index; run `python -m app.cli rebuild-search`"""
+
+def search_terms(query: str) -> List[str]:
+    """
+    Words of a free-text query. Operators and punctuation are dropped so
+    user input can never be a syntax error in FTS5 or tsquery.
+    """
+    terms = _TERM.findall(query)
+    if not terms:
+        raise SearchQueryError("Search query has no searchable terms")
+    return terms
+
+def _sqlite_match(terms: List[str]) -> str:
+    # Every term must match; the last one as a prefix, for search-as-you-type
+    return " ".join(f'"{term}"' for term in terms) + "*"
+
+def _postgresql_tsquery(terms: List[str]) -> str:
+    return " & ".join(terms) + ":*"
+
+def search_cards(
+    db: Session,
+    query: str,
+    user_id: Optional[int] = None,
+    deck_id: Optional[int] = None,
+    offset: int = 0,
+    limit: int = 20
+) -> List[Sequence]:
+    """
+    Cards matching every word of `query`, best match first, as CardResponse
+    column tuples followed by the relevance score. `user_id` limits the
+    search to decks the user owns or subscribes to, `deck_id` to one deck.
+    Raises SearchIndexMissing on a database without the index.
+    """
+    terms = search_terms(query)
+    dialect = db.get_bind().dialect.name
+    columns = schema_columns(Card, CardResponse)
+    if dialect == "sqlite":
+        # bm25 is lower for better matches
+        rank = func.bm25(literal_column("cards_fts"), QUESTION_WEIGHT, 1.0)
+        statement = select(*columns, (-rank).label("score")).select_from(
+            _cards_fts.join(Card, Card.id == _cards_fts.c.rowid)
+        ).where(
+            literal_column("cards_fts").op("MATCH")(_sqlite_match(terms))
+        ).order_by(rank, Card.id)
+    elif dialect == "postgresql":
+        vector = literal_column("cards.search_vector")
+        tsquery = func.to_tsquery("english", _postgresql_tsquery(terms))
+        rank = func.ts_rank(vector, tsquery)
+        statement = select(*columns, rank.label("score")).where(
+            vector.op("@@")(tsquery)
+        ).order_by(rank.desc(), Card.id)
+    else:
+        raise NotImplementedError(f"Card search is not supported on {dialect}")
+
+    if deck_id:
+        statement = statement.where(Card.deck_id == deck_id)
+    if user_id:
+        statement = statement.where(Card.deck_id.in_(user_deck_ids(user_id)))
+    try:
+        return db.execute(statement.offset(offset).limit(limit)).all()
+    except (OperationalError, ProgrammingError):
+        # The failed statement may have aborted the transaction (PostgreSQL)
+        db.rollback()
+        if not search_index_exists(db):
+            raise SearchIndexMissing()
+        raise
+
+def search_index_exists(db: Session) -> bool:
+    """Whether the full-text index (FTS5 table or tsvector column) is in place"""
+    inspector = inspect(db.connection())
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        return inspector.has_table("cards_fts")
+    if dialect == "postgresql":
+        return any(column["name"] == "search_vector" for column in inspector.get_columns("cards"))
+    raise NotImplementedError(f"Card search is not supported on {dialect}")
+
+def ensure_search_index(db: Session) -> bool:
+    """
+    Build the full-text index on a database created before it existed, e.g.
+    at startup. Cheap when the index is there; returns whether it was built.
+    """
+    if search_index_exists(db):
+        return False
+    logger.info("Building the card search index")
+    rebuild_search_index(db)
+    return True
+
+def rebuild_search_index(db: Session) -> None:
+    """Create the full-text index if it is missing and re-index every card"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        for statement in SQLITE_SEARCH_DDL:
+            db.execute(text(statement))
+        db.execute(text("INSERT INTO cards_fts(cards_fts) VALUES ('rebuild')"))
+    elif dialect == "postgresql":
+        # The generated column fills itself in
+        for statement in POSTGRESQL_SEARCH_DDL:
+            db.execute(text(statement))
+    else:
+        raise NotImplementedError(f"Card search is not supported on {dialect}")
@@ -0,0 +1,336 @@
+import logging
+import secrets
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.config import (
+    CONFIDENCE_THRESHOLD_LEARN,
+    STUDY_SESSION_MAX_ACTIVE,
+    STUDY_SESSION_TTL_SECONDS,
+    STUDY_SESSION_SWEEP_SECONDS,
+    STUDY_SESSION_MAX_REVIEWS
+)
+from app.database import SessionLocal, run_blocking
+from app.schemas import ReviewCreate, ReviewResult
+from app.services.progress_cache import progress_cache
+from app.services.reviews import apply_review_batch, weighted_confidence
+from app.services.scheduling import utcnow
+
+logger = logging.getLogger(__name__)
+
+RETRY = float("-inf")  # last_used of a session whose reviews failed to write: swept first, never served
+
+class TooManySessions(Exception):
+    """STUDY_SESSION_MAX_ACTIVE sessions are already open"""
+
+class CardNotInSession(Exception):
+    """The reviewed card was not queued by the session"""
+
+class SessionReviewLimit(Exception):
+    """The session holds STUDY_SESSION_MAX_REVIEWS reviews and must be ended"""
+
+class StudySession:
+    """
+    One user's study queue, held in typed arrays: the session's card ids in
+    ascending order with their confidences (NaN for unseen), a FIFO of slot
+    numbers with a moving head, and the reviews not yet written.
+
+    `next_card` pops the head in O(1). A reviewed learn-mode card that is
+    still below the learn threshold goes back on the tail.
+    """
+    __slots__ = (
+        "session_id", "user_id", "deck_id", "mode", "card_ids", "confidences", "queued",
+        "queue", "head", "review_slots", "review_ratings", "review_times", "last_used"
+    )
+
+    COMPACT_AFTER = 64  # Popped slots kept before the queue array is shifted down
+
+    def __init__(
+        self,
+        session_id: str,
+        user_id: int,
+        deck_id: Optional[int],
+        mode: str,
+        card_ids: List[int],
+        confidences: List[float]
+    ):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.deck_id = deck_id
+        self.mode = mode
+        self.card_ids = array("q", card_ids)
+        self.confidences = array("d", confidences)
+        self.queued = bytearray(b"\x01" * len(card_ids))  # Whether each slot is in the queue
+        self.queue = array("l", range(len(card_ids)))
+        self.head = 0
+        self.review_slots = array("l")
+        self.review_ratings = array("d")
+        self.review_times = array("d")  # POSIX timestamps
+        self.last_used = time.monotonic()
+
+    @property
+    def remaining(self) -> int:
+        return len(self.queue) - self.head
+
+    @property
+    def review_count(self) -> int:
+        return len(self.review_slots)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.card_ids, self.confidences, self.queue, self.review_slots, self.review_ratings, self.review_times)
+        return len(self.queued) + sum(values.itemsize * len(values) for values in arrays)
+
+    def next_card(self) -> Optional[Tuple[int, float]]:
+        """Pop the next card id and its confidence (NaN if unseen), or None when done"""
+        if self.head == len(self.queue):
+            return None
+        slot = self.queue[self.head]
+        self.head += 1
+        if self.head >= self.COMPACT_AFTER and self.head * 2 >= len(self.queue):
+            # Amortized O(1): each slot is moved at most once per pass through the queue
+            del self.queue[:self.head]
+            self.head = 0
+        self.queued[slot] = 0
+        return self.card_ids[slot], self.confidences[slot]
+
+    def review(self, card_id: int, rating: float, reviewed_at: datetime) -> Tuple[float, bool]:
+        """
+        Record a rating for one of the session's cards. Returns the card's
+        new confidence and whether it was put back on the queue.
+        """
+        slot = bisect_left(self.card_ids, card_id)
+        if slot == len(self.card_ids) or self.card_ids[slot] != card_id:
+            raise CardNotInSession(card_id)
+        if self.review_count >= STUDY_SESSION_MAX_REVIEWS:
+            raise SessionReviewLimit()
+
+        old = self.confidences[slot]
+        # NaN: first review, the rating is the confidence
+        confidence = rating if old != old else weighted_confidence(old, rating)
+        self.confidences[slot] = confidence
+        self.review_slots.append(slot)
+        self.review_ratings.append(rating)
+        self.review_times.append(reviewed_at.timestamp())
+
+        requeued = False
+        if self.mode == "learn" and confidence < CONFIDENCE_THRESHOLD_LEARN and not self.queued[slot]:
+            self.queue.append(slot)
+            self.queued[slot] = 1
+            requeued = True
+        return confidence, requeued
+
+    def pending_reviews(self) -> Tuple[List[ReviewCreate], List[datetime]]:
+        """The session's reviews in order, with their review times, for apply_review_batch"""
+        reviews = [
+            ReviewCreate(user_id=self.user_id, card_id=self.card_ids[slot], confidence=rating)
+            for slot, rating in zip(self.review_slots, self.review_ratings)
+        ]
+        times = [datetime.fromtimestamp(stamp, timezone.utc) for stamp in self.review_times]
+        return reviews, times
+
+def write_session_reviews(db: Session, session: StudySession) -> List[ReviewResult]:
+    """
+    Apply the session's reviews in one batch inside the caller's transaction.
+    A review older than the card's last one (e.g. a direct review made while
+    the session was open) is recorded in review_events but not folded in.
+    """
+    reviews, times = session.pending_reviews()
+    if not reviews:
+        return []
+    return apply_review_batch(db, reviews, times, skip_superseded=True)
+
+def update_progress_cache(results: List[ReviewResult]) -> None:
+    """Write committed reviews through to the cached progress snapshots"""
+    for result in results:
+        if result.progress:
+            progress_cache.record_review(
+                result.progress.user_id,
+                result.progress.card_id,
+                result.progress.confidence_score
+            )
+
+class StudySessionStore:
+    """
+    Open study sessions by id, least recently used first.
+
+    Sessions idle for longer than `ttl` are expired by a sweeper thread every
+    `sweep_interval` seconds, and whenever a session is opened or ended (or
+    `expire` is called); their reviews are written through `session_factory`.
+    Sessions whose write fails are put back and written again by the next sweep.
+    At most `max_active` sessions are open at a time.
+    Like the review writer's queue, sessions live in process memory: `close`
+    writes every open session on shutdown, but a crash loses their reviews.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        max_active: int = STUDY_SESSION_MAX_ACTIVE,
+        ttl: float = STUDY_SESSION_TTL_SECONDS,
+        sweep_interval: float = STUDY_SESSION_SWEEP_SECONDS
+    ):
+        self.session_factory = session_factory
+        self.max_active = max_active
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._sessions: "OrderedDict[str, StudySession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+        self._closing = threading.Event()
+        self.created = 0
+        self.ended = 0
+        self.expired = 0
+        self.refused = 0
+
+    def open(
+        self,
+        user_id: int,
+        deck_id: Optional[int],
+        mode: str,
+        card_ids: List[int],
+        confidences: List[float]
+    ) -> StudySession:
+        session = StudySession(secrets.token_urlsafe(16), user_id, deck_id, mode, card_ids, confidences)
+        with self._lock:
+            self._start_sweeper()
+            expired = self._sweep()
+            full = len(self._sessions) >= self.max_active
+            if full:
+                self.refused += 1
+            else:
+                self._sessions[session.session_id] = session
+                self.created += 1
+        self._write(expired)
+        if full:
+            raise TooManySessions()
+        return session
+
+    def next_card(self, session_id: str) -> Tuple[Optional[Tuple[int, float]], int, int]:
+        """The session's next card (or None), how many remain after it and the session's user"""
+        with self._lock:
+            session = self._get(session_id)
+            return session.next_card(), session.remaining, session.user_id
+
+    def review(self, session_id: str, card_id: int, rating: float) -> Tuple[float, bool, int]:
+        """Apply a rating in memory; returns the new confidence, whether it was requeued and the queue length"""
+        with self._lock:
+            session = self._get(session_id)
+            confidence, requeued = session.review(card_id, rating, utcnow())
+            return confidence, requeued, session.remaining
+
+    def end(self, session_id: str) -> StudySession:
+        """Close the session and hand it back for its reviews to be written"""
+        with self._lock:
+            session = self._get(session_id)
+            del self._sessions[session_id]
+            self.ended += 1
+            expired = self._sweep()
+        self._write(expired)
+        return session
+
+    def expire(self) -> int:
+        """Close and write every session idle for longer than the TTL"""
+        with self._lock:
+            expired = self._sweep()
+        self._write(expired)
+        return len(expired)
+
+    def close(self) -> None:
+        """Stop the sweeper and write every open session, e.g. on shutdown"""
+        with self._lock:
+            sweeper = self._sweeper
+            self._sweeper = None
+            self._closing.set()
+        if sweeper is not None:
+            sweeper.join()
+        # With no sweeper left, sessions put back by a failed write get one more attempt
+        for _ in range(2):
+            with self._lock:
+                sessions = list(self._sessions.values())
+                self._sessions.clear()
+            self._write(sessions)
+        with self._lock:
+            lost = len(self._sessions)
+            self._sessions.clear()
+        if lost:
+            logger.error("Lost the reviews of %d study sessions at shutdown", lost)
+
+    def retry(self, sessions: List[StudySession]) -> None:
+        """Put back closed sessions whose reviews could not be written, for the next sweep"""
+        with self._lock:
+            for session in sessions:
+                session.last_used = RETRY
+                self._sessions[session.session_id] = session
+                self._sessions.move_to_end(session.session_id, last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "active": len(self._sessions),
+                "bytes": sum(session.nbytes for session in self._sessions.values()),
+                "created": self.created,
+                "ended": self.ended,
+                "expired": self.expired,
+                "refused": self.refused,
+            }
+
+    def _start_sweeper(self) -> None:
+        """Start the sweeper thread if it is not running; call with the lock held"""
+        if self._sweeper is None or not self._sweeper.is_alive():
+            self._closing.clear()
+            self._sweeper = threading.Thread(target=self._run_sweeper, name="study-session-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def _run_sweeper(self) -> None:
+        while not self._closing.wait(self.sweep_interval):
+            try:
+                self.expire()
+            except Exception:
+                logger.exception("Study session sweep failed")
+
+    def _get(self, session_id: str) -> StudySession:
+        # Expired sessions are only written by the next sweep, but never served
+        session = self._sessions.get(session_id)
+        if session is None or time.monotonic() - session.last_used > self.ttl:
+            raise KeyError(session_id)
+        session.last_used = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def _sweep(self) -> List[StudySession]:
+        """Remove idle sessions from the front of the LRU order; call with the lock held"""
+        expired = []
+        now = time.monotonic()
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_used <= self.ttl:
+                break
+            expired.append(self._sessions.pop(session.session_id))
+        self.expired += sum(1 for session in expired if session.last_used != RETRY)
+        return expired
+
+    def _write(self, sessions: List[StudySession]) -> None:
+        sessions = [session for session in sessions if session.review_count]
+        if sessions:
+            # Called from handlers too: the sync session must not block the event loop
+            run_blocking(self._write_sessions, sessions)
+
+    def _write_sessions(self, sessions: List[StudySession]) -> None:
+        with self.session_factory() as db:
+            try:
+                results = [result for session in sessions for result in write_session_reviews(db, session)]
+                db.commit()
+            except Exception:
+                db.rollback()
+                logger.exception("Failed to write the reviews of %d study sessions; retrying", len(sessions))
+                self.retry(sessions)
+                return
+        update_progress_cache(results)
+
+study_sessions = StudySessionStore()
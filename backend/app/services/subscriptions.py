@@ -0,0 +1,43 @@
+from typing import List
+from sqlalchemy import and_, exists, func, or_, select, union
+from sqlalchemy.orm import Session
+from app.models import Card, CardOverride, Deck, DeckSubscription
+from app.schemas import CardResponse
+
+# Card fields a user can override with a personal edit
+OVERRIDABLE_FIELDS = ("question", "answer")
+
+def user_deck_ids(user_id: int):
+    """
+    Ids of the decks the user owns or subscribes to. Both halves are range
+    scans: decks(owner_id, id) and the (user_id, deck_id) primary key.
+    """
+    return union(
+        select(Deck.id).where(Deck.owner_id == user_id),
+        select(DeckSubscription.deck_id).where(DeckSubscription.user_id == user_id)
+    )
+
+def studies_deck(db: Session, user_id: int, deck_id: int) -> bool:
+    """
+    Whether the user owns or subscribes to the deck: a decks primary key
+    lookup and a deck_subscriptions primary key probe, not a deck listing.
+    """
+    return db.scalar(select(or_(
+        exists().where(Deck.id == deck_id, Deck.owner_id == user_id),
+        exists().where(DeckSubscription.user_id == user_id, DeckSubscription.deck_id == deck_id)
+    )))
+
+def personal_card_columns() -> List:
+    """CardResponse columns with a user's overrides applied; join them with join_overrides"""
+    return [
+        func.coalesce(getattr(CardOverride, name), getattr(Card, name)).label(name)
+        if name in OVERRIDABLE_FIELDS else getattr(Card, name)
+        for name in CardResponse.model_fields
+    ]
+
+def join_overrides(query, user_id: int):
+    """Outer join the user's overrides: a primary key lookup per card"""
+    return query.outerjoin(
+        CardOverride,
+        and_(CardOverride.card_id == Card.id, CardOverride.user_id == user_id)
+    )
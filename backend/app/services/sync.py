@@ -0,0 +1,100 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import insert, or_, select, union_all
+from sqlalchemy.orm import Session
+from app.models import Card, CardOverride, Deck, DeckSubscription, Deletion, UserCardProgress
+from app.schemas import CardOverrideResponse, CardResponse, DeckResponse, ProgressResponse
+from app.serialization import row_dicts, schema_columns
+from app.services.subscriptions import user_deck_ids
+
+DELETION_FIELDS = ("kind", "id", "deleted_at")
+DECK_FIELDS = tuple(DeckResponse.model_fields)
+CARD_FIELDS = tuple(CardResponse.model_fields)
+PROGRESS_FIELDS = tuple(ProgressResponse.model_fields)
+OVERRIDE_FIELDS = tuple(CardOverrideResponse.model_fields)
+
+def record_deletions(
+    db: Session,
+    kind: str,
+    object_ids: Iterable[int],
+    deck_id: Optional[int] = None,
+    user_id: Optional[int] = None
+) -> None:
+    """
+    Tombstones for rows deleted in the caller's transaction: cards with their
+    `deck_id`, or a user's overrides and subscriptions with their `user_id`
+    """
+    rows = [
+        {"kind": kind, "object_id": object_id, "deck_id": deck_id, "user_id": user_id}
+        for object_id in object_ids
+    ]
+    if rows:
+        db.execute(insert(Deletion), rows)
+
+def _deletions_since(db: Session, user_id: int, deck_ids, since: datetime) -> List[Dict[str, Any]]:
+    """Tombstones of the user's decks' cards and of the user's own rows, oldest first"""
+    columns = (Deletion.kind, Deletion.object_id, Deletion.deleted_at)
+    query = union_all(
+        select(*columns).where(Deletion.deck_id.in_(deck_ids), Deletion.deleted_at >= since),
+        select(*columns).where(Deletion.user_id == user_id, Deletion.deleted_at >= since)
+    ).order_by("deleted_at")
+    return row_dicts(db.execute(query), DELETION_FIELDS)
+
+def changes_since(db: Session, user_id: int, since: Optional[datetime]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    The user's decks (owned or subscribed) and their cards, and the user's
+    progress rows and card overrides, written at or after `since`
+    (everything when None), as plain dicts. Decks are primary key probes of
+    the user's deck ids; cards, progress and overrides are range scans of a
+    per-deck or per-user updated_at index, so the cost follows the number of
+    changed rows the user can see. A deck subscribed to since the token is
+    sent whole, as its rows predate the token. `deleted` lists the tombstones
+    recorded since the token (none without one: the client starts over).
+    """
+    deck_ids = user_deck_ids(user_id)
+    queries = {
+        "decks": (
+            select(*schema_columns(Deck, DeckResponse)).where(Deck.id.in_(deck_ids)),
+            Deck.updated_at,
+            Deck.id,
+            DECK_FIELDS
+        ),
+        "cards": (
+            select(*schema_columns(Card, CardResponse)).where(Card.deck_id.in_(deck_ids)),
+            Card.updated_at,
+            Card.deck_id,
+            CARD_FIELDS
+        ),
+        "progress": (
+            select(*schema_columns(UserCardProgress, ProgressResponse)).where(
+                UserCardProgress.user_id == user_id
+            ),
+            UserCardProgress.updated_at,
+            None,
+            PROGRESS_FIELDS
+        ),
+        "overrides": (
+            select(*schema_columns(CardOverride, CardOverrideResponse)).where(
+                CardOverride.user_id == user_id
+            ),
+            CardOverride.updated_at,
+            None,
+            OVERRIDE_FIELDS
+        ),
+    }
+    subscribed = []
+    if since is not None:
+        subscribed = db.scalars(select(DeckSubscription.deck_id).where(
+            DeckSubscription.user_id == user_id,
+            DeckSubscription.created_at >= since
+        )).all()
+    changes = {}
+    for name, (query, updated_at, deck_id, fields) in queries.items():
+        if since is not None:
+            changed = updated_at >= since
+            if deck_id is not None and subscribed:
+                changed = or_(changed, deck_id.in_(subscribed))
+            query = query.where(changed).order_by(updated_at)
+        changes[name] = row_dicts(db.execute(query), fields)
+    changes["deleted"] = _deletions_since(db, user_id, deck_ids, since) if since is not None else []
+    return changes
@@ -0,0 +1,68 @@
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from app.config import STREAM_BATCH_SIZE
+from app.serialization import dumps
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+FORMAT_PATTERN = "^(json|ndjson)$"
+
+# OpenAPI entry for list endpoints that can also answer with NDJSON
+NDJSON_RESPONSES = {200: {"content": {NDJSON_MEDIA_TYPE: {}}}}
+
+def wants_ndjson(request: Request, format: Optional[str]) -> bool:
+    """An explicit `format` wins; otherwise honour the Accept header"""
+    if format:
+        return format == "ndjson"
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+class SessionStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose sync body keeps reading from the database while
+    it is sent. The original iterator is kept so that async mode can drive
+    it on the event loop (see routers/async_routes.py).
+    """
+    def __init__(self, content: Iterator, **kwargs):
+        self.sync_iterator = content
+        super().__init__(content, **kwargs)
+
+def session_stream(
+    db: Session,
+    produce: Callable[[Session], Iterable[bytes]],
+    **kwargs
+) -> SessionStreamingResponse:
+    """
+    Stream the chunks yielded by `produce`, reading rows as they are sent.
+
+    The request's session is closed before the body is sent, so `produce`
+    gets a session of its own on the same engine.
+    """
+    bind = db.get_bind()
+    
+    def body():
+        with Session(bind=bind, autoflush=False) as stream_db:
+            yield from produce(stream_db)
+    
+    return SessionStreamingResponse(body(), **kwargs)
+
+def ndjson_response(
+    db: Session,
+    produce: Callable[[Session], Iterable[Dict[str, Any]]]
+) -> SessionStreamingResponse:
+    """
+    Stream the rows yielded by `produce` as one JSON document per line.
+    Lines are flushed in batches of STREAM_BATCH_SIZE so memory stays flat
+    for any result size.
+    """
+    def lines(stream_db: Session) -> Iterator[bytes]:
+        batch = []
+        for item in produce(stream_db):
+            batch.append(dumps(item))
+            if len(batch) >= STREAM_BATCH_SIZE:
+                yield b"\n".join(batch) + b"\n"
+                batch = []
+        if batch:
+            yield b"\n".join(batch) + b"\n"
+    
+    return session_stream(db, lines, media_type=NDJSON_MEDIA_TYPE)
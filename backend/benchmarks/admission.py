@@ -0,0 +1,157 @@
+"""
+Review latency while list endpoints are saturated, with and without
+admission control.
+
+Listing threads request every learn card of every deck a user studies
+(GET /users/{id}/cards without deck_id, progress cache off) as fast as they
+can, while review threads record reviews. The run is repeated with the
+route limits lifted, to show what admission control buys: a stable
+record_review p99, paid for with 503s on the listings. Drives the app
+in-process with one shared TestClient. Run from backend/:
+
+    python -m benchmarks.admission --seconds 5 --listers 32 --reviewers 4
+"""
+import argparse
+import logging
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from app.admission import admission
+from app.database import Base, create_db_engine, get_db, get_read_db
+from app.main import create_app
+from app.models import Card, Deck, DeckSubscription, User
+from app.services.progress_cache import progress_cache
+from benchmarks.run import percentile
+
+
+def seed(SessionFactory, users, cards):
+    """One shared deck that every other user subscribes to"""
+    with SessionFactory() as db:
+        db.execute(insert(User), [
+            {"username": f"user{i}", "email": f"user{i}@example.com"}
+            for i in range(users)
+        ])
+        db.execute(insert(Deck), [{"title": "Shared", "owner_id": 1}])
+        db.execute(insert(Card), [
+            {"deck_id": 1, "question": f"Question {i}", "answer": f"Answer {i}"}
+            for i in range(cards)
+        ])
+        db.execute(insert(DeckSubscription), [
+            {"user_id": user_id, "deck_id": 1} for user_id in range(2, users + 1)
+        ])
+        db.commit()
+
+
+def run_load(client, args):
+    latencies = []
+    counts = {"listed": 0, "shed": 0, "reviews": 0, "review_errors": 0}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def lister():
+        rng = random.Random()
+        while not stop.is_set():
+            response = client.get(f"/users/{rng.randint(1, args.users)}/cards?mode=learn")
+            key = "listed" if response.status_code == 200 else "shed"
+            with lock:
+                counts[key] += 1
+
+    def reviewer():
+        rng = random.Random()
+        while not stop.is_set():
+            started = time.perf_counter()
+            response = client.post("/reviews", json={
+                "user_id": rng.randint(1, args.users),
+                "card_id": rng.randint(1, args.cards),
+                "confidence": round(rng.random(), 2),
+            })
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                if response.status_code == 201:
+                    counts["reviews"] += 1
+                    latencies.append(elapsed)
+                else:
+                    counts["review_errors"] += 1
+
+    threads = [threading.Thread(target=lister) for _ in range(args.listers)]
+    threads += [threading.Thread(target=reviewer) for _ in range(args.reviewers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    return {
+        "review_p50_ms": percentile(latencies, 50) if latencies else float("nan"),
+        "review_p99_ms": percentile(latencies, 99) if latencies else float("nan"),
+        "reviews_per_s": counts["reviews"] / args.seconds,
+        "listed_per_s": counts["listed"] / args.seconds,
+        "shed_per_s": counts["shed"] / args.seconds,
+        "review_errors": counts["review_errors"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--listers", type=int, default=32, help="threads listing user cards")
+    parser.add_argument("--reviewers", type=int, default=4, help="threads recording reviews")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--cards", type=int, default=20000)
+    args = parser.parse_args()
+
+    # Every listing reads the cards table, as on a cold cache
+    progress_cache.max_bytes = 0
+    # Chunked card loads would be reported as N+1 on every listing
+    logging.getLogger("app.metrics").setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_engine = create_db_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        Base.metadata.create_all(bind=db_engine)
+        SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
+        seed(SessionFactory, args.users, args.cards)
+
+        def override_get_db():
+            db = SessionFactory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app = create_app(async_db=False)
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_read_db] = override_get_db
+
+        limited = {
+            name: (route_limit.max_concurrent, route_limit.max_per_user)
+            for name, route_limit in admission.limits.items()
+        }
+        print(
+            f"{'admission':<10} {'review p50':>11} {'review p99':>11} {'reviews/s':>10} "
+            f"{'lists/s':>8} {'shed/s':>8} {'errors':>7}"
+        )
+        with TestClient(app) as client:
+            for label, enabled in (("on", True), ("off", False)):
+                for name, route_limit in admission.limits.items():
+                    route_limit.max_concurrent, route_limit.max_per_user = (
+                        limited[name] if enabled else (1_000_000, 0)
+                    )
+                result = run_load(client, args)
+                print(
+                    f"{label:<10} {result['review_p50_ms']:>9.2f}ms {result['review_p99_ms']:>9.2f}ms "
+                    f"{result['reviews_per_s']:>10.1f} {result['listed_per_s']:>8.1f} "
+                    f"{result['shed_per_s']:>8.1f} {result['review_errors']:>7}"
+                )
+        db_engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Synthetic data for benchmarks: users, decks, cards and review histories at
+fixed scales, inserted with chunked executemany. Generation is seeded, so
+every run of a scale produces the same dataset.
+"""
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert
+
+from app.models import Card, Deck, User, UserCardProgress
+from app.services.deck_stats import rebuild_deck_stats
+from app.services.scheduling import next_due_at
+
+CHUNK_SIZE = 10000
+
+
+@dataclass(frozen=True)
+class Scale:
+    users: int
+    decks: int
+    cards: int
+    progress_rows: int
+
+
+SCALES = {
+    "small": Scale(users=10, decks=10, cards=1_000, progress_rows=1_000),
+    "medium": Scale(users=100, decks=50, cards=20_000, progress_rows=100_000),
+    "large": Scale(users=1_000, decks=200, cards=100_000, progress_rows=1_000_000),
+}
+
+
+def _insert_chunked(db, model, rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            db.execute(insert(model), chunk)
+            chunk = []
+    if chunk:
+        db.execute(insert(model), chunk)
+
+
+def _progress_rows(scale, rng, now):
+    """Each user reviews a random, distinct subset of the cards"""
+    per_user = scale.progress_rows // scale.users
+    for user_id in range(1, scale.users + 1):
+        for card_id in rng.sample(range(1, scale.cards + 1), min(per_user, scale.cards)):
+            review_count = rng.randint(1, 20)
+            confidence = rng.random()
+            reviewed_at = now - timedelta(hours=rng.randint(0, 24 * 60))
+            yield {
+                "user_id": user_id,
+                "card_id": card_id,
+                "confidence_score": confidence,
+                "review_count": review_count,
+                "last_reviewed_at": reviewed_at,
+                "next_due_at": next_due_at(confidence, review_count, reviewed_at),
+            }
+
+
+def generate(SessionFactory, scale: Scale, seed: int = 42) -> None:
+    """Fill an empty database with the given scale of data"""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    with SessionFactory() as db:
+        _insert_chunked(db, User, (
+            {"username": f"user{i}", "email": f"user{i}@example.com"}
+            for i in range(1, scale.users + 1)
+        ))
+        _insert_chunked(db, Deck, (
+            {"title": f"Deck {i}", "owner_id": rng.randint(1, scale.users)}
+            for i in range(1, scale.decks + 1)
+        ))
+        # Cards are spread round-robin so every deck has the same size
+        _insert_chunked(db, Card, (
+            {
+                "deck_id": i % scale.decks + 1,
+                "question": f"Question {i}",
+                "answer": f"Answer {i}",
+            }
+            for i in range(scale.cards)
+        ))
+        _insert_chunked(db, UserCardProgress, _progress_rows(scale, rng, now))
+        rebuild_deck_stats(db)
+        db.commit()
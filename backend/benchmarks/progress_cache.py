@@ -0,0 +1,88 @@
+"""
+Latency of repeated learn/recap calls with and without the progress cache.
+
+One user studies one large deck, half of which has been reviewed. Every
+call fetches the first page of cards, as a study client does. Run from
+backend/:
+
+    python -m benchmarks.progress_cache --cards 20000 --calls 200
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models import Card, Deck, User, UserCardProgress
+from app.routers.progress import get_user_cards
+from app.services.progress_cache import progress_cache
+
+
+def seed(SessionFactory, cards):
+    now = datetime.now(timezone.utc)
+    with SessionFactory() as db:
+        db.execute(insert(User), [{"username": "learner", "email": "learner@example.com"}])
+        db.execute(insert(Deck), [{"title": "Benchmark", "owner_id": 1}])
+        db.execute(insert(Card), [
+            {"deck_id": 1, "question": f"Question {i}", "answer": f"Answer {i}"}
+            for i in range(cards)
+        ])
+        db.execute(insert(UserCardProgress), [
+            {
+                "user_id": 1,
+                "card_id": card_id,
+                "confidence_score": (card_id % 10) / 10,
+                "review_count": 1,
+                "last_reviewed_at": now,
+            }
+            for card_id in range(1, cards + 1, 2)
+        ])
+        db.commit()
+
+
+def measure(SessionFactory, mode, calls, limit):
+    latencies = []
+    with SessionFactory() as db:
+        for _ in range(calls):
+            start = time.perf_counter()
+            get_user_cards(
+                user_id=1, request=None, mode=mode, deck_id=1,
+                limit=limit, cursor=None, format="json", db=db
+            )
+            latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies), statistics.quantiles(latencies, n=100)[94]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cards", type=int, default=20000)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        db_engine = create_db_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        Base.metadata.create_all(bind=db_engine)
+        SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
+        seed(SessionFactory, args.cards)
+        
+        print(f"{'mode':<8} {'cache':<6} {'p50 ms':>8} {'p95 ms':>8}")
+        enabled_bytes = progress_cache.max_bytes
+        for mode in ("learn", "recap"):
+            for label, max_bytes in (("off", 0), ("on", enabled_bytes)):
+                progress_cache.clear()
+                progress_cache.max_bytes = max_bytes
+                p50, p95 = measure(SessionFactory, mode, args.calls, args.limit)
+                print(f"{mode:<8} {label:<6} {p50:>8.2f} {p95:>8.2f}")
+        progress_cache.max_bytes = enabled_bytes
+        print(progress_cache.stats())
+        db_engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Throughput of the bulk rescoring job (app/services/rescoring.py).
+
+Fills a database with users x cards progress rows and a review history of
+`--reviews` events per row, then rescores it with each worker count. Run
+from backend/:
+
+    python -m benchmarks.rescoring --users 100 --cards 10000 --reviews 2 --workers 1 4
+"""
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models import Card, Deck, ReviewEvent, User, UserCardProgress
+from app.services.rescoring import rescore_all
+
+CHUNK_SIZE = 50000
+
+
+def seed(SessionFactory, users, cards, reviews):
+    rng = random.Random(11)
+    start = datetime(2024, 1, 1)
+    with SessionFactory() as db:
+        db.execute(insert(User), [
+            {"username": f"user{i}", "email": f"user{i}@example.com"} for i in range(users)
+        ])
+        db.execute(insert(Deck), [{"title": "Benchmark", "owner_id": 1}])
+        db.execute(insert(Card), [
+            {"deck_id": 1, "question": f"Question {i}", "answer": f"Answer {i}"} for i in range(cards)
+        ])
+        progress, events = [], []
+        for user_id in range(1, users + 1):
+            for card_id in range(1, cards + 1):
+                last = start + timedelta(minutes=reviews)
+                progress.append({
+                    "user_id": user_id, "card_id": card_id, "confidence_score": 0.0,
+                    "review_count": reviews, "last_reviewed_at": last,
+                })
+                events += [
+                    {
+                        "user_id": user_id, "card_id": card_id, "confidence": rng.random(),
+                        "reviewed_at": start + timedelta(minutes=minute + 1),
+                    }
+                    for minute in range(reviews)
+                ]
+                if len(events) >= CHUNK_SIZE:
+                    db.execute(insert(UserCardProgress), progress)
+                    db.execute(insert(ReviewEvent), events)
+                    progress, events = [], []
+        if progress:
+            db.execute(insert(UserCardProgress), progress)
+            db.execute(insert(ReviewEvent), events)
+        db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--cards", type=int, default=2000)
+    parser.add_argument("--reviews", type=int, default=3, help="review events per progress row")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--chunk-size", type=int, default=100000)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        db_engine = create_db_engine(url)
+        Base.metadata.create_all(bind=db_engine)
+        started = time.perf_counter()
+        seed(sessionmaker(bind=db_engine), args.users, args.cards, args.reviews)
+        rows = args.users * args.cards
+        print(f"Seeded {rows} progress rows, {rows * args.reviews} events in {time.perf_counter() - started:.1f}s")
+        db_engine.dispose()
+        
+        print(f"{'workers':>8} {'seconds':>9} {'events/s':>12} {'rows/s':>10}")
+        for workers in args.workers:
+            result = rescore_all(url, workers=workers, chunk_size=args.chunk_size)
+            print(
+                f"{workers:>8} {result.elapsed:>9.2f} {result.events / result.elapsed:>12.0f} "
+                f"{result.updated / result.elapsed:>10.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
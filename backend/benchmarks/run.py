@@ -0,0 +1,196 @@
+"""
+Latency, throughput and query-count benchmark for every API endpoint.
+
+Generates a dataset at the chosen scale (see benchmarks/datagen.py), drives
+the app in-process with TestClient and writes the results as JSON so runs
+can be compared over time. Run from backend/:
+
+    python -m benchmarks.run --scale small
+    python -m benchmarks.run --scale medium --compare benchmarks/results/<previous>.json
+"""
+import argparse
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import sqlalchemy
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine, get_db, get_read_db
+from app.main import create_app
+from app.services.progress_cache import progress_cache
+from benchmarks.datagen import SCALES, generate
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def scenarios(scale, rng):
+    """Scenario name -> factory of (method, url, json body) for one request"""
+    def user():
+        return rng.randint(1, scale.users)
+
+    def deck():
+        return rng.randint(1, scale.decks)
+
+    def card():
+        return rng.randint(1, scale.cards)
+
+    return {
+        "get_user_cards_learn": lambda: ("GET", f"/users/{user()}/cards?mode=learn&deck_id={deck()}", None),
+        "get_user_cards_recap": lambda: ("GET", f"/users/{user()}/cards?mode=recap&deck_id={deck()}", None),
+        "get_user_cards_learn_all_decks_page": lambda: ("GET", f"/users/{user()}/cards?mode=learn&limit=50", None),
+        "get_review_queue": lambda: ("GET", f"/users/{user()}/queue?n=20", None),
+        "record_review": lambda: ("POST", "/reviews", {
+            "user_id": user(), "card_id": card(), "confidence": round(rng.random(), 2)
+        }),
+        "list_cards": lambda: ("GET", f"/decks/{deck()}/cards", None),
+        "list_decks": lambda: ("GET", "/decks/", None),
+        "list_decks_by_owner": lambda: ("GET", f"/decks/?owner_id={user()}", None),
+    }
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_scenario(client, make_request, requests, query_counter):
+    latencies = []
+    queries = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        method, url, body = make_request()
+        query_counter["count"] = 0
+        request_started = time.perf_counter()
+        response = client.request(method, url, json=body)
+        latencies.append((time.perf_counter() - request_started) * 1000)
+        queries.append(query_counter["count"])
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {url} -> {response.status_code}: {response.text}")
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        "queries_per_request": round(statistics.fmean(queries), 2),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, previous_path):
+    previous = json.loads(Path(previous_path).read_text())
+    print(f"\nvs {previous_path} ({previous.get('git_commit')}, scale {previous['scale']})")
+    print(f"{'scenario':<40} {'p50 Δ%':>8} {'p99 Δ%':>8} {'rps Δ%':>8}")
+    for name, result in current["results"].items():
+        before = previous["results"].get(name)
+        if not before:
+            continue
+        deltas = [
+            (result[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            for key in ("p50_ms", "p99_ms", "throughput_rps")
+        ]
+        print(f"{name:<40} {deltas[0]:>+8.1f} {deltas[1]:>+8.1f} {deltas[2]:>+8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", choices=list(SCALES), default="small")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--only", nargs="*", help="run only these scenarios")
+    parser.add_argument("--no-cache", action="store_true", help="disable the progress cache")
+    parser.add_argument("--output", type=Path, default=None, help="result file (default: results/<time>-<scale>.json)")
+    parser.add_argument("--compare", help="previous result file to compare against")
+    args = parser.parse_args()
+
+    scale = SCALES[args.scale]
+    rng = random.Random(7)
+    if args.no_cache:
+        progress_cache.max_bytes = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_engine = create_db_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        Base.metadata.create_all(bind=db_engine)
+        SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
+
+        started = time.perf_counter()
+        generate(SessionFactory, scale)
+        print(f"Generated scale '{args.scale}' {scale} in {time.perf_counter() - started:.1f}s")
+
+        query_counter = {"count": 0}
+
+        @event.listens_for(db_engine, "before_cursor_execute")
+        def count_query(conn, cursor, statement, parameters, context, executemany):
+            query_counter["count"] += 1
+
+        def override_get_db():
+            db = SessionFactory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app = create_app(async_db=False)
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_read_db] = override_get_db
+
+        results = {}
+        with TestClient(app) as client:
+            for name, make_request in scenarios(scale, rng).items():
+                if args.only and name not in args.only:
+                    continue
+                results[name] = run_scenario(client, make_request, args.requests, query_counter)
+                result = results[name]
+                print(
+                    f"{name:<40} p50 {result['p50_ms']:>8.2f}ms  p95 {result['p95_ms']:>8.2f}ms  "
+                    f"p99 {result['p99_ms']:>8.2f}ms  {result['throughput_rps']:>8.1f} req/s  "
+                    f"{result['queries_per_request']:>5.1f} q/req"
+                )
+        db_engine.dispose()
+
+    report = {
+        "scale": args.scale,
+        "dataset": scale.__dict__,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "progress_cache": not args.no_cache,
+        "environment": {
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    output = args.output or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{args.scale}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Saved {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Card search latency: the FTS5 index behind GET /cards/search versus a
+LIKE '%term%' scan over questions and answers.
+
+Cards are built from a fixed vocabulary, so common and rare terms both
+have matches. Run from backend/:
+
+    python -m benchmarks.search --cards 100000 --queries 50
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import insert, or_, select
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models import Card, Deck, User
+from app.schemas import CardResponse
+from app.serialization import schema_columns
+from app.services.search import search_cards
+
+LIMIT = 20
+
+
+def vocabulary(rng, size=5000):
+    """Distinct random words, so a query prefix expands to a handful of terms"""
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 9))))
+    return sorted(words, key=lambda word: rng.random())
+
+
+def seed(SessionFactory, cards, words, rng):
+    def sentence(length):
+        # Zipf-like: the first words of the vocabulary are far more common
+        return " ".join(words[int(rng.paretovariate(1.2)) % len(words)] for _ in range(length))
+
+    with SessionFactory() as db:
+        db.execute(insert(User), [{"username": "learner", "email": "learner@example.com"}])
+        db.execute(insert(Deck), [{"title": "Benchmark", "owner_id": 1}])
+        for start in range(0, cards, 10000):
+            db.execute(insert(Card), [
+                {"deck_id": 1, "question": sentence(8), "answer": sentence(20)}
+                for _ in range(start, min(start + 10000, cards))
+            ])
+        db.commit()
+
+
+def like_search(db, term):
+    pattern = f"%{term}%"
+    return db.execute(
+        select(*schema_columns(Card, CardResponse)).where(
+            or_(Card.question.like(pattern), Card.answer.like(pattern))
+        ).order_by(Card.id).limit(LIMIT)
+    ).all()
+
+
+def measure(search, db, terms):
+    latencies = []
+    for term in terms:
+        started = time.perf_counter()
+        search(db, term)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return statistics.median(latencies), max(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cards", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(13)
+    words = vocabulary(rng)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_engine = create_db_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        Base.metadata.create_all(bind=db_engine)
+        SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
+        started = time.perf_counter()
+        seed(SessionFactory, args.cards, words, rng)
+        print(f"Seeded {args.cards} cards (index maintained by triggers) in {time.perf_counter() - started:.1f}s")
+
+        # Common terms match early in a scan; rare ones make LIKE read every row
+        workloads = {
+            "common": [rng.choice(words[1:6]) for _ in range(args.queries)],
+            "rare": [rng.choice(words[2000:]) for _ in range(args.queries)],
+        }
+        print(f"{'terms':<8} {'fts p50':>9} {'fts max':>9} {'like p50':>9} {'like max':>9}")
+        with SessionFactory() as db:
+            for name, terms in workloads.items():
+                fts = measure(lambda session, term: search_cards(session, term, limit=LIMIT), db, terms)
+                like = measure(like_search, db, terms)
+                print(f"{name:<8} {fts[0]:>8.2f}ms {fts[1]:>8.2f}ms {like[0]:>8.2f}ms {like[1]:>8.2f}ms")
+        db_engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+CPU per response of the list endpoints: column tuples encoded by orjson
+versus ORM objects validated into Pydantic models and serialized again
+through `response_model`, as the endpoints did before.
+
+Both paths read the same rows from the same database; the benchmark checks
+that they produce identical JSON before timing them. Run from backend/:
+
+    python -m benchmarks.serialization --cards 5000 --calls 50
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import and_
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models import Card, Deck, UserCardProgress
+from app.routers.cards import list_cards
+from app.routers.decks import list_decks
+from app.routers.progress import _load_cards_with_progress
+from app.schemas import CardResponse, CardWithProgress, DeckResponse, ProgressResponse
+from app.serialization import FastJSONResponse
+from benchmarks.progress_cache import seed
+
+
+def render_response_model(response_model, content):
+    """What FastAPI does with a returned value: validate, dump and encode"""
+    adapter = TypeAdapter(response_model)
+    validated = adapter.validate_python(content, from_attributes=True)
+    return JSONResponse(adapter.dump_python(validated, mode="json")).body
+
+
+def model_list_cards(db):
+    cards = db.query(Card).filter(Card.deck_id == 1).all()
+    return render_response_model(List[CardResponse], cards)
+
+
+def model_list_decks(db):
+    return render_response_model(List[DeckResponse], db.query(Deck).all())
+
+
+def model_user_cards(db, card_ids):
+    rows = db.query(Card, UserCardProgress).outerjoin(
+        UserCardProgress,
+        and_(UserCardProgress.card_id == Card.id, UserCardProgress.user_id == 1)
+    ).filter(Card.id.in_(card_ids)).order_by(Card.id)
+    items = [
+        CardWithProgress(
+            card=CardResponse.model_validate(card),
+            progress=ProgressResponse.model_validate(progress) if progress else None
+        )
+        for card, progress in rows
+        if progress is None or progress.confidence_score < 0.7
+    ]
+    return render_response_model(List[CardWithProgress], items)
+
+
+def fast_user_cards(db, card_ids):
+    return FastJSONResponse(list(_load_cards_with_progress(db, 1, "learn", card_ids))).body
+
+
+def cpu_ms(render, db, calls):
+    samples = []
+    for _ in range(calls):
+        db.expire_all()
+        start = time.process_time()
+        render(db)
+        samples.append((time.process_time() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cards", type=int, default=5000)
+    parser.add_argument("--calls", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_engine = create_db_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        Base.metadata.create_all(bind=db_engine)
+        SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
+        seed(SessionFactory, args.cards)
+        card_ids = list(range(1, args.cards + 1))
+
+        endpoints = {
+            "list_cards": (
+                model_list_cards,
+                lambda db: list_cards(deck_id=1, request=None, format="json", limit=None, cursor=None, db=db).body,
+            ),
+            "list_decks": (
+                model_list_decks,
+                lambda db: list_decks(request=None, owner_id=None, user_id=None, limit=None, cursor=None, db=db).body,
+            ),
+            "get_user_cards": (
+                lambda db: model_user_cards(db, card_ids),
+                lambda db: fast_user_cards(db, card_ids),
+            ),
+        }
+
+        print(f"{'endpoint':<16} {'models ms':>10} {'tuples ms':>10} {'speedup':>8}")
+        with SessionFactory() as db:
+            for name, (model_path, fast_path) in endpoints.items():
+                if json.loads(model_path(db)) != json.loads(fast_path(db)):
+                    raise RuntimeError(f"{name}: fast path output differs")
+                before = cpu_ms(model_path, db, args.calls)
+                after = cpu_ms(fast_path, db, args.calls)
+                print(f"{name:<16} {before:>10.2f} {after:>10.2f} {before / after:>7.1f}x")
+        db_engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Concurrent read/write throughput under each SQLite connection profile.
+
+Writer threads record reviews while reader threads fetch pages of learn
+mode cards, all against the same database file. Run from backend/:
+
+    python -m benchmarks.sqlite_profile --seconds 5 --writers 4 --readers 4
+"""
+import argparse
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from fastapi import Response
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models import Card, Deck, User
+from app.routers.progress import get_user_cards
+from app.services.reviews import upsert_review
+
+
+def seed(SessionFactory, users, cards):
+    with SessionFactory() as db:
+        db.execute(insert(User), [
+            {"username": f"user{i}", "email": f"user{i}@example.com"}
+            for i in range(users)
+        ])
+        db.execute(insert(Deck), [{"title": "Benchmark", "owner_id": 1}])
+        db.execute(insert(Card), [
+            {"deck_id": 1, "question": f"Question {i}", "answer": f"Answer {i}"}
+            for i in range(cards)
+        ])
+        db.commit()
+
+
+def run_profile(profile, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_engine = create_db_engine(f"sqlite:///{Path(tmp) / 'bench.db'}", profile=profile)
+        Base.metadata.create_all(bind=db_engine)
+        SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
+        seed(SessionFactory, args.users, args.cards)
+        
+        counts = {"reads": 0, "writes": 0, "errors": 0}
+        lock = threading.Lock()
+        stop = threading.Event()
+        
+        def writer():
+            rng = random.Random()
+            while not stop.is_set():
+                try:
+                    with SessionFactory() as db:
+                        upsert_review(
+                            db, rng.randint(1, args.users), rng.randint(1, args.cards),
+                            rng.random(), datetime.now(timezone.utc)
+                        )
+                        db.commit()
+                    key = "writes"
+                except OperationalError:
+                    key = "errors"
+                with lock:
+                    counts[key] += 1
+        
+        def reader():
+            rng = random.Random()
+            while not stop.is_set():
+                try:
+                    with SessionFactory() as db:
+                        get_user_cards(
+                            rng.randint(1, args.users), Response(), "learn", 1, 50, None, db
+                        )
+                    key = "reads"
+                except OperationalError:
+                    key = "errors"
+                with lock:
+                    counts[key] += 1
+        
+        threads = [threading.Thread(target=writer) for _ in range(args.writers)]
+        threads += [threading.Thread(target=reader) for _ in range(args.readers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        db_engine.dispose()
+    
+    return {key: value / args.seconds for key, value in counts.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--cards", type=int, default=2000)
+    args = parser.parse_args()
+    
+    print(f"{'profile':<12} {'reads/s':>10} {'writes/s':>10} {'errors/s':>10}")
+    for profile in ("default", "performance"):
+        result = run_profile(profile, args)
+        print(
+            f"{profile:<12} {result['reads']:>10.0f} "
+            f"{result['writes']:>10.0f} {result['errors']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
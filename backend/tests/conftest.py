@@ -7,12 +7,17 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import StaticPool
-from typing import Generator
+from typing import AsyncGenerator, Generator
 
-from app.database import Base, get_db
-from app.main import app
+from app.database import Base, get_db, get_async_db, get_read_db, get_async_read_db
+from app.main import app, create_app
+from app.metrics import instrument_engine
+from app.services.progress_cache import progress_cache
+from app.services.review_writer import review_writer
+from app.services.study_sessions import study_sessions
 
 
 # Test database configuration
@@ -25,10 +30,22 @@ engine = create_engine(
 )
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+instrument_engine(engine)
 
 # Create all tables once at module load
 Base.metadata.create_all(bind=engine)
 
+# Separate in-memory database for the app running in async mode
+async_engine = create_async_engine(
+    "sqlite+aiosqlite:///:memory:",
+    poolclass=StaticPool,
+)
+
+TestingAsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+instrument_engine(async_engine.sync_engine)
+
 
 def override_get_db() -> Generator[Session, None, None]:
     """
@@ -44,16 +61,47 @@ def override_get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+async def override_get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Override the async database dependency for tests.
+    
+    Yields:
+        AsyncSession: An async database session for testing
+    """
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+
+async def reset_async_database() -> None:
+    """Recreate all tables in the async test database"""
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+# The write-behind writer and expired study sessions commit through their own sessions
+review_writer.session_factory = TestingSessionLocal
+study_sessions.session_factory = TestingSessionLocal
+
+# The same routers served with sync and async database sessions
+apps = {"sync": app, "async": create_app(async_db=True)}
+
 # Override the dependency globally for all tests
-app.dependency_overrides[get_db] = override_get_db
+for test_app in apps.values():
+    test_app.dependency_overrides[get_db] = override_get_db
+    test_app.dependency_overrides[get_async_db] = override_get_async_db
+    # No replica in tests unless a test routes reads itself (see test_database.py)
+    test_app.dependency_overrides[get_read_db] = override_get_db
+    test_app.dependency_overrides[get_async_read_db] = override_get_async_db
 
 
-@pytest.fixture(scope="function")
-def client() -> Generator[TestClient, None, None]:
+@pytest.fixture(scope="function", params=list(apps))
+def client(request) -> Generator[TestClient, None, None]:
     """
     Provide a test client with a clean database for each test.
     
-    The database is cleared before each test to ensure test isolation.
+    Every test runs once against the sync app and once against the async
+    app. The database is cleared before each test to ensure test isolation.
     
     Yields:
         TestClient: A test client for making API requests
@@ -62,6 +110,9 @@ def client() -> Generator[TestClient, None, None]:
     with engine.begin() as conn:
         for table in reversed(Base.metadata.sorted_tables):
             conn.execute(table.delete())
+    progress_cache.clear()
     
-    with TestClient(app) as test_client:
+    with TestClient(apps[request.param]) as test_client:
+        if request.param == "async":
+            test_client.portal.call(reset_async_database)
         yield test_client
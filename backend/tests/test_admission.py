@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+from fastapi import Request
+
+from app import streaming
+from app.admission import Overloaded, RouteLimit, _request_user, admission
+
+
+def test_route_limit_queues_then_sheds():
+    """Test that a full limit queues up to max_queue, hands places over in order and times out"""
+    async def scenario():
+        limit = RouteLimit("test", max_concurrent=1, max_queue=1, max_wait=0.05, max_per_user=0)
+        await limit.acquire()
+        
+        waiter = asyncio.ensure_future(limit.acquire())
+        await asyncio.sleep(0)
+        assert (limit.active, limit.waiting) == (1, 1)
+        with pytest.raises(Overloaded) as refused:
+            await limit.acquire()
+        assert refused.value.reason == "queue_full"
+        
+        # The finished request's place goes to the waiter
+        limit.release()
+        await waiter
+        assert (limit.active, limit.waiting, limit.queued) == (1, 0, 1)
+        
+        with pytest.raises(Overloaded) as refused:
+            await limit.acquire()
+        assert refused.value.reason == "timeout"
+        limit.release()
+        assert limit.stats() == {
+            "active": 0, "waiting": 0, "admitted": 2, "queued": 1,
+            "rejected": {"queue_full": 1, "timeout": 1},
+        }
+    
+    asyncio.run(scenario())
+
+
+def test_route_limit_caps_each_user():
+    """Test that one user cannot hold more than max_per_user places"""
+    async def scenario():
+        limit = RouteLimit("test", max_concurrent=4, max_queue=4, max_wait=0.05, max_per_user=1)
+        await limit.acquire(1)
+        with pytest.raises(Overloaded) as refused:
+            await limit.acquire(1)
+        assert refused.value.reason == "user_limit"
+        await limit.acquire(2)
+        
+        limit.release(1)
+        await limit.acquire(1)
+        assert limit.active == 2
+    
+    asyncio.run(scenario())
+
+
+def test_saturated_route_sheds_without_blocking_reviews(client, monkeypatch):
+    """Test that a saturated listing answers 503 with Retry-After while reviews go through"""
+    user_id = client.post(
+        "/users/",
+        json={"username": "testuser", "email": "test@example.com"}
+    ).json()["id"]
+    deck_id = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    ).json()["id"]
+    card_id = client.post(
+        f"/decks/{deck_id}/cards",
+        json={"question": "Q1", "answer": "A1"}
+    ).json()["id"]
+    
+    user_cards = admission.limits["user_cards"]
+    rejected = user_cards.rejected["queue_full"]
+    # Every place taken and no room to wait
+    monkeypatch.setattr(user_cards, "max_concurrent", 0)
+    monkeypatch.setattr(user_cards, "max_queue", 0)
+    
+    response = client.get(f"/users/{user_id}/cards?mode=learn")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert user_cards.rejected["queue_full"] == rejected + 1
+    
+    response = client.post("/reviews", json={"user_id": user_id, "card_id": card_id, "confidence": 0.5})
+    assert response.status_code == 201
+    assert client.get(f"/decks/{deck_id}/cards").status_code == 200
+    
+    body = client.get("/metrics").text
+    assert (
+        f'flashcards_admission_rejected_total{{route="user_cards",reason="queue_full"}} {rejected + 1}'
+        in body
+    )
+
+
+def test_place_is_held_until_the_stream_is_sent(client, monkeypatch):
+    """Test that a streamed listing keeps its place while the body is sent, and every exit frees it"""
+    user_id = client.post(
+        "/users/",
+        json={"username": "testuser", "email": "test@example.com"}
+    ).json()["id"]
+    deck_id = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    ).json()["id"]
+    client.post(f"/decks/{deck_id}/cards", json={"question": "Q1", "answer": "A1"})
+    
+    user_cards = admission.limits["user_cards"]
+    active_while_streaming = []
+    dumps = streaming.dumps
+    
+    def dumps_and_count(item):
+        active_while_streaming.append(user_cards.active)
+        return dumps(item)
+    
+    monkeypatch.setattr(streaming, "dumps", dumps_and_count)
+    response = client.get(f"/users/{user_id}/cards?mode=learn&format=ndjson")
+    assert response.status_code == 200
+    assert active_while_streaming == [1]
+    assert user_cards.active == 0
+    
+    # Handler errors and rejected parameters release the place too
+    assert client.get("/users/999/cards?mode=learn").status_code == 404
+    assert client.get(f"/users/{user_id}/cards?mode=cram").status_code == 422
+    assert user_cards.stats()["active"] == 0
+    assert user_cards._users == {}
+
+
+def test_owner_listing_counts_against_its_user():
+    """Test that owner_id identifies the user as user_id does"""
+    def request(path_params, query_string):
+        return Request({
+            "type": "http",
+            "path_params": path_params,
+            "query_string": query_string,
+            "headers": [],
+        })
+    
+    assert _request_user(request({"user_id": 3}, b"")) == 3
+    assert _request_user(request({}, b"user_id=4")) == 4
+    assert _request_user(request({}, b"owner_id=5&skip=10")) == 5
+    assert _request_user(request({}, b"owner_id=abc")) is None
+    assert _request_user(request({}, b"")) is None
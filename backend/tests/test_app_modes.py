@@ -0,0 +1,66 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi.routing import APIRoute
+
+from app.main import app, create_app
+from app.services import card_import
+from app.services.study_sessions import study_sessions
+
+
+def test_async_app_serves_async_endpoints():
+    """Test that every router endpoint in async mode is an async def endpoint"""
+    routes = [
+        route for route in create_app(async_db=True).routes
+        if isinstance(route, APIRoute) and route.endpoint.__module__.startswith("app.routers")
+    ]
+    assert routes
+    for route in routes:
+        assert asyncio.iscoroutinefunction(route.endpoint), route.path
+
+
+def test_openapi_schema_matches_between_modes():
+    """Test that switching database mode does not change the API contract"""
+    assert app.openapi() == create_app(async_db=True).openapi()
+
+
+@pytest.mark.parametrize("client", ["async"], indirect=True)
+def test_async_handlers_keep_blocking_work_off_the_loop(client, monkeypatch):
+    """Test that session-less handlers and upload parsing run in worker threads in async mode"""
+    loop_thread = client.portal.call(threading.get_ident)
+    threads = {}
+    
+    review = study_sessions.review
+    
+    def recording_review(*args):
+        threads["session_review"] = threading.get_ident()
+        return review(*args)
+    
+    read_csv = card_import._read_csv
+    
+    def recording_read_csv(text):
+        for item in read_csv(text):
+            threads["import_parse"] = threading.get_ident()
+            yield item
+    
+    monkeypatch.setattr(study_sessions, "review", recording_review)
+    monkeypatch.setattr(card_import, "_read_csv", recording_read_csv)
+    
+    user_id = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    ).json()["id"]
+    deck_id = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    ).json()["id"]
+    response = client.post(
+        f"/decks/{deck_id}/import",
+        files={"file": ("cards.csv", b"question,answer\nQ,A\n", "text/csv")}
+    )
+    assert response.json()["inserted"] == 1
+    assert client.post("/sessions/unknown/reviews", json={"card_id": 1, "confidence": 0.5}).status_code == 404
+    
+    assert set(threads) == {"session_review", "import_parse"}
+    assert loop_thread not in threads.values()
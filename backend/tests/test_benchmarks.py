@@ -0,0 +1,21 @@
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models import Card, UserCardProgress
+from benchmarks.datagen import Scale, generate
+
+
+def test_datagen_fills_requested_scale(tmp_path):
+    """Test that the benchmark data generator produces the requested row counts"""
+    db_engine = create_db_engine(f"sqlite:///{tmp_path / 'bench.db'}")
+    Base.metadata.create_all(bind=db_engine)
+    SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
+    
+    generate(SessionFactory, Scale(users=3, decks=2, cards=10, progress_rows=9))
+    
+    with SessionFactory() as db:
+        assert db.query(func.count(Card.id)).scalar() == 10
+        assert db.query(func.count(UserCardProgress.id)).scalar() == 9
+        assert db.query(func.count(func.distinct(Card.deck_id))).scalar() == 2
+    db_engine.dispose()
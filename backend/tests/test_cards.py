@@ -0,0 +1,610 @@
+import gzip
+import json
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.models import User
+from app.routers import cards as cards_router
+from app.schemas import CardResponse, DeckResponse
+from app.services import card_import
+
+
+def test_list_cards_streams_ndjson(client):
+    """Test that format=ndjson streams one card per line in id order"""
+    # Setup
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    deck_response = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    )
+    deck_id = deck_response.json()["id"]
+    
+    for i in range(3):
+        client.post(
+            f"/decks/{deck_id}/cards",
+            json={"question": f"Question {i}", "answer": f"Answer {i}"}
+        )
+    
+    response = client.get(f"/decks/{deck_id}/cards?format=ndjson")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == client.get(f"/decks/{deck_id}/cards").json()
+    
+    # Accept header negotiation
+    response = client.get(
+        f"/decks/{deck_id}/cards",
+        headers={"Accept": "application/x-ndjson"}
+    )
+    assert len(response.text.splitlines()) == 3
+
+
+def test_list_endpoints_fast_path_matches_response_model(client):
+    """Test that the column-tuple responses match the declared response models"""
+    # Setup
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    deck_response = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "description": None, "owner_id": user_id}
+    )
+    deck = deck_response.json()
+    
+    card = client.post(
+        f"/decks/{deck['id']}/cards",
+        json={"question": "Question", "answer": "Answer"}
+    ).json()
+    
+    cards = client.get(f"/decks/{deck['id']}/cards").json()
+    assert cards == [card]
+    assert CardResponse.model_validate(cards[0]).model_dump(mode="json") == card
+    
+    decks = client.get("/decks/").json()
+    assert decks == [deck]
+    assert DeckResponse.model_validate(decks[0]).model_dump(mode="json") == deck
+    
+    # The documented schemas are unchanged
+    paths = client.get("/openapi.json").json()["paths"]
+    cards_schema = paths["/decks/{deck_id}/cards"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert cards_schema["items"] == {"$ref": "#/components/schemas/CardResponse"}
+    decks_schema = paths["/decks/"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert decks_schema["items"] == {"$ref": "#/components/schemas/DeckResponse"}
+
+
+def test_card_listing_conditional_get(client):
+    """Test that the card listing ETag changes only when the deck's cards do"""
+    # Setup
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    deck_response = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    )
+    deck_id = deck_response.json()["id"]
+    
+    response = client.get(f"/decks/{deck_id}/cards")
+    etag = response.headers["ETag"]
+    
+    # Unchanged deck: 304 with no body
+    response = client.get(f"/decks/{deck_id}/cards", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    
+    # Weak and listed tags match too
+    response = client.get(f"/decks/{deck_id}/cards", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert response.status_code == 304
+    
+    # NDJSON is a different representation
+    response = client.get(f"/decks/{deck_id}/cards?format=ndjson", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    
+    # A new card bumps the deck version
+    client.post(
+        f"/decks/{deck_id}/cards",
+        json={"question": "Question", "answer": "Answer"}
+    )
+    response = client.get(f"/decks/{deck_id}/cards", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+    assert response.headers["ETag"] != etag
+    
+    # So does an import
+    etag = response.headers["ETag"]
+    client.post(
+        f"/decks/{deck_id}/import",
+        files={"file": ("cards.csv", b"question,answer\nQ,A\n", "text/csv")}
+    )
+    response = client.get(f"/decks/{deck_id}/cards", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+
+
+def test_deck_listing_conditional_get(client):
+    """Test that the deck listing ETag changes when a deck is added or written"""
+    # Setup
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    deck_id = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    ).json()["id"]
+    
+    etag = client.get("/decks/").headers["ETag"]
+    owner_etag = client.get(f"/decks/?owner_id={user_id}").headers["ETag"]
+    assert owner_etag != etag
+    assert client.get("/decks/", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/decks/", headers={"If-None-Match": "*"}).status_code == 304
+    
+    client.post(
+        "/decks/",
+        json={"title": "Second Deck", "owner_id": user_id}
+    )
+    response = client.get("/decks/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    
+    etag = response.headers["ETag"]
+    client.post(
+        f"/decks/{deck_id}/cards",
+        json={"question": "Question", "answer": "Answer"}
+    )
+    assert client.get("/decks/", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_list_cards_keyset_pages(client):
+    """Test that limit and cursor page through a deck's cards in id order"""
+    # Setup
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    deck_id = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    ).json()["id"]
+    for i in range(5):
+        client.post(
+            f"/decks/{deck_id}/cards",
+            json={"question": f"Question {i}", "answer": f"Answer {i}"}
+        )
+    
+    # Walk the pages until no cursor is returned, in both formats
+    for format in ("json", "ndjson"):
+        pages = []
+        params = {"limit": 2, "format": format}
+        while True:
+            response = client.get(f"/decks/{deck_id}/cards", params=params)
+            assert response.status_code == 200
+            if format == "json":
+                pages.append([card["question"] for card in response.json()])
+            else:
+                pages.append([json.loads(line)["question"] for line in response.text.splitlines()])
+            
+            # Each page has its own ETag
+            etag = response.headers["ETag"]
+            assert client.get(
+                f"/decks/{deck_id}/cards", params=params, headers={"If-None-Match": etag}
+            ).status_code == 304
+            
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+            params["cursor"] = cursor
+        assert pages == [["Question 0", "Question 1"], ["Question 2", "Question 3"], ["Question 4"]]
+    
+    response = client.get(f"/decks/{deck_id}/cards?limit=2&cursor=not-a-cursor")
+    assert response.status_code == 400
+
+
+def test_list_decks_keyset_pages(client):
+    """Test that limit and cursor page through decks, with per-page ETags"""
+    # Setup
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    other_id = client.post(
+        "/users/",
+        json={"username": "other", "email": "other@example.com"}
+    ).json()["id"]
+    
+    deck_ids = []
+    for i in range(3):
+        deck_ids.append(client.post(
+            "/decks/",
+            json={"title": f"Deck {i}", "owner_id": user_id}
+        ).json()["id"])
+        client.post("/decks/", json={"title": f"Other {i}", "owner_id": other_id})
+    
+    first = client.get(f"/decks/?owner_id={user_id}&limit=2")
+    assert [deck["id"] for deck in first.json()] == deck_ids[:2]
+    cursor = first.headers["X-Next-Cursor"]
+    
+    second = client.get(f"/decks/?owner_id={user_id}&limit=2&cursor={cursor}")
+    assert [deck["id"] for deck in second.json()] == deck_ids[2:]
+    assert "X-Next-Cursor" not in second.headers
+    
+    # A card write bumps the deck's version, which changes only that page's ETag
+    etag = first.headers["ETag"]
+    assert client.get(
+        f"/decks/?owner_id={user_id}&limit=2", headers={"If-None-Match": etag}
+    ).status_code == 304
+    client.post(
+        f"/decks/{deck_ids[0]}/cards",
+        json={"question": "Question", "answer": "Answer"}
+    )
+    assert client.get(
+        f"/decks/?owner_id={user_id}&limit=2", headers={"If-None-Match": etag}
+    ).status_code == 200
+    assert client.get(
+        f"/decks/?owner_id={user_id}&limit=2&cursor={cursor}",
+        headers={"If-None-Match": second.headers["ETag"]}
+    ).status_code == 304
+    
+    response = client.get("/decks/?limit=4")
+    assert len(response.json()) == 4
+    # One component per deck on the page, but a fixed-size header
+    assert len(response.headers["ETag"]) == len(first.headers["ETag"]) == 34
+
+
+def test_list_cards_ndjson_missing_deck(client):
+    """Test that streaming still returns 404 for an unknown deck"""
+    response = client.get("/decks/999/cards?format=ndjson")
+    assert response.status_code == 404
+
+
+def test_create_duplicate_card_returns_existing(client):
+    """Test that adding a card the deck already has returns that card instead"""
+    # Setup
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    deck_response = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    )
+    deck_id = deck_response.json()["id"]
+    
+    first = client.post(
+        f"/decks/{deck_id}/cards",
+        json={"question": "What is 2+2?", "answer": "4"}
+    )
+    assert first.status_code == 201
+    
+    # Case and whitespace differences do not make a new card
+    duplicate = client.post(
+        f"/decks/{deck_id}/cards",
+        json={"question": "  what is  2+2? ", "answer": "4"}
+    )
+    assert duplicate.status_code == 200
+    assert duplicate.json() == first.json()
+    
+    other = client.post(
+        f"/decks/{deck_id}/cards",
+        json={"question": "What is 2+2?", "answer": "Four"}
+    )
+    assert other.status_code == 201
+    assert len(client.get(f"/decks/{deck_id}/cards").json()) == 2
+
+
+def test_import_csv_cards(client):
+    """Test that a CSV upload inserts valid rows and reports rejected ones"""
+    # Setup
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    deck_response = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    )
+    deck_id = deck_response.json()["id"]
+    
+    upload = "question,answer\nHola?,Hello\n\"Uno, dos?\",\"One, two\"\nMissing answer\n"
+    response = client.post(
+        f"/decks/{deck_id}/import",
+        files={"file": ("spanish.csv", upload, "text/csv")}
+    )
+    assert response.status_code == 201
+    data = response.json()
+    assert data["inserted"] == 2
+    assert data["duplicates"] == 0
+    assert data["rejected_count"] == 1
+    assert data["rejected"][0]["line"] == 4
+    assert data["elapsed_ms"] >= 0
+    
+    cards = client.get(f"/decks/{deck_id}/cards").json()
+    assert [card["question"] for card in cards] == ["Hola?", "Uno, dos?"]
+
+
+def test_import_jsonl_cards_in_chunks(client, monkeypatch):
+    """Test that a JSON-lines upload is inserted across several chunks"""
+    monkeypatch.setattr(card_import, "IMPORT_CHUNK_SIZE", 2)
+    
+    # Setup
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    deck_response = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    )
+    deck_id = deck_response.json()["id"]
+    
+    lines = [json.dumps({"question": f"Question {i}", "answer": f"Answer {i}"}) for i in range(5)]
+    lines.insert(2, "{not json")
+    lines.append(json.dumps({"question": "No answer"}))
+    response = client.post(
+        f"/decks/{deck_id}/import",
+        files={"file": ("deck.jsonl", "\n".join(lines) + "\n", "application/octet-stream")}
+    )
+    assert response.status_code == 201
+    data = response.json()
+    assert data["inserted"] == 5
+    assert data["duplicates"] == 0
+    assert [row["line"] for row in data["rejected"]] == [3, 7]
+    assert len(client.get(f"/decks/{deck_id}/cards").json()) == 5
+
+
+def test_import_skips_duplicate_cards(client, monkeypatch):
+    """Test that an import skips cards already in the deck or repeated in the file"""
+    monkeypatch.setattr(card_import, "IMPORT_CHUNK_SIZE", 2)
+    
+    # Setup
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    deck_response = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    )
+    deck_id = deck_response.json()["id"]
+    
+    client.post(f"/decks/{deck_id}/cards", json={"question": "Hola?", "answer": "Hello"})
+    
+    upload = "question,answer\nHOLA?,hello\nAdios?,Goodbye\nGracias?,Thanks\nadios?,goodbye\n"
+    response = client.post(
+        f"/decks/{deck_id}/import",
+        files={"file": ("spanish.csv", upload, "text/csv")}
+    )
+    assert response.status_code == 201
+    data = response.json()
+    assert data["inserted"] == 2
+    assert data["duplicates"] == 2
+    
+    cards = client.get(f"/decks/{deck_id}/cards").json()
+    assert [card["question"] for card in cards] == ["Hola?", "Adios?", "Gracias?"]
+
+
+def test_import_rejects_unknown_format(client):
+    """Test that uploads without a recognizable format are refused"""
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    deck_response = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    )
+    deck_id = deck_response.json()["id"]
+    
+    response = client.post(
+        f"/decks/{deck_id}/import",
+        files={"file": ("deck.txt", "question,answer\n", "text/plain")}
+    )
+    assert response.status_code == 400
+
+
+def test_export_round_trips_through_import(client):
+    """Test that every export format imports back into an identical deck"""
+    # Setup: a deck with three cards, one of them reviewed
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    deck_response = client.post(
+        "/decks/",
+        json={"title": "Source Deck", "description": "Backup me", "owner_id": user_id}
+    )
+    deck_id = deck_response.json()["id"]
+    
+    card_ids = [
+        client.post(
+            f"/decks/{deck_id}/cards",
+            json={"question": question, "answer": answer}
+        ).json()["id"]
+        for question, answer in [("Hola?", "Hello"), ("Uno, dos?", "One,\ntwo"), ("Adiós?", "Bye")]
+    ]
+    client.post(
+        "/reviews",
+        json={"user_id": user_id, "card_id": card_ids[1], "confidence": 0.9}
+    )
+    
+    def snapshot(target_deck_id):
+        cards = client.get(
+            f"/users/{user_id}/cards?mode=learn&deck_id={target_deck_id}"
+        ).json() + client.get(
+            f"/users/{user_id}/cards?mode=recap&deck_id={target_deck_id}"
+        ).json()
+        return sorted(
+            (
+                item["card"]["question"],
+                item["card"]["answer"],
+                item["progress"] and {
+                    key: item["progress"][key]
+                    for key in ["confidence_score", "review_count", "last_reviewed_at", "next_due_at"]
+                },
+            )
+            for item in cards
+        )
+    
+    for export_format in ["jsonl", "csv"]:
+        for compress in [True, False]:
+            export = client.get(
+                f"/decks/{deck_id}/export",
+                params={"format": export_format, "user_id": user_id, "compress": compress}
+            )
+            assert export.status_code == 200
+            filename = export.headers["content-disposition"].split('filename="')[1].rstrip('"')
+            assert filename.endswith(".gz") == compress
+            
+            target_id = client.post(
+                "/decks/",
+                json={"title": f"Copy {export_format}", "owner_id": user_id}
+            ).json()["id"]
+            imported = client.post(
+                f"/decks/{target_id}/import",
+                params={"user_id": user_id},
+                files={"file": (filename, export.content, "application/octet-stream")}
+            )
+            assert imported.status_code == 201
+            assert imported.json()["inserted"] == 3
+            assert imported.json()["rejected_count"] == 0
+            assert snapshot(target_id) == snapshot(deck_id)
+
+
+def test_export_jsonl_contains_deck_header(client):
+    """Test that the JSON-lines export starts with the deck metadata"""
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    deck_response = client.post(
+        "/decks/",
+        json={"title": "Source Deck", "description": "Backup me", "owner_id": user_id}
+    )
+    deck_id = deck_response.json()["id"]
+    client.post(
+        f"/decks/{deck_id}/cards",
+        json={"question": "Hola?", "answer": "Hello"}
+    )
+    
+    export = client.get(f"/decks/{deck_id}/export?compress=false")
+    assert export.status_code == 200
+    header, card = [json.loads(line) for line in export.text.splitlines()]
+    assert header["type"] == "deck"
+    assert header["title"] == "Source Deck"
+    assert card == {"type": "card", "question": "Hola?", "answer": "Hello"}
+    
+    assert client.get("/decks/999/export").status_code == 404
+
+
+def test_import_csv_with_byte_order_mark(client):
+    """Test that a CSV saved by Excel (UTF-8 with BOM) imports, and malformed CSV is a 400"""
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    deck_response = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    )
+    deck_id = deck_response.json()["id"]
+    
+    upload = "\ufeffquestion,answer\nHola?,Hello\n".encode("utf-8")
+    response = client.post(
+        f"/decks/{deck_id}/import",
+        files={"file": ("excel.csv", upload, "text/csv")}
+    )
+    assert response.status_code == 201
+    assert response.json()["inserted"] == 1
+    
+    # A field over the csv module's field size limit
+    upload = "question,answer\nBig?,\"" + "x" * 200_000 + "\"\n"
+    response = client.post(
+        f"/decks/{deck_id}/import",
+        files={"file": ("big.csv", upload, "text/csv")}
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Malformed CSV")
+
+
+def test_import_rejects_corrupt_gzip(client):
+    """Test that truncated or corrupt gzip uploads are a 400, not a 500"""
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    deck_response = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    )
+    deck_id = deck_response.json()["id"]
+    
+    compressed = gzip.compress(b"question,answer\n" + b"Hola?,Hello\n" * 100)
+    # Valid header followed by a truncated stream, then by an invalid deflate block type
+    for body in (compressed[:30], compressed[:10] + b"\xff" + compressed[11:]):
+        response = client.post(
+            f"/decks/{deck_id}/import",
+            files={"file": ("deck.csv.gz", body, "application/gzip")}
+        )
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Corrupt gzip file"
+
+
+@pytest.mark.parametrize("client", ["sync"], indirect=True)
+def test_create_card_reraises_other_integrity_errors(client, monkeypatch):
+    """Test that a constraint failure that is not a duplicate card is not answered as one"""
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    deck_response = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    )
+    deck_id = deck_response.json()["id"]
+    
+    def conflicting_write(db, deck_id):
+        # Fails the commit on users.username instead of the card's content hash
+        db.add(User(username="learner", email="other@example.com"))
+    monkeypatch.setattr(cards_router, "bump_deck_version", conflicting_write)
+    
+    with pytest.raises(IntegrityError):
+        client.post(f"/decks/{deck_id}/cards", json={"question": "Q1", "answer": "A1"})
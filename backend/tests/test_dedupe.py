@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models import Card, CardOverride, Deck, DeckSubscription, ReviewEvent, User, UserCardProgress
+from app.models.card import content_hash
+from app.services.dedupe import dedupe_deck
+from app.services.scheduling import utcnow
+from app.services.sync import changes_since
+
+
+def test_dedupe_deck_merges_cards_progress_and_history(tmp_path):
+    """Test that duplicate cards collapse into the oldest, keeping progress and events"""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'dedupe.db'}")
+    Base.metadata.create_all(bind=engine)
+    SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    reviewed = datetime(2024, 1, 1)
+    
+    with SessionFactory() as db:
+        db.add_all([
+            User(id=1, username="first", email="first@example.com"),
+            User(id=2, username="second", email="second@example.com"),
+            Deck(id=1, title="Deck", owner_id=1),
+        ])
+        # Cards from before content_hash existed: raw SQL skips the column default
+        db.execute(text("INSERT INTO cards (id, deck_id, question, answer) VALUES (:id, 1, :question, :answer)"), [
+            {"id": 1, "question": "Hola?", "answer": "Hello"},
+            {"id": 2, "question": "hola? ", "answer": "HELLO"},
+            {"id": 3, "question": "Adios?", "answer": "Goodbye"},
+        ])
+        db.execute(insert(UserCardProgress), [
+            # User 1 reviewed both copies, the duplicate more recently
+            {"user_id": 1, "card_id": 1, "confidence_score": 0.2, "review_count": 1,
+             "last_reviewed_at": reviewed, "next_due_at": reviewed},
+            {"user_id": 1, "card_id": 2, "confidence_score": 0.8, "review_count": 2,
+             "last_reviewed_at": reviewed + timedelta(days=1), "next_due_at": reviewed + timedelta(days=3)},
+            # User 2 only reviewed the duplicate
+            {"user_id": 2, "card_id": 2, "confidence_score": 0.5, "review_count": 1,
+             "last_reviewed_at": reviewed, "next_due_at": reviewed},
+        ])
+        db.execute(insert(ReviewEvent), [
+            {"user_id": 1, "card_id": 1, "confidence": 0.2, "reviewed_at": reviewed},
+            {"user_id": 1, "card_id": 2, "confidence": 0.8, "reviewed_at": reviewed},
+            {"user_id": 2, "card_id": 2, "confidence": 0.5, "reviewed_at": reviewed},
+        ])
+        # User 1 edited both copies (the survivor's edit wins), user 2 only the duplicate
+        db.execute(insert(CardOverride), [
+            {"user_id": 1, "card_id": 1, "question": "Mine"},
+            {"user_id": 1, "card_id": 2, "question": "Also mine"},
+            {"user_id": 2, "card_id": 2, "answer": "Hi"},
+        ])
+        db.commit()
+    
+    with SessionFactory() as db:
+        result = dedupe_deck(db, 1)
+        db.commit()
+    assert (result.removed, result.merged_progress, result.moved_progress, result.hashed) == (1, 1, 1, 2)
+    
+    with SessionFactory() as db:
+        cards = db.execute(select(Card.id, Card.content_hash).order_by(Card.id)).all()
+        assert cards == [(1, content_hash("Hola?", "Hello")), (3, content_hash("Adios?", "Goodbye"))]
+        
+        progress = {row.user_id: row for row in db.query(UserCardProgress).all()}
+        assert {row.card_id for row in progress.values()} == {1}
+        assert progress[1].review_count == 3
+        assert progress[1].confidence_score == 0.8
+        assert progress[1].last_reviewed_at == reviewed + timedelta(days=1)
+        assert progress[2].confidence_score == 0.5
+        
+        assert db.scalars(select(ReviewEvent.card_id)).all() == [1, 1, 1]
+        overrides = db.execute(
+            select(CardOverride.user_id, CardOverride.card_id, CardOverride.question, CardOverride.answer)
+            .order_by(CardOverride.user_id)
+        ).all()
+        assert overrides == [(1, 1, "Mine", None), (2, 1, None, "Hi")]
+        assert db.get(Deck, 1).version == 2
+    
+    # Nothing left to do the second time
+    with SessionFactory() as db:
+        result = dedupe_deck(db, 1)
+    assert (result.removed, result.hashed) == (0, 0)
+    engine.dispose()
+
+
+def test_dedupe_leaves_tombstones_for_delta_sync(tmp_path):
+    """Test that merged-away cards are reported as deleted to the users studying the deck"""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'dedupe.db'}")
+    Base.metadata.create_all(bind=engine)
+    SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    
+    with SessionFactory() as db:
+        db.add_all([
+            User(id=1, username="owner", email="owner@example.com"),
+            User(id=2, username="subscriber", email="subscriber@example.com"),
+            User(id=3, username="stranger", email="stranger@example.com"),
+            Deck(id=1, title="Deck", owner_id=1),
+            DeckSubscription(user_id=2, deck_id=1),
+        ])
+        db.execute(text("INSERT INTO cards (id, deck_id, question, answer) VALUES (:id, 1, :question, :answer)"), [
+            {"id": 1, "question": "Hola?", "answer": "Hello"},
+            {"id": 2, "question": "hola?", "answer": "hello"},
+        ])
+        db.commit()
+    
+    since = utcnow() - timedelta(minutes=1)
+    with SessionFactory() as db:
+        dedupe_deck(db, 1)
+        db.commit()
+    
+    with SessionFactory() as db:
+        for user_id in (1, 2):
+            deleted = changes_since(db, user_id, since)["deleted"]
+            assert [(row["kind"], row["id"]) for row in deleted] == [("card", 2)]
+        assert changes_since(db, 3, since)["deleted"] == []
+        # A full sync has nothing to delete
+        assert changes_since(db, 1, None)["deleted"] == []
+        later = utcnow() + timedelta(minutes=1)
+        assert changes_since(db, 1, later)["deleted"] == []
+    engine.dispose()
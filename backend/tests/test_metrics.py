@@ -0,0 +1,50 @@
+from app import metrics as metrics_module
+from app.metrics import RequestStats, metrics
+
+
+def test_metrics_endpoint_reports_route_latency_and_queries(client):
+    """Test that /metrics exposes per-route histograms in Prometheus format"""
+    metrics.reset()
+    user_id = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    ).json()["id"]
+    client.get(f"/users/{user_id}")
+    
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert "# TYPE flashcards_http_request_duration_seconds histogram" in body
+    assert 'flashcards_http_request_duration_seconds_count{method="GET",route="/users/{user_id}"} 1' in body
+    assert 'flashcards_http_requests_total{method="POST",route="/users/",status="201"} 1' in body
+    assert 'flashcards_db_queries_per_request_count{method="GET",route="/users/{user_id}"} 1' in body
+    assert "flashcards_progress_cache_hits_total" in body
+
+
+def test_query_count_response_headers(client, monkeypatch):
+    """Test that the optional headers report SQL statements and DB time"""
+    monkeypatch.setattr(metrics_module, "METRICS_RESPONSE_HEADERS", True)
+    user_id = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    ).json()["id"]
+    
+    response = client.get(f"/users/{user_id}")
+    assert response.headers["X-Query-Count"] == "1"
+    assert float(response.headers["X-DB-Time-Ms"]) >= 0
+    
+    monkeypatch.setattr(metrics_module, "METRICS_RESPONSE_HEADERS", False)
+    assert "X-Query-Count" not in client.get(f"/users/{user_id}").headers
+
+
+def test_repeated_statements_are_flagged_as_n_plus_one():
+    """Test that one statement repeated past the threshold is counted"""
+    metrics.reset()
+    stats = RequestStats(query_count=metrics_module.N_PLUS_ONE_THRESHOLD)
+    stats.statements["SELECT cards.id FROM cards WHERE cards.id = ?"] = metrics_module.N_PLUS_ONE_THRESHOLD
+    metrics.observe_request("GET", "/decks/{deck_id}/cards", 200, 0.01, stats)
+    metrics.observe_request("GET", "/decks/{deck_id}/cards", 200, 0.01, RequestStats(query_count=2))
+    
+    assert metrics.n_plus_one[("GET", "/decks/{deck_id}/cards")] == 1
+    assert 'flashcards_n_plus_one_requests_total{method="GET",route="/decks/{deck_id}/cards"} 1' in metrics.render()
@@ -1,3 +1,12 @@
+import json
+import time
+from datetime import timedelta
+
+from sqlalchemy.orm import Session
+
+from app.routers import progress as progress_router
+from app.services.scheduling import review_interval, utcnow
+
 def test_learn_mode_shows_new_cards(client):
     """Test that learn mode shows cards never reviewed"""
     # Setup: Create user, deck, and card
@@ -135,4 +144,475 @@ def test_record_review_updates_confidence(client):
     # 0.7 * 0.5 + 0.3 * 1.0 = 0.65 (need to account for floating point error)
     assert abs(response2.json()["confidence_score"] - 0.65) < 0.0001
     assert response2.json()["review_count"] == 2
-    
\ No newline at end of file
+    
+def test_learn_and_recap_split_across_decks(client):
+    """Test that mode filtering applies to every deck when deck_id is omitted"""
+    # Setup: Two decks with one card each
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    card_ids = []
+    for title in ["Deck A", "Deck B"]:
+        deck_response = client.post(
+            "/decks/",
+            json={"title": title, "owner_id": user_id}
+        )
+        card_response = client.post(
+            f"/decks/{deck_response.json()['id']}/cards",
+            json={"question": f"{title} question", "answer": "answer"}
+        )
+        card_ids.append(card_response.json()["id"])
+    
+    # Only the first card becomes confident
+    client.post(
+        "/reviews",
+        json={"user_id": user_id, "card_id": card_ids[0], "confidence": 0.9}
+    )
+    
+    learn = client.get(f"/users/{user_id}/cards?mode=learn").json()
+    recap = client.get(f"/users/{user_id}/cards?mode=recap").json()
+    assert [item["card"]["id"] for item in learn] == [card_ids[1]]
+    assert [item["card"]["id"] for item in recap] == [card_ids[0]]
+
+def test_user_cards_pagination(client):
+    """Test that limit and cursor page through cards in id order"""
+    # Setup
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    deck_response = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    )
+    deck_id = deck_response.json()["id"]
+    
+    card_ids = [
+        client.post(
+            f"/decks/{deck_id}/cards",
+            json={"question": f"Question {i}", "answer": "answer"}
+        ).json()["id"]
+        for i in range(5)
+    ]
+    
+    # Walk the pages until no cursor is returned
+    seen = []
+    cursor = None
+    while True:
+        params = {"mode": "learn", "deck_id": deck_id, "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(f"/users/{user_id}/cards", params=params)
+        assert response.status_code == 200
+        assert len(response.json()) <= 2
+        seen.extend(item["card"]["id"] for item in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    
+    assert seen == card_ids
+
+def test_user_cards_invalid_cursor(client):
+    """Test that a malformed cursor is rejected"""
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    response = client.get(f"/users/{user_id}/cards?mode=learn&cursor=not-a-cursor")
+    assert response.status_code == 400
+
+def test_batch_reviews_apply_in_order(client):
+    """Test that repeated cards in a batch are folded in submission order"""
+    # Setup
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    deck_response = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    )
+    deck_id = deck_response.json()["id"]
+    
+    card_response = client.post(
+        f"/decks/{deck_id}/cards",
+        json={"question": "What is 2+2?", "answer": "4"}
+    )
+    card_id = card_response.json()["id"]
+    
+    response = client.post(
+        "/reviews/batch",
+        json=[
+            {"user_id": user_id, "card_id": card_id, "confidence": 0.5},
+            {"user_id": user_id, "card_id": card_id, "confidence": 1.0},
+        ]
+    )
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["status"] for result in results] == ["ok", "ok"]
+    assert results[0]["progress"]["confidence_score"] == 0.5
+    assert results[0]["progress"]["review_count"] == 1
+    # 0.7 * 0.5 + 0.3 * 1.0 = 0.65
+    assert abs(results[1]["progress"]["confidence_score"] - 0.65) < 0.0001
+    assert results[1]["progress"]["review_count"] == 2
+    assert results[0]["progress"]["id"] == results[1]["progress"]["id"]
+
+def test_batch_reviews_report_per_item_errors(client):
+    """Test that invalid items are rejected without failing the batch"""
+    # Setup
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    deck_response = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    )
+    deck_id = deck_response.json()["id"]
+    
+    card_response = client.post(
+        f"/decks/{deck_id}/cards",
+        json={"question": "What is 2+2?", "answer": "4"}
+    )
+    card_id = card_response.json()["id"]
+    
+    response = client.post(
+        "/reviews/batch",
+        json=[
+            {"user_id": 999, "card_id": card_id, "confidence": 0.5},
+            {"user_id": user_id, "card_id": 999, "confidence": 0.5},
+            {"user_id": user_id, "card_id": card_id, "confidence": 1.5},
+            {"user_id": user_id, "card_id": card_id, "confidence": 0.9},
+        ]
+    )
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["index"] for result in results] == [0, 1, 2, 3]
+    assert [result["status"] for result in results] == ["error", "error", "error", "ok"]
+    assert results[0]["detail"] == "User not found"
+    assert results[1]["detail"] == "Card not found"
+    
+    recap = client.get(f"/users/{user_id}/cards?mode=recap&deck_id={deck_id}")
+    assert recap.json()[0]["progress"]["review_count"] == 1
+
+def test_batch_reviews_throughput(client):
+    """Test that a batch matches one-by-one reviews and report both rates"""
+    # Setup: one user, 50 cards, 500 reviews cycling over the cards
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    deck_ids = []
+    card_ids = {}
+    for title in ["Single", "Batch"]:
+        deck_id = client.post(
+            "/decks/",
+            json={"title": title, "owner_id": user_id}
+        ).json()["id"]
+        deck_ids.append(deck_id)
+        card_ids[deck_id] = [
+            client.post(
+                f"/decks/{deck_id}/cards",
+                json={"question": f"Question {i}", "answer": "answer"}
+            ).json()["id"]
+            for i in range(50)
+        ]
+    
+    ratings = [(i % 50, (i * 7 % 11) / 10) for i in range(500)]
+    single_deck, batch_deck = deck_ids
+    
+    start = time.perf_counter()
+    for card_index, confidence in ratings:
+        client.post(
+            "/reviews",
+            json={
+                "user_id": user_id,
+                "card_id": card_ids[single_deck][card_index],
+                "confidence": confidence
+            }
+        )
+    single_elapsed = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    response = client.post(
+        "/reviews/batch",
+        json=[
+            {
+                "user_id": user_id,
+                "card_id": card_ids[batch_deck][card_index],
+                "confidence": confidence
+            }
+            for card_index, confidence in ratings
+        ]
+    )
+    batch_elapsed = time.perf_counter() - start
+    assert response.status_code == 200
+    
+    print(
+        f"\nreviews/s: single={len(ratings) / single_elapsed:.0f} "
+        f"batch={len(ratings) / batch_elapsed:.0f}"
+    )
+    
+    # Both paths must end in the same state
+    def scores(deck_id):
+        cards = client.get(
+            f"/users/{user_id}/cards?mode=learn&deck_id={deck_id}"
+        ).json() + client.get(
+            f"/users/{user_id}/cards?mode=recap&deck_id={deck_id}"
+        ).json()
+        return sorted(
+            (card_ids[deck_id].index(item["card"]["id"]),
+             round(item["progress"]["confidence_score"], 9),
+             item["progress"]["review_count"])
+            for item in cards
+        )
+    assert scores(single_deck) == scores(batch_deck)
+
+def test_review_interval_grows_with_confidence_and_reviews():
+    """Test that the schedule runs from daily to monthly"""
+    assert review_interval(0.0, 1) == timedelta(days=1)
+    assert review_interval(1.0, 1) == timedelta(days=30)
+    assert review_interval(0.3, 1) < review_interval(0.6, 1) < review_interval(0.9, 1)
+    assert review_interval(0.5, 1) < review_interval(0.5, 5)
+    assert review_interval(1.0, 10) == timedelta(days=30)
+
+def test_review_queue_orders_overdue_then_unseen(client, monkeypatch):
+    """Test that the queue returns the most overdue cards, then unseen cards"""
+    # Setup: three cards, two reviewed with different confidence
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    deck_response = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    )
+    deck_id = deck_response.json()["id"]
+    
+    confident, shaky, unseen = [
+        client.post(
+            f"/decks/{deck_id}/cards",
+            json={"question": f"Question {i}", "answer": "answer"}
+        ).json()["id"]
+        for i in range(3)
+    ]
+    for card_id, confidence in [(confident, 0.9), (shaky, 0.1)]:
+        review = client.post(
+            "/reviews",
+            json={"user_id": user_id, "card_id": card_id, "confidence": confidence}
+        )
+        assert review.json()["next_due_at"] is not None
+    
+    # Nothing is due yet, so only the unseen card is queued
+    response = client.get(f"/users/{user_id}/queue?deck_id={deck_id}")
+    assert response.status_code == 200
+    assert [item["card"]["id"] for item in response.json()] == [unseen]
+    
+    # Two months later both reviewed cards are overdue; the shaky one first
+    later = utcnow() + timedelta(days=60)
+    monkeypatch.setattr(progress_router, "utcnow", lambda: later)
+    response = client.get(f"/users/{user_id}/queue?deck_id={deck_id}&n=2")
+    assert [item["card"]["id"] for item in response.json()] == [shaky, confident]
+    response = client.get(f"/users/{user_id}/queue?n=3")
+    assert [item["card"]["id"] for item in response.json()] == [shaky, confident, unseen]
+
+def test_user_cards_cache_stays_consistent(client):
+    """Test that repeated calls hit the cache and still see reviews and new cards"""
+    # Setup
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    deck_response = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    )
+    deck_id = deck_response.json()["id"]
+    
+    card_id = client.post(
+        f"/decks/{deck_id}/cards",
+        json={"question": "What is 2+2?", "answer": "4"}
+    ).json()["id"]
+    
+    url = f"/users/{user_id}/cards?deck_id={deck_id}"
+    assert len(client.get(f"{url}&mode=learn").json()) == 1
+    assert len(client.get(f"{url}&mode=learn").json()) == 1
+    assert client.get("/cache/stats").json()["hits"] >= 1
+    
+    # Reviews are written through to the cached snapshot
+    client.post(
+        "/reviews",
+        json={"user_id": user_id, "card_id": card_id, "confidence": 0.9}
+    )
+    assert client.get(f"{url}&mode=learn").json() == []
+    assert len(client.get(f"{url}&mode=recap").json()) == 1
+    
+    # New cards invalidate the snapshot
+    client.post(
+        f"/decks/{deck_id}/cards",
+        json={"question": "What is 3+3?", "answer": "6"}
+    )
+    learn = client.get(f"{url}&mode=learn").json()
+    assert [item["card"]["question"] for item in learn] == ["What is 3+3?"]
+
+def test_user_cards_stream_ndjson_pages(client):
+    """Test that NDJSON streaming keeps mode filtering and pagination"""
+    # Setup
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    deck_response = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    )
+    deck_id = deck_response.json()["id"]
+    
+    for i in range(3):
+        client.post(
+            f"/decks/{deck_id}/cards",
+            json={"question": f"Question {i}", "answer": "answer"}
+        )
+    
+    url = f"/users/{user_id}/cards?mode=learn&deck_id={deck_id}&limit=2"
+    response = client.get(f"{url}&format=ndjson")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert "X-Next-Cursor" in response.headers
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == client.get(url).json()
+
+def test_user_cards_large_scope_is_filtered_in_sql(client, monkeypatch):
+    """Test that scopes above the snapshot cap are filtered and paged in SQL, uncached"""
+    # Setup
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    deck_response = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    )
+    deck_id = deck_response.json()["id"]
+    
+    card_ids = [
+        client.post(
+            f"/decks/{deck_id}/cards",
+            json={"question": f"Question {i}", "answer": "answer"}
+        ).json()["id"]
+        for i in range(4)
+    ]
+    client.post("/reviews", json={"user_id": user_id, "card_id": card_ids[1], "confidence": 0.9})
+    monkeypatch.setattr(progress_router, "PROGRESS_CACHE_MAX_SNAPSHOT_CARDS", 3)
+    
+    url = f"/users/{user_id}/cards?deck_id={deck_id}"
+    first = client.get(f"{url}&mode=learn&limit=2")
+    assert [item["card"]["id"] for item in first.json()] == [card_ids[0], card_ids[2]]
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get(f"{url}&mode=learn&limit=2&cursor={cursor}")
+    assert [item["card"]["id"] for item in second.json()] == [card_ids[3]]
+    assert "X-Next-Cursor" not in second.headers
+    
+    recap = client.get(f"{url}&mode=recap&format=ndjson")
+    assert [json.loads(line)["card"]["id"] for line in recap.text.splitlines()] == [card_ids[1]]
+    assert client.get("/cache/stats").json()["entries"] == 0
+
+
+def test_user_cards_large_scope_streams_from_a_cursor(client, monkeypatch):
+    """Test that an unpaged SQL-filtered listing reads its rows in batches, not all up front"""
+    # Setup
+    user_id = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    ).json()["id"]
+    deck_id = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    ).json()["id"]
+    card_ids = [
+        client.post(
+            f"/decks/{deck_id}/cards",
+            json={"question": f"Question {i}", "answer": "answer"}
+        ).json()["id"]
+        for i in range(5)
+    ]
+    monkeypatch.setattr(progress_router, "PROGRESS_CACHE_MAX_SNAPSHOT_CARDS", 3)
+    monkeypatch.setattr(progress_router, "STREAM_BATCH_SIZE", 2)
+    
+    results = []
+    execute = Session.execute
+    
+    def recording_execute(self, statement, *args, **kwargs):
+        result = execute(self, statement, *args, **kwargs)
+        results.append(result)
+        return result
+    
+    cursor_open = []
+    card_with_progress = progress_router._card_with_progress
+    
+    def checking_card_with_progress(row):
+        cursor_open.append(results[-1].raw.cursor is not None)
+        return card_with_progress(row)
+    
+    monkeypatch.setattr(Session, "execute", recording_execute)
+    monkeypatch.setattr(progress_router, "_card_with_progress", checking_card_with_progress)
+    response = client.get(f"/users/{user_id}/cards?deck_id={deck_id}&mode=learn&format=ndjson")
+    assert [json.loads(line)["card"]["id"] for line in response.text.splitlines()] == card_ids
+    # Still reading after the first batch
+    assert cursor_open[:3] == [True, True, True]
+
+def test_review_times_serialize_alike_on_every_path(client):
+    """Test that single, batch and listed progress report review and due times in one format"""
+    # Setup
+    user_id = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    ).json()["id"]
+    deck_id = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    ).json()["id"]
+    first, second = [
+        client.post(
+            f"/decks/{deck_id}/cards",
+            json={"question": f"Question {i}", "answer": "answer"}
+        ).json()["id"]
+        for i in range(2)
+    ]
+    
+    single = client.post("/reviews", json={"user_id": user_id, "card_id": first, "confidence": 0.1}).json()
+    batch = client.post(
+        "/reviews/batch",
+        json=[{"user_id": user_id, "card_id": second, "confidence": 0.1}]
+    ).json()[0]["progress"]
+    listed = {
+        item["card"]["id"]: item["progress"]
+        for item in client.get(f"/users/{user_id}/cards?mode=learn").json()
+    }
+    
+    for progress, stored in ((single, listed[first]), (batch, listed[second])):
+        for key in ("last_reviewed_at", "next_due_at"):
+            # Naive UTC, as the database returns it
+            assert not progress[key].endswith("Z") and "+" not in progress[key]
+            assert progress[key] == stored[key]
@@ -0,0 +1,58 @@
+from app.services.progress_cache import ProgressCache, ProgressSnapshot
+
+
+def snapshot(card_count, confidence=None):
+    return ProgressSnapshot((card_id, confidence) for card_id in range(1, card_count + 1))
+
+
+def test_snapshot_selects_by_mode_and_cursor():
+    """Test that snapshots filter learn/recap cards after a cursor"""
+    entry = ProgressSnapshot([(1, None), (2, 0.9), (3, 0.2), (4, 0.8), (5, None)])
+    assert entry.select("learn", None, None) == [1, 3, 5]
+    assert entry.select("recap", None, None) == [2, 4]
+    assert entry.select("learn", 1, 1) == [3]
+    
+    entry.update(5, 0.95)
+    assert entry.select("recap", 2, None) == [4, 5]
+
+
+def test_cache_evicts_least_recently_used_within_byte_budget():
+    """Test that the cache stays under its byte budget, dropping the LRU entry"""
+    entry_bytes = snapshot(100).nbytes
+    cache = ProgressCache(max_bytes=entry_bytes * 2, ttl=60)
+    cache.put(1, None, snapshot(100))
+    cache.put(2, None, snapshot(100))
+    assert cache.get(1, None) is not None  # User 1 becomes most recently used
+    
+    cache.put(3, None, snapshot(100))
+    assert cache.get(2, None) is None
+    assert cache.get(1, None) is not None
+    assert cache.get(3, None) is not None
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["bytes"] <= stats["max_bytes"]
+    assert (stats["hits"], stats["misses"]) == (3, 1)
+
+
+def test_cache_write_through_and_invalidation():
+    """Test that reviews update snapshots in place and new cards invalidate them"""
+    cache = ProgressCache(max_bytes=1024 * 1024, ttl=60)
+    cache.put(1, 10, snapshot(3))
+    cache.put(1, None, snapshot(3))
+    cache.put(1, 20, snapshot(3))
+    
+    cache.record_review(1, 2, 0.9)
+    assert cache.get(1, 10).select("recap", None, None) == [2]
+    assert cache.get(1, None).select("recap", None, None) == [2]
+    
+    cache.invalidate_deck(10)
+    assert cache.get(1, 10) is None
+    assert cache.get(1, None) is None
+    assert cache.get(1, 20) is not None
+
+
+def test_cache_entries_expire_after_ttl():
+    """Test that entries older than the TTL are treated as misses"""
+    cache = ProgressCache(max_bytes=1024 * 1024, ttl=0)
+    cache.put(1, None, snapshot(3))
+    assert cache.get(1, None) is None
@@ -0,0 +1,105 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models import Card, Deck, User, UserCardProgress
+from app.services.rescoring import due_dates, rescore_all, score_events, user_ranges
+from app.services.reviews import upsert_review
+from app.services.scheduling import next_due_at
+
+
+def fold(ratings, weight_history, weight_new):
+    confidence = ratings[0]
+    for rating in ratings[1:]:
+        confidence = weight_history * confidence + weight_new * rating
+    return confidence
+
+
+def test_vectorized_scores_match_sequential_fold():
+    """Test that the weighted-sum form equals folding reviews one at a time"""
+    rng = random.Random(3)
+    runs = {(user_id, card_id): [rng.random() for _ in range(rng.randint(1, 8))]
+            for user_id in range(1, 4) for card_id in range(1, 6)}
+    user_ids, card_ids, ratings = [], [], []
+    for (user_id, card_id), run in sorted(runs.items()):
+        user_ids += [user_id] * len(run)
+        card_ids += [card_id] * len(run)
+        ratings += run
+    
+    starts, lengths, scores = score_events(
+        np.array(user_ids), np.array(card_ids), np.array(ratings), 0.6, 0.4
+    )
+    
+    assert list(lengths) == [len(run) for _, run in sorted(runs.items())]
+    expected = [fold(run, 0.6, 0.4) for _, run in sorted(runs.items())]
+    assert scores == pytest.approx(expected)
+
+
+def test_vectorized_due_dates_match_scheduling():
+    """Test that due dates computed in bulk match next_due_at"""
+    last = datetime(2024, 1, 1, 12, 0)
+    confidences = np.array([0.0, 0.35, 0.7, 1.0])
+    counts = np.array([1, 2, 5, 40])
+    due = due_dates(confidences, counts, np.array([last] * 4, dtype="datetime64[us]")).astype(object)
+    for value, confidence, count in zip(due, confidences, counts):
+        assert abs(value - next_due_at(float(confidence), int(count), last)) < timedelta(milliseconds=1)
+
+
+def test_user_ranges_cover_every_user():
+    """Test that user ranges are contiguous and cover the whole span"""
+    assert user_ranges(1, 10, 4) == [(1, 3), (4, 6), (7, 9), (10, 10)]
+    assert user_ranges(5, 5, 8) == [(5, 5)]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_rescore_rewrites_progress_from_history(tmp_path, workers):
+    """Test that rescoring applies new weights to every card with full history"""
+    url = f"sqlite:///{tmp_path / 'rescore.db'}"
+    engine = create_db_engine(url)
+    Base.metadata.create_all(bind=engine)
+    SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    
+    rng = random.Random(5)
+    history = {}
+    with SessionFactory() as db:
+        db.add_all([User(username=f"user{i}", email=f"user{i}@example.com") for i in range(3)])
+        db.flush()
+        db.add(Deck(title="Test Deck", owner_id=1))
+        db.flush()
+        db.add_all([Card(deck_id=1, question=f"Question {i}", answer=f"Answer {i}") for i in range(4)])
+        db.commit()
+        
+        reviewed_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        for user_id in range(1, 4):
+            for card_id in range(1, 5):
+                for _ in range(rng.randint(1, 5)):
+                    rating = round(rng.random(), 2)
+                    reviewed_at += timedelta(minutes=1)
+                    upsert_review(db, user_id, card_id, rating, reviewed_at)
+                    history.setdefault((user_id, card_id), []).append(rating)
+        # A card reviewed before review_events existed: its history is incomplete
+        partial = db.query(UserCardProgress).filter_by(user_id=1, card_id=1).one()
+        partial.review_count += 1
+        db.commit()
+    
+    # Chunks smaller than some cards' histories exercise the chunk boundaries
+    result = rescore_all(url, workers=workers, chunk_size=3, weight_history=0.5, weight_new=0.5)
+    
+    assert result.events == sum(len(run) for run in history.values())
+    assert result.updated == len(history) - 1
+    assert result.skipped == 1
+    with SessionFactory() as db:
+        for progress in db.query(UserCardProgress):
+            expected_history = fold(history[(progress.user_id, progress.card_id)], 0.7, 0.3)
+            if (progress.user_id, progress.card_id) == (1, 1):
+                assert progress.confidence_score == pytest.approx(expected_history)
+                continue
+            expected = fold(history[(progress.user_id, progress.card_id)], 0.5, 0.5)
+            assert progress.confidence_score == pytest.approx(expected)
+            due = next_due_at(expected, progress.review_count, progress.last_reviewed_at)
+            assert abs(progress.next_due_at - due) < timedelta(milliseconds=1)
+    engine.dispose()
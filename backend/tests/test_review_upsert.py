@@ -0,0 +1,172 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Card, Deck, User, UserCardProgress, UserDeckStats
+from app.schemas import ReviewCreate
+from app.services.reviews import (
+    apply_review_batch,
+    review_settle_statement,
+    review_upsert_many_statement,
+    review_upsert_statement,
+    upsert_review
+)
+
+
+def test_upsert_compiles_for_sqlite_and_postgresql():
+    """Test that the review upsert renders ON CONFLICT ... RETURNING on both dialects"""
+    now = datetime.now(timezone.utc)
+    for name, dialect in [("sqlite", sqlite.dialect()), ("postgresql", postgresql.dialect())]:
+        sql = str(review_upsert_statement(name, 1, 1, 0.5, now).compile(dialect=dialect))
+        assert "ON CONFLICT (user_id, card_id) DO UPDATE" in sql
+        assert "review_count = (user_card_progress.review_count + " in sql
+        assert "RETURNING" in sql
+        sql = str(review_upsert_many_statement(name).compile(dialect=dialect))
+        assert "ON CONFLICT (user_id, card_id) DO UPDATE" in sql
+        assert "RETURNING" in sql
+
+
+def test_concurrent_reviews_do_not_lose_updates(tmp_path):
+    """Test that parallel reviews of one card end in a single, fully counted row"""
+    # A file database so every thread gets its own connection
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'concurrency.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    Base.metadata.create_all(bind=engine)
+    SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    
+    with SessionFactory() as db:
+        user = User(username="learner", email="learner@example.com")
+        db.add(user)
+        db.flush()
+        deck = Deck(title="Test Deck", owner_id=user.id)
+        db.add(deck)
+        db.flush()
+        card = Card(deck_id=deck.id, question="What is 2+2?", answer="4")
+        db.add(card)
+        db.commit()
+        user_id, card_id = user.id, card.id
+    
+    workers, reviews_per_worker = 8, 25
+    
+    def review_many(_):
+        for _ in range(reviews_per_worker):
+            with SessionFactory() as db:
+                upsert_review(db, user_id, card_id, 0.6, datetime.now(timezone.utc))
+                db.commit()
+    
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(review_many, range(workers)))
+    
+    with SessionFactory() as db:
+        rows = db.query(UserCardProgress).filter(
+            UserCardProgress.user_id == user_id,
+            UserCardProgress.card_id == card_id
+        ).all()
+        stats = db.query(UserDeckStats).filter(UserDeckStats.card_count != 0).all()
+    engine.dispose()
+    
+    assert len(rows) == 1
+    assert rows[0].review_count == workers * reviews_per_worker
+    # Every rating is 0.6, so the weighted average must stay at 0.6
+    assert abs(rows[0].confidence_score - 0.6) < 1e-9
+    # The deck stats count the card exactly once, in the 0.6 bucket
+    assert [(row.bucket, row.card_count) for row in stats] == [(rows[0].stats_bucket, 1)]
+
+
+def test_stale_due_date_update_is_skipped(tmp_path):
+    """Test that the due date follow-up of an overtaken review leaves the newer row alone"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'settle.db'}")
+    Base.metadata.create_all(bind=engine)
+    SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    
+    with SessionFactory() as db:
+        user = User(username="learner", email="learner@example.com")
+        db.add(user)
+        db.flush()
+        deck = Deck(title="Test Deck", owner_id=user.id)
+        db.add(deck)
+        db.flush()
+        card = Card(deck_id=deck.id, question="What is 2+2?", answer="4")
+        db.add(card)
+        db.flush()
+        
+        now = datetime.now(timezone.utc)
+        first = upsert_review(db, user.id, card.id, 0.2, now)
+        first_count = first.review_count
+        second = upsert_review(db, user.id, card.id, 0.9, now + timedelta(hours=1))
+        db.commit()
+        due, bucket = second.next_due_at, second.stats_bucket
+        
+        # The first review's follow-up arriving late, after the second one
+        result = db.execute(review_settle_statement(), {
+            "b_id": first.id,
+            "b_review_count": first_count,
+            "b_next_due_at": now,
+            "b_stats_bucket": 0,
+        })
+        assert result.rowcount == 0
+        db.commit()
+        
+        db.expire_all()
+        row = db.get(UserCardProgress, first.id)
+        assert (row.review_count, row.next_due_at, row.stats_bucket) == (2, due, bucket)
+    engine.dispose()
+
+
+def test_concurrent_batches_and_reviews_do_not_lose_updates(tmp_path):
+    """Test that batches racing single reviews of the same fresh card count every review"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'batches.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    Base.metadata.create_all(bind=engine)
+    SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    
+    with SessionFactory() as db:
+        user = User(username="learner", email="learner@example.com")
+        db.add(user)
+        db.flush()
+        deck = Deck(title="Test Deck", owner_id=user.id)
+        db.add(deck)
+        db.flush()
+        card = Card(deck_id=deck.id, question="What is 2+2?", answer="4")
+        db.add(card)
+        db.commit()
+        user_id, card_id = user.id, card.id
+    
+    workers, rounds = 8, 10
+    
+    def review_many(worker):
+        for _ in range(rounds):
+            with SessionFactory() as db:
+                if worker % 2:
+                    upsert_review(db, user_id, card_id, 0.6, datetime.now(timezone.utc))
+                else:
+                    # Two reviews of the same card in one batch
+                    results = apply_review_batch(db, [
+                        ReviewCreate(user_id=user_id, card_id=card_id, confidence=0.6),
+                        ReviewCreate(user_id=user_id, card_id=card_id, confidence=0.6),
+                    ])
+                    counts = [result.progress.review_count for result in results]
+                    assert counts[1] == counts[0] + 1
+                db.commit()
+    
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(review_many, range(workers)))
+    
+    with SessionFactory() as db:
+        rows = db.query(UserCardProgress).all()
+        stats = db.query(UserDeckStats).filter(UserDeckStats.card_count != 0).all()
+    engine.dispose()
+    
+    assert len(rows) == 1
+    assert rows[0].review_count == workers // 2 * rounds * 3
+    assert abs(rows[0].confidence_score - 0.6) < 1e-9
+    assert rows[0].next_due_at is not None
+    assert [(row.bucket, row.card_count) for row in stats] == [(rows[0].stats_bucket, 1)]
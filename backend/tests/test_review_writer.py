@@ -0,0 +1,217 @@
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine, get_db, get_read_db
+from app.models import PendingReview, ReviewEvent, UserCardProgress
+from app.routers import progress as progress_router
+from app.schemas import ReviewCreate
+from app.services import review_writer as review_writer_module
+from app.services.review_writer import ReviewWriter, review_writer
+
+
+@pytest.fixture
+def file_db(client, tmp_path, monkeypatch):
+    """
+    Serve the app and the writer from a file database: the writer thread
+    writes while requests commit reviews, which the tests' single shared
+    in-memory connection cannot interleave.
+    """
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'writer.db'}")
+    Base.metadata.create_all(bind=engine)
+    SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    
+    def file_session():
+        db = SessionFactory()
+        try:
+            yield db
+        finally:
+            db.close()
+    
+    monkeypatch.setitem(client.app.dependency_overrides, get_db, file_session)
+    monkeypatch.setitem(client.app.dependency_overrides, get_read_db, file_session)
+    monkeypatch.setattr(review_writer, "session_factory", SessionFactory)
+    yield SessionFactory
+    review_writer.stop()
+    engine.dispose()
+
+
+def _setup_cards(client, count):
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    deck_response = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    )
+    deck_id = deck_response.json()["id"]
+    
+    card_ids = [
+        client.post(
+            f"/decks/{deck_id}/cards",
+            json={"question": f"Question {i}", "answer": f"Answer {i}"}
+        ).json()["id"]
+        for i in range(count)
+    ]
+    return user_id, card_ids
+
+
+# The writer commits through sync sessions, so these run against the sync app
+@pytest.mark.parametrize("client", ["sync"], indirect=True)
+def test_queued_reviews_are_committed_in_one_batch(client, file_db):
+    """Test that queued reviews land in review_events and progress together"""
+    user_id, card_ids = _setup_cards(client, 2)
+    batches = review_writer.batches
+    
+    for card_id, confidence in ((card_ids[0], 1.0), (card_ids[0], 0.0), (card_ids[1], 0.9)):
+        response = client.post(
+            "/reviews/events",
+            json={"user_id": user_id, "card_id": card_id, "confidence": confidence}
+        )
+        assert response.status_code == 202
+        assert response.json()["status"] == "queued"
+    
+    review_writer.flush()
+    
+    with review_writer.session_factory() as db:
+        events = db.query(ReviewEvent).order_by(ReviewEvent.id).all()
+        assert [(event.card_id, event.confidence) for event in events] == [
+            (card_ids[0], 1.0), (card_ids[0], 0.0), (card_ids[1], 0.9)
+        ]
+        progress = db.query(UserCardProgress).filter(UserCardProgress.card_id == card_ids[0]).one()
+        assert progress.review_count == 2
+        assert progress.confidence_score == pytest.approx(0.7)
+    assert review_writer.batches - batches <= 2  # Flushed by size or interval, not per review
+    
+    recap = client.get(f"/users/{user_id}/cards?mode=recap").json()
+    assert [item["card"]["id"] for item in recap] == card_ids
+
+
+@pytest.mark.parametrize("client", ["sync"], indirect=True)
+def test_synchronous_reviews_are_recorded_as_events(client):
+    """Test that POST /reviews and POST /reviews/batch also append history"""
+    user_id, card_ids = _setup_cards(client, 1)
+    
+    client.post("/reviews", json={"user_id": user_id, "card_id": card_ids[0], "confidence": 0.5})
+    client.post("/reviews/batch", json=[
+        {"user_id": user_id, "card_id": card_ids[0], "confidence": 0.8},
+        {"user_id": user_id, "card_id": 999, "confidence": 0.8},
+    ])
+    
+    with review_writer.session_factory() as db:
+        assert [event.confidence for event in db.query(ReviewEvent).order_by(ReviewEvent.id)] == [0.5, 0.8]
+
+
+@pytest.mark.parametrize("client", ["sync"], indirect=True)
+def test_queued_review_for_unknown_card_is_refused(client, file_db):
+    """Test that reviews of unknown cards or users are refused before anything is committed"""
+    user_id, card_ids = _setup_cards(client, 1)
+    
+    response = client.post("/reviews/events", json={"user_id": user_id, "card_id": 999, "confidence": 0.5})
+    assert response.status_code == 404
+    response = client.post("/reviews/events", json={"user_id": 999, "card_id": card_ids[0], "confidence": 0.5})
+    assert response.status_code == 404
+    client.post("/reviews/events", json={"user_id": user_id, "card_id": card_ids[0], "confidence": 0.5})
+    review_writer.flush()
+    
+    with review_writer.session_factory() as db:
+        assert db.query(ReviewEvent).count() == 1
+    
+    response = client.post(
+        "/reviews/events",
+        json={"user_id": user_id, "card_id": card_ids[0], "confidence": 1.5}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("client", ["sync"], indirect=True)
+def test_acknowledged_reviews_survive_a_lost_writer(client, file_db, monkeypatch):
+    """Test that reviews acknowledged by a writer that never ran are folded by the next one"""
+    user_id, card_ids = _setup_cards(client, 1)
+    lost = ReviewWriter(review_writer.session_factory)
+    monkeypatch.setattr(lost, "start", lambda: None)  # As if the process died before writing
+    monkeypatch.setattr(progress_router, "review_writer", lost)
+    
+    for confidence in (1.0, 0.0):
+        response = client.post(
+            "/reviews/events",
+            json={"user_id": user_id, "card_id": card_ids[0], "confidence": confidence}
+        )
+        assert response.status_code == 202
+    
+    with review_writer.session_factory() as db:
+        assert db.query(ReviewEvent).count() == 2
+        assert db.query(PendingReview).count() == 2
+        assert db.query(UserCardProgress).count() == 0
+    
+    # A restarted writer finds the pending reviews on its own
+    restarted = ReviewWriter(review_writer.session_factory)
+    restarted.start()
+    restarted.stop()
+    
+    assert restarted.written == 2
+    with review_writer.session_factory() as db:
+        assert db.query(PendingReview).count() == 0
+        assert db.query(ReviewEvent).count() == 2
+        progress = db.query(UserCardProgress).one()
+        assert progress.review_count == 2
+        assert progress.confidence_score == pytest.approx(0.7)
+
+
+@pytest.mark.parametrize("client", ["sync"], indirect=True)
+def test_failed_batch_is_retried(client, file_db, monkeypatch):
+    """Test that a batch that fails to commit is retried instead of dropped"""
+    user_id, card_ids = _setup_cards(client, 1)
+    writer = ReviewWriter(review_writer.session_factory, flush_interval=0.01)
+    apply_review_batch = review_writer_module.apply_review_batch
+    calls = []
+    
+    def flaky_apply(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        return apply_review_batch(*args, **kwargs)
+    
+    monkeypatch.setattr(review_writer_module, "apply_review_batch", flaky_apply)
+    with review_writer.session_factory() as db:
+        writer.submit(db, ReviewCreate(user_id=user_id, card_id=card_ids[0], confidence=0.5))
+    writer.flush()
+    writer.stop()
+    
+    assert (writer.failed, writer.written, writer.depth) == (1, 1, 0)
+    with review_writer.session_factory() as db:
+        assert db.query(UserCardProgress).one().review_count == 1
+        assert db.query(PendingReview).count() == 0
+
+
+@pytest.mark.parametrize("client", ["sync"], indirect=True)
+def test_full_queue_answers_503(client, monkeypatch):
+    """Test that a full queue sheds load instead of blocking the request"""
+    user_id, card_ids = _setup_cards(client, 1)
+    stalled = ReviewWriter(review_writer.session_factory, max_queued=1)
+    monkeypatch.setattr(stalled, "start", lambda: None)  # Nothing drains the queue
+    monkeypatch.setattr(progress_router, "review_writer", stalled)
+    
+    review = {"user_id": user_id, "card_id": card_ids[0], "confidence": 0.5}
+    assert client.post("/reviews/events", json=review).status_code == 202
+    response = client.post("/reviews/events", json=review)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+@pytest.mark.parametrize("client", ["sync"], indirect=True)
+def test_stop_drains_the_queue(client, file_db):
+    """Test that stopping the writer commits everything already acknowledged"""
+    user_id, card_ids = _setup_cards(client, 1)
+    writer = ReviewWriter(review_writer.session_factory, flush_size=2, flush_interval=0.5)
+    
+    with review_writer.session_factory() as db:
+        for _ in range(5):
+            writer.submit(db, ReviewCreate(user_id=user_id, card_id=card_ids[0], confidence=0.5))
+    writer.stop()
+    
+    assert writer.depth == 0
+    assert writer.written == 5
+    assert writer.batches == 3
@@ -0,0 +1,183 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models import Card, Deck, User
+from app.services.search import (
+    SearchIndexMissing,
+    ensure_search_index,
+    rebuild_search_index,
+    search_cards
+)
+
+
+def _setup_deck(client, username, cards):
+    user_id = client.post(
+        "/users/",
+        json={"username": username, "email": f"{username}@example.com"}
+    ).json()["id"]
+    deck_id = client.post(
+        "/decks/",
+        json={"title": f"{username}'s deck", "owner_id": user_id}
+    ).json()["id"]
+    for question, answer in cards:
+        client.post(f"/decks/{deck_id}/cards", json={"question": question, "answer": answer})
+    return user_id, deck_id
+
+
+def test_search_ranks_and_scopes_results(client):
+    """Test that search matches every word, ranks questions first and honours scopes"""
+    user_id, deck_id = _setup_deck(client, "learner", [
+        ("What is the capital of France?", "Paris"),
+        ("Which river runs through Paris?", "The Seine, the capital's river"),
+        ("What is 2+2?", "4"),
+    ])
+    other_user_id, other_deck_id = _setup_deck(client, "other", [
+        ("Capital of Italy?", "Rome"),
+    ])
+    
+    response = client.get("/cards/search?q=capital")
+    assert response.status_code == 200
+    results = response.json()
+    assert {result["question"] for result in results} == {
+        "What is the capital of France?", "Which river runs through Paris?", "Capital of Italy?"
+    }
+    assert results == sorted(results, key=lambda result: -result["score"])
+    # A match in the question outranks a match in the answer
+    questions = [result["question"] for result in results]
+    assert questions.index("What is the capital of France?") < questions.index("Which river runs through Paris?")
+    
+    # Every word must match; the last one as a prefix
+    results = client.get("/cards/search?q=capital fran").json()
+    assert [result["question"] for result in results] == ["What is the capital of France?"]
+    assert set(results[0]) == {"id", "deck_id", "question", "answer", "created_at", "score"}
+    
+    assert len(client.get(f"/cards/search?q=capital&user_id={user_id}").json()) == 2
+    results = client.get(f"/cards/search?q=capital&deck_id={other_deck_id}").json()
+    assert [result["question"] for result in results] == ["Capital of Italy?"]
+    assert client.get(f"/cards/search?q=capital&user_id={other_user_id}&deck_id={deck_id}").json() == []
+
+
+def test_search_pagination(client):
+    """Test that the next-page cursor walks through every ranked match once"""
+    _setup_deck(client, "learner", [(f"Verb {i}", f"Conjugate verb {i}") for i in range(5)])
+    
+    seen = []
+    cursor = None
+    while True:
+        url = "/cards/search?q=verb&limit=2" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url)
+        seen += [result["id"] for result in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert len(seen) == 5
+    assert len(set(seen)) == 5
+
+
+def test_search_rejects_bad_input(client):
+    """Test that empty queries, bad cursors and unknown scopes are rejected"""
+    assert client.get("/cards/search?q=").status_code == 422
+    response = client.get("/cards/search?q=%22%2A%28")  # Only FTS operators
+    assert response.status_code == 400
+    assert client.get("/cards/search?q=test&cursor=bad").status_code == 400
+    assert client.get("/cards/search?q=test&user_id=999").status_code == 404
+    assert client.get("/cards/search?q=test&deck_id=999").status_code == 404
+    # Operators in user input are treated as plain words
+    assert client.get("/cards/search?q=paris OR NEAR(").status_code == 200
+
+
+def test_search_index_follows_updates_and_deletes(tmp_path):
+    """Test that the triggers keep the index in sync and it can be rebuilt"""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'search.db'}")
+    Base.metadata.create_all(bind=engine)
+    SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    
+    with SessionFactory() as db:
+        db.add(User(username="learner", email="learner@example.com"))
+        db.flush()
+        db.add(Deck(title="Test Deck", owner_id=1))
+        db.flush()
+        card = Card(deck_id=1, question="Photosynthesis", answer="Light into sugar")
+        db.add(card)
+        db.commit()
+        assert [row.id for row in search_cards(db, "photo")] == [card.id]
+        
+        card.question = "Respiration"
+        db.commit()
+        assert search_cards(db, "photo") == []
+        assert [row.id for row in search_cards(db, "respiration")] == [card.id]
+        
+        rebuild_search_index(db)
+        db.commit()
+        assert [row.id for row in search_cards(db, "sugar")] == [card.id]
+        
+        db.delete(card)
+        db.commit()
+        assert search_cards(db, "sugar") == []
+    engine.dispose()
+
+
+def test_search_index_is_added_to_older_databases(tmp_path):
+    """Test that a database created before the index gets it from ensure_search_index"""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        # As the database was before full-text search
+        for trigger in ("cards_fts_insert", "cards_fts_delete", "cards_fts_update"):
+            conn.execute(text(f"DROP TRIGGER {trigger}"))
+        conn.execute(text("DROP TABLE cards_fts"))
+    SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    
+    with SessionFactory() as db:
+        db.add(User(username="learner", email="learner@example.com"))
+        db.flush()
+        db.add(Deck(title="Test Deck", owner_id=1))
+        db.flush()
+        card = Card(deck_id=1, question="Photosynthesis", answer="Light into sugar")
+        db.add(card)
+        db.commit()
+        with pytest.raises(SearchIndexMissing):
+            search_cards(db, "photo")
+        
+        assert ensure_search_index(db) is True
+        db.commit()
+        assert [row.id for row in search_cards(db, "photo")] == [card.id]
+        assert ensure_search_index(db) is False
+    engine.dispose()
+
+
+def test_search_covers_subscribed_decks(client):
+    """Test that user_id searches the decks the user subscribes to as well as their own"""
+    owner_id, deck_id = _setup_deck(client, "author", [("What is the capital of France?", "Paris")])
+    learner_id, own_deck_id = _setup_deck(client, "learner", [("Which river runs through Paris?", "The Seine")])
+    
+    url = f"/cards/search?q=paris&user_id={learner_id}"
+    assert [card["deck_id"] for card in client.get(url).json()] == [own_deck_id]
+    client.post(f"/users/{learner_id}/subscriptions", json={"deck_id": deck_id})
+    assert sorted(card["deck_id"] for card in client.get(url).json()) == [deck_id, own_deck_id]
+
+
+class _PostgresqlSession:
+    """Just enough of a Session to capture the statement search_cards builds"""
+    def __init__(self):
+        self.statements = []
+    
+    def get_bind(self):
+        return type("Bind", (), {"dialect": postgresql.dialect()})()
+    
+    def execute(self, statement):
+        self.statements.append(statement)
+        return type("Result", (), {"all": lambda self: []})()
+
+
+def test_postgresql_search_uses_tsvector():
+    """Test that the PostgreSQL variant queries the generated tsvector column"""
+    db = _PostgresqlSession()
+    search_cards(db, "capital fran", user_id=1)
+    
+    sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+    assert "cards.search_vector @@ to_tsquery" in sql
+    assert "ts_rank(cards.search_vector" in sql
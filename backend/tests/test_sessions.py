@@ -0,0 +1,268 @@
+import time
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.models import Card, UserCardProgress
+from app.routers import sessions as sessions_router
+from app.services import study_sessions as study_sessions_module
+from app.services.study_sessions import StudySession, study_sessions
+
+
+def _setup_cards(client, count):
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    deck_response = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    )
+    deck_id = deck_response.json()["id"]
+    
+    card_ids = [
+        client.post(
+            f"/decks/{deck_id}/cards",
+            json={"question": f"Question {i}", "answer": f"Answer {i}"}
+        ).json()["id"]
+        for i in range(count)
+    ]
+    return user_id, deck_id, card_ids
+
+
+def test_study_session_queues_reviews_until_it_ends(client):
+    """Test that a session pops cards, requeues weak ones and writes reviews at the end"""
+    user_id, deck_id, card_ids = _setup_cards(client, 3)
+    # Already mastered: not part of a learn session
+    client.post("/reviews", json={"user_id": user_id, "card_id": card_ids[2], "confidence": 0.9})
+    
+    response = client.post(f"/users/{user_id}/sessions", json={"mode": "learn", "deck_id": deck_id})
+    assert response.status_code == 201
+    session = response.json()
+    assert session["card_count"] == 2
+    session_id = session["session_id"]
+    
+    card = client.get(f"/sessions/{session_id}/next").json()
+    assert card["card"]["id"] == card_ids[0]
+    assert card["confidence"] is None
+    assert card["remaining"] == 1
+    
+    # Still weak: the card comes round again after the rest of the queue
+    result = client.post(
+        f"/sessions/{session_id}/reviews",
+        json={"card_id": card_ids[0], "confidence": 0.2}
+    ).json()
+    assert (result["confidence"], result["requeued"], result["remaining"]) == (0.2, True, 2)
+    
+    assert client.get(f"/sessions/{session_id}/next").json()["card"]["id"] == card_ids[1]
+    result = client.post(
+        f"/sessions/{session_id}/reviews",
+        json={"card_id": card_ids[1], "confidence": 0.9}
+    ).json()
+    assert (result["requeued"], result["remaining"]) == (False, 1)
+    
+    card = client.get(f"/sessions/{session_id}/next").json()
+    assert card["card"]["id"] == card_ids[0]
+    assert card["confidence"] == pytest.approx(0.2)
+    client.post(f"/sessions/{session_id}/reviews", json={"card_id": card_ids[0], "confidence": 1.0})
+    
+    # Nothing written while the session is open
+    learn = client.get(f"/users/{user_id}/cards?mode=learn&deck_id={deck_id}").json()
+    assert [item["progress"] for item in learn] == [None, None]
+    
+    summary = client.delete(f"/sessions/{session_id}").json()
+    assert (summary["reviews"], summary["written"], summary["rejected"]) == (3, 3, 0)
+    
+    # 0.7 * 0.2 + 0.3 * 1.0 = 0.44 keeps the first card in learn mode
+    learn = client.get(f"/users/{user_id}/cards?mode=learn&deck_id={deck_id}").json()
+    assert [item["card"]["id"] for item in learn] == [card_ids[0]]
+    assert learn[0]["progress"]["review_count"] == 2
+    assert learn[0]["progress"]["confidence_score"] == pytest.approx(0.44)
+    
+    assert client.get(f"/sessions/{session_id}/next").status_code == 404
+
+
+def test_study_session_errors(client):
+    """Test session lookups, foreign cards, bad ratings and an empty queue"""
+    user_id, deck_id, card_ids = _setup_cards(client, 2)
+    
+    assert client.post("/users/999/sessions", json={}).status_code == 404
+    assert client.post(f"/users/{user_id}/sessions", json={"deck_id": 999}).status_code == 404
+    assert client.post(f"/users/{user_id}/sessions", json={"mode": "cram"}).status_code == 422
+    assert client.get("/sessions/unknown/next").status_code == 404
+    
+    session_id = client.post(
+        f"/users/{user_id}/sessions",
+        json={"deck_id": deck_id, "size": 1}
+    ).json()["session_id"]
+    
+    response = client.post(f"/sessions/{session_id}/reviews", json={"card_id": card_ids[1], "confidence": 0.5})
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Card not in session"
+    response = client.post(f"/sessions/{session_id}/reviews", json={"card_id": card_ids[0], "confidence": 1.5})
+    assert response.status_code == 400
+    
+    assert client.get(f"/sessions/{session_id}/next").status_code == 200
+    assert client.get(f"/sessions/{session_id}/next").status_code == 204
+    
+    summary = client.delete(f"/sessions/{session_id}").json()
+    assert summary["reviews"] == 0
+    assert client.delete(f"/sessions/{session_id}").status_code == 404
+
+
+def test_study_session_cap(client, monkeypatch):
+    """Test that sessions beyond the cap are refused with Retry-After"""
+    user_id, deck_id, _ = _setup_cards(client, 1)
+    monkeypatch.setattr(study_sessions, "max_active", 1)
+    
+    first = client.post(f"/users/{user_id}/sessions", json={"deck_id": deck_id})
+    assert first.status_code == 201
+    
+    response = client.post(f"/users/{user_id}/sessions", json={"deck_id": deck_id})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
+    
+    # Ending a session frees its place
+    client.delete(f"/sessions/{first.json()['session_id']}")
+    assert client.post(f"/users/{user_id}/sessions", json={"deck_id": deck_id}).status_code == 201
+
+
+# Expired sessions are written through sync sessions, so this runs against the sync app
+@pytest.mark.parametrize("client", ["sync"], indirect=True)
+def test_idle_study_session_is_written_on_expiry(client, monkeypatch):
+    """Test that a session idle past the TTL is written and no longer served"""
+    user_id, deck_id, card_ids = _setup_cards(client, 1)
+    session_id = client.post(f"/users/{user_id}/sessions", json={"deck_id": deck_id}).json()["session_id"]
+    client.get(f"/sessions/{session_id}/next")
+    client.post(f"/sessions/{session_id}/reviews", json={"card_id": card_ids[0], "confidence": 0.8})
+    
+    monkeypatch.setattr(study_sessions, "ttl", 0.0)
+    assert client.get(f"/sessions/{session_id}/next").status_code == 404
+    assert study_sessions.expire() == 1
+    
+    with study_sessions.session_factory() as db:
+        progress = db.query(UserCardProgress).filter(UserCardProgress.card_id == card_ids[0]).one()
+        assert progress.confidence_score == pytest.approx(0.8)
+    assert study_sessions.stats()["active"] == 0
+
+
+# Expired sessions are written through sync sessions, so this runs against the sync app
+@pytest.mark.parametrize("client", ["sync"], indirect=True)
+def test_study_session_write_failure_keeps_its_reviews(client, monkeypatch):
+    """Test that a session whose write fails is written again by the next sweep"""
+    user_id, deck_id, card_ids = _setup_cards(client, 1)
+    session_id = client.post(f"/users/{user_id}/sessions", json={"deck_id": deck_id}).json()["session_id"]
+    client.post(f"/sessions/{session_id}/reviews", json={"card_id": card_ids[0], "confidence": 0.8})
+    
+    write = study_sessions_module.write_session_reviews
+    failures = []
+    def fail_once(db, session):
+        if not failures:
+            failures.append(session.session_id)
+            raise OperationalError("UPDATE", {}, Exception("database is locked"))
+        return write(db, session)
+    monkeypatch.setattr(study_sessions_module, "write_session_reviews", fail_once)
+    expired = study_sessions.stats()["expired"]
+    monkeypatch.setattr(study_sessions, "ttl", 0.0)
+    assert study_sessions.expire() == 1
+    assert failures == [session_id]
+    assert study_sessions.stats()["active"] == 1
+    assert client.get(f"/sessions/{session_id}/next").status_code == 404
+    
+    monkeypatch.setattr(study_sessions, "ttl", 3600.0)
+    assert study_sessions.expire() == 1
+    with study_sessions.session_factory() as db:
+        progress = db.query(UserCardProgress).filter(UserCardProgress.card_id == card_ids[0]).one()
+        assert progress.confidence_score == pytest.approx(0.8)
+    assert study_sessions.stats()["active"] == 0
+    # A retried session is counted as expired once
+    assert study_sessions.stats()["expired"] == expired + 1
+
+
+# Expired sessions are written through sync sessions, so this runs against the sync app
+@pytest.mark.parametrize("client", ["sync"], indirect=True)
+def test_idle_study_session_is_written_by_the_sweeper(client, monkeypatch):
+    """Test that an idle session is written without any other session being opened or ended"""
+    user_id, deck_id, card_ids = _setup_cards(client, 1)
+    monkeypatch.setattr(study_sessions, "sweep_interval", 0.01)
+    session_id = client.post(f"/users/{user_id}/sessions", json={"deck_id": deck_id}).json()["session_id"]
+    client.post(f"/sessions/{session_id}/reviews", json={"card_id": card_ids[0], "confidence": 0.8})
+    
+    monkeypatch.setattr(study_sessions, "ttl", 0.0)
+    deadline = time.monotonic() + 5
+    while study_sessions.stats()["active"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    
+    assert study_sessions.stats()["active"] == 0
+    # Waits for the sweep that took the session to finish writing it
+    study_sessions.close()
+    with study_sessions.session_factory() as db:
+        progress = db.query(UserCardProgress).filter(UserCardProgress.card_id == card_ids[0]).one()
+        assert progress.confidence_score == pytest.approx(0.8)
+
+
+def test_study_session_does_not_override_newer_reviews(client):
+    """Test that session reviews older than a direct review are kept as history only"""
+    user_id, deck_id, card_ids = _setup_cards(client, 2)
+    session_id = client.post(f"/users/{user_id}/sessions", json={"deck_id": deck_id}).json()["session_id"]
+    client.post(f"/sessions/{session_id}/reviews", json={"card_id": card_ids[0], "confidence": 0.1})
+    client.post(f"/sessions/{session_id}/reviews", json={"card_id": card_ids[1], "confidence": 0.1})
+    
+    # Reviewed directly while the session is still open
+    client.post("/reviews", json={"user_id": user_id, "card_id": card_ids[0], "confidence": 0.9})
+    
+    summary = client.delete(f"/sessions/{session_id}").json()
+    assert (summary["reviews"], summary["written"], summary["rejected"]) == (2, 1, 1)
+    recap = client.get(f"/users/{user_id}/cards?mode=recap&deck_id={deck_id}").json()
+    assert [item["card"]["id"] for item in recap] == [card_ids[0]]
+    assert recap[0]["progress"]["review_count"] == 1
+    assert recap[0]["progress"]["confidence_score"] == pytest.approx(0.9)
+
+
+# Deletes the card through the sync test database, so this runs against the sync app
+@pytest.mark.parametrize("client", ["sync"], indirect=True)
+def test_study_session_skips_deleted_cards(client):
+    """Test that a card removed after the session was opened is skipped, not a 500"""
+    user_id, deck_id, card_ids = _setup_cards(client, 3)
+    session_id = client.post(f"/users/{user_id}/sessions", json={"deck_id": deck_id}).json()["session_id"]
+    
+    # As dedupe does when it merges a duplicate away
+    with study_sessions.session_factory() as db:
+        db.query(Card).filter(Card.id.in_([card_ids[0], card_ids[2]])).delete()
+        db.commit()
+    
+    card = client.get(f"/sessions/{session_id}/next").json()
+    assert (card["card"]["id"], card["remaining"]) == (card_ids[1], 1)
+    assert client.get(f"/sessions/{session_id}/next").status_code == 204
+    client.delete(f"/sessions/{session_id}")
+
+
+def test_study_session_queue_compacts():
+    """Test that popping a long queue keeps the array bounded by the unread part"""
+    session = StudySession("id", 1, None, "learn", list(range(1, 1001)), [float("nan")] * 1000)
+    for card_id in range(1, 1001):
+        assert session.next_card()[0] == card_id
+        assert len(session.queue) <= 2 * session.remaining + StudySession.COMPACT_AFTER
+    assert session.next_card() is None
+
+
+def test_study_session_on_large_scope_is_picked_in_sql(client, monkeypatch):
+    """Test that a scope above the snapshot cap queues only the session's cards, uncached"""
+    user_id, deck_id, card_ids = _setup_cards(client, 4)
+    client.post("/reviews", json={"user_id": user_id, "card_id": card_ids[0], "confidence": 0.9})
+    monkeypatch.setattr(sessions_router, "PROGRESS_CACHE_MAX_SNAPSHOT_CARDS", 2)
+    
+    session = client.post(f"/users/{user_id}/sessions", json={"mode": "learn", "size": 2}).json()
+    assert session["card_count"] == 2
+    popped = [
+        client.get(f"/sessions/{session['session_id']}/next").json()["card"]["id"]
+        for _ in range(2)
+    ]
+    assert popped == card_ids[1:3]
+    assert client.get("/cache/stats").json()["entries"] == 0
+    
+    session = client.post(f"/users/{user_id}/sessions", json={"mode": "recap", "deck_id": deck_id}).json()
+    card = client.get(f"/sessions/{session['session_id']}/next").json()
+    assert (card["card"]["id"], card["confidence"]) == (card_ids[0], pytest.approx(0.9))
@@ -0,0 +1,118 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models import Card, Deck, User, UserDeckStats
+from app.schemas import ReviewCreate
+from app.services.deck_stats import BUCKET_EDGES, confidence_bucket, rebuild_deck_stats
+from app.services.reviews import apply_review_batch, upsert_review
+
+
+def test_user_stats_follow_reviews(client):
+    """Test that deck stats move cards between buckets as reviews come in"""
+    # Setup
+    user_response = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    )
+    user_id = user_response.json()["id"]
+    
+    deck_response = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    )
+    deck_id = deck_response.json()["id"]
+    
+    card_ids = [
+        client.post(
+            f"/decks/{deck_id}/cards",
+            json={"question": f"Question {i}", "answer": f"Answer {i}"}
+        ).json()["id"]
+        for i in range(3)
+    ]
+    
+    # Nothing reviewed yet: every card is unseen
+    stats = client.get(f"/users/{user_id}/stats").json()
+    assert len(stats) == 1
+    assert stats[0]["deck_id"] == deck_id
+    assert (stats[0]["total_cards"], stats[0]["unseen"], stats[0]["learning"], stats[0]["recap"]) == (3, 3, 0, 0)
+    
+    client.post("/reviews", json={"user_id": user_id, "card_id": card_ids[0], "confidence": 0.9})
+    client.post("/reviews/batch", json=[
+        {"user_id": user_id, "card_id": card_ids[1], "confidence": 0.2},
+    ])
+    stats = client.get(f"/users/{user_id}/stats?deck_id={deck_id}").json()[0]
+    assert (stats["unseen"], stats["learning"], stats["recap"]) == (1, 1, 1)
+    histogram = {bucket["lower"]: bucket["count"] for bucket in stats["histogram"]}
+    assert histogram[0.9] == 1
+    assert histogram[0.2] == 1
+    assert sum(histogram.values()) == 2
+    
+    # 0.7 * 0.9 + 0.3 * 0.0 = 0.63 drops the card back into learning
+    client.post("/reviews", json={"user_id": user_id, "card_id": card_ids[0], "confidence": 0.0})
+    stats = client.get(f"/users/{user_id}/stats").json()[0]
+    assert (stats["unseen"], stats["learning"], stats["recap"]) == (1, 2, 0)
+    assert sum(bucket["count"] for bucket in stats["histogram"]) == 2
+    
+    # Cards agree with get_user_cards
+    learn = client.get(f"/users/{user_id}/cards?mode=learn&deck_id={deck_id}").json()
+    assert len(learn) == stats["unseen"] + stats["learning"]
+
+
+def test_user_stats_not_found(client):
+    """Test that stats 404 for unknown users and decks"""
+    assert client.get("/users/999/stats").status_code == 404
+    
+    user_id = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    ).json()["id"]
+    assert client.get(f"/users/{user_id}/stats").json() == []
+    assert client.get(f"/users/{user_id}/stats?deck_id=999").status_code == 404
+
+
+def test_confidence_buckets_align_with_modes():
+    """Test that the learn/recap thresholds fall on bucket edges"""
+    assert 0.7 in BUCKET_EDGES
+    assert confidence_bucket(0.0) == 0
+    assert confidence_bucket(0.6999) == 6
+    assert confidence_bucket(0.7) == 7
+    assert confidence_bucket(1.0) == len(BUCKET_EDGES)
+
+
+def test_rebuild_matches_incremental_stats(tmp_path):
+    """Test that one GROUP BY rebuild reproduces the incrementally kept counts"""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'stats.db'}")
+    Base.metadata.create_all(bind=engine)
+    SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    
+    with SessionFactory() as db:
+        db.add_all([User(username=f"user{i}", email=f"user{i}@example.com") for i in range(2)])
+        db.flush()
+        db.add_all([Deck(title=f"Deck {i}", owner_id=1) for i in range(2)])
+        db.flush()
+        db.add_all([
+            Card(deck_id=i % 2 + 1, question=f"Question {i}", answer=f"Answer {i}")
+            for i in range(10)
+        ])
+        db.commit()
+        
+        now = datetime.now(timezone.utc)
+        for i in range(30):
+            upsert_review(db, i % 2 + 1, i % 10 + 1, (i * 37 % 11) / 10, now)
+        apply_review_batch(db, [
+            ReviewCreate(user_id=1, card_id=card_id, confidence=1.0) for card_id in range(1, 11)
+        ])
+        db.commit()
+        
+        query = select(
+            UserDeckStats.user_id, UserDeckStats.deck_id, UserDeckStats.bucket, UserDeckStats.card_count
+        ).where(UserDeckStats.card_count != 0)
+        incremental = set(db.execute(query).all())
+        
+        rebuild_deck_stats(db)
+        db.commit()
+        assert set(db.execute(query).all()) == incremental
+    engine.dispose()
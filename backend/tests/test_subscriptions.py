@@ -0,0 +1,111 @@
+from app.routers import users as users_router
+
+
+def _setup_shared_deck(client):
+    owner_id = client.post(
+        "/users/",
+        json={"username": "author", "email": "author@example.com"}
+    ).json()["id"]
+    learner_id = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    ).json()["id"]
+    
+    deck_id = client.post(
+        "/decks/",
+        json={"title": "Shared Deck", "owner_id": owner_id}
+    ).json()["id"]
+    card_ids = [
+        client.post(
+            f"/decks/{deck_id}/cards",
+            json={"question": f"Question {i}", "answer": f"Answer {i}"}
+        ).json()["id"]
+        for i in range(2)
+    ]
+    return owner_id, learner_id, deck_id, card_ids
+
+
+def test_subscription_shares_cards_by_reference(client, monkeypatch):
+    """Test that a subscribed deck's cards show up for the subscriber until they unsubscribe"""
+    monkeypatch.setattr(users_router, "SYNC_OVERLAP_SECONDS", 0)
+    owner_id, learner_id, deck_id, card_ids = _setup_shared_deck(client)
+    assert client.get(f"/users/{learner_id}/cards?mode=learn").json() == []
+    
+    response = client.post(f"/users/{learner_id}/subscriptions", json={"deck_id": deck_id})
+    assert response.status_code == 201
+    assert response.json()["deck_id"] == deck_id
+    # Subscribing again is a no-op
+    assert client.post(f"/users/{learner_id}/subscriptions", json={"deck_id": deck_id}).status_code == 200
+    assert client.post(f"/users/{owner_id}/subscriptions", json={"deck_id": deck_id}).status_code == 400
+    assert client.post(f"/users/{learner_id}/subscriptions", json={"deck_id": 999}).status_code == 404
+    assert client.post("/users/999/subscriptions", json={"deck_id": deck_id}).status_code == 404
+    
+    learn = client.get(f"/users/{learner_id}/cards?mode=learn").json()
+    assert [item["card"]["id"] for item in learn] == card_ids
+    queue = client.get(f"/users/{learner_id}/queue?n=5").json()
+    assert [item["card"]["id"] for item in queue] == card_ids
+    assert [deck["id"] for deck in client.get(f"/decks/?user_id={learner_id}").json()] == [deck_id]
+    assert [deck["id"] for deck in client.get(f"/decks/?user_id={owner_id}").json()] == [deck_id]
+    assert [sub["deck_id"] for sub in client.get(f"/users/{learner_id}/subscriptions").json()] == [deck_id]
+    
+    # Progress stays per user; the cards are not copied
+    client.post("/reviews", json={"user_id": learner_id, "card_id": card_ids[0], "confidence": 0.9})
+    assert len(client.get(f"/decks/{deck_id}/cards").json()) == 2
+    owner_learn = client.get(f"/users/{owner_id}/cards?mode=learn").json()
+    assert [item["card"]["id"] for item in owner_learn] == card_ids
+    
+    token = client.get(f"/users/{learner_id}/sync").json()["token"]
+    assert client.delete(f"/users/{learner_id}/subscriptions/{deck_id}").status_code == 204
+    deleted = client.get(f"/users/{learner_id}/sync", params={"since": token}).json()["deleted"]
+    assert [(row["kind"], row["id"]) for row in deleted] == [("subscription", deck_id)]
+    assert client.get(f"/users/{learner_id}/cards?mode=learn").json() == []
+    assert client.get(f"/users/{learner_id}/queue").json() == []
+    assert client.get(f"/decks/?user_id={learner_id}").json() == []
+    assert client.delete(f"/users/{learner_id}/subscriptions/{deck_id}").status_code == 404
+
+
+def test_card_override_is_personal(client, monkeypatch):
+    """Test that an override changes the card for its user only, and can be dropped"""
+    monkeypatch.setattr(users_router, "SYNC_OVERLAP_SECONDS", 0)
+    owner_id, learner_id, deck_id, card_ids = _setup_shared_deck(client)
+    override_url = f"/users/{learner_id}/cards/{card_ids[0]}/override"
+    
+    # Only cards of owned or subscribed decks can be overridden
+    response = client.put(override_url, json={"question": "My question"})
+    assert response.status_code == 403
+    client.post(f"/users/{learner_id}/subscriptions", json={"deck_id": deck_id})
+    assert client.put(override_url, json={}).status_code == 400
+    assert client.put(f"/users/{learner_id}/cards/999/override", json={"answer": "x"}).status_code == 404
+    # The owner can override their own deck's cards without subscribing
+    owner_override_url = f"/users/{owner_id}/cards/{card_ids[1]}/override"
+    assert client.put(owner_override_url, json={"answer": "Mine"}).status_code == 200
+    assert client.delete(owner_override_url).status_code == 204
+    
+    response = client.put(override_url, json={"question": "My question"})
+    assert response.status_code == 200
+    assert (response.json()["question"], response.json()["answer"]) == ("My question", None)
+    
+    card = client.get(f"/users/{learner_id}/cards?mode=learn").json()[0]["card"]
+    assert (card["question"], card["answer"]) == ("My question", "Answer 0")
+    assert client.get(f"/users/{learner_id}/queue").json()[0]["card"]["question"] == "My question"
+    session_id = client.post(
+        f"/users/{learner_id}/sessions",
+        json={"deck_id": deck_id}
+    ).json()["session_id"]
+    assert client.get(f"/sessions/{session_id}/next").json()["card"]["question"] == "My question"
+    client.delete(f"/sessions/{session_id}")
+    
+    # The shared card is unchanged for everyone else
+    assert client.get(f"/users/{owner_id}/cards?mode=learn").json()[0]["card"]["question"] == "Question 0"
+    assert client.get(f"/decks/{deck_id}/cards").json()[0]["question"] == "Question 0"
+    
+    sync = client.get(f"/users/{learner_id}/sync").json()
+    assert [override["card_id"] for override in sync["overrides"]] == [card_ids[0]]
+    
+    token = sync["token"]
+    assert client.delete(override_url).status_code == 204
+    deleted = client.get(f"/users/{learner_id}/sync", params={"since": token}).json()["deleted"]
+    assert [(row["kind"], row["id"]) for row in deleted] == [("override", card_ids[0])]
+    assert client.get(f"/users/{owner_id}/sync", params={"since": token}).json()["deleted"] == []
+    assert client.get(f"/users/{learner_id}/cards?mode=learn").json()[0]["card"]["question"] == "Question 0"
+    assert client.delete(override_url).status_code == 404
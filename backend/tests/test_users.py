@@ -1,3 +1,5 @@
+from app.routers import users as users_router
+
 def test_create_user(client):
     """Test creating a new user"""
     response = client.post(
@@ -46,4 +48,106 @@ def test_get_nonexistent_user(client):
     """Test that getting a nonexistent user returns 404"""
     response = client.get("/users/999")
     assert response.status_code == 404
-    
\ No newline at end of file
+
+def test_sync_returns_changes_since_token(client, monkeypatch):
+    """Test that each sync returns only rows written since the previous token"""
+    monkeypatch.setattr(users_router, "SYNC_OVERLAP_SECONDS", 0)
+    
+    # Setup
+    user_id = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    ).json()["id"]
+    deck_id = client.post(
+        "/decks/",
+        json={"title": "Test Deck", "owner_id": user_id}
+    ).json()["id"]
+    card_ids = [
+        client.post(
+            f"/decks/{deck_id}/cards",
+            json={"question": f"Question {i}", "answer": f"Answer {i}"}
+        ).json()["id"]
+        for i in range(2)
+    ]
+    
+    # No token: everything
+    data = client.get(f"/users/{user_id}/sync").json()
+    assert [deck["id"] for deck in data["decks"]] == [deck_id]
+    assert [card["id"] for card in data["cards"]] == card_ids
+    assert data["progress"] == []
+    token = data["token"]
+    
+    data = client.get(f"/users/{user_id}/sync", params={"since": token}).json()
+    assert (data["decks"], data["cards"], data["progress"]) == ([], [], [])
+    
+    new_card_id = client.post(
+        f"/decks/{deck_id}/cards",
+        json={"question": "Question 2", "answer": "Answer 2"}
+    ).json()["id"]
+    client.post("/reviews", json={"user_id": user_id, "card_id": card_ids[0], "confidence": 0.5})
+    data = client.get(f"/users/{user_id}/sync", params={"since": token}).json()
+    assert data["decks"] == []
+    assert [card["id"] for card in data["cards"]] == [new_card_id]
+    assert [row["card_id"] for row in data["progress"]] == [card_ids[0]]
+    
+    # A second review goes through the upsert's conflict branch
+    token = data["token"]
+    client.post("/reviews", json={"user_id": user_id, "card_id": card_ids[0], "confidence": 1.0})
+    data = client.get(f"/users/{user_id}/sync", params={"since": token}).json()
+    assert data["cards"] == []
+    assert [row["review_count"] for row in data["progress"]] == [2]
+
+def test_sync_rejects_bad_token(client):
+    """Test that sync checks the user and the token"""
+    assert client.get("/users/999/sync").status_code == 404
+    
+    user_id = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    ).json()["id"]
+    assert client.get(f"/users/{user_id}/sync?since=not-a-token").status_code == 400
+
+def test_sync_covers_only_the_users_decks(client, monkeypatch):
+    """Test that sync skips other users' decks until the user subscribes, then sends them whole"""
+    monkeypatch.setattr(users_router, "SYNC_OVERLAP_SECONDS", 0)
+    
+    # Setup
+    user_id = client.post(
+        "/users/",
+        json={"username": "learner", "email": "learner@example.com"}
+    ).json()["id"]
+    other_id = client.post(
+        "/users/",
+        json={"username": "author", "email": "author@example.com"}
+    ).json()["id"]
+    deck_id = client.post(
+        "/decks/",
+        json={"title": "My Deck", "owner_id": user_id}
+    ).json()["id"]
+    other_deck_id = client.post(
+        "/decks/",
+        json={"title": "Other Deck", "owner_id": other_id}
+    ).json()["id"]
+    card_id = client.post(
+        f"/decks/{deck_id}/cards",
+        json={"question": "Mine", "answer": "A"}
+    ).json()["id"]
+    other_card_id = client.post(
+        f"/decks/{other_deck_id}/cards",
+        json={"question": "Theirs", "answer": "A"}
+    ).json()["id"]
+    
+    data = client.get(f"/users/{user_id}/sync").json()
+    assert [deck["id"] for deck in data["decks"]] == [deck_id]
+    assert [card["id"] for card in data["cards"]] == [card_id]
+    token = data["token"]
+    
+    client.post(f"/decks/{other_deck_id}/cards", json={"question": "Theirs 2", "answer": "A"})
+    data = client.get(f"/users/{user_id}/sync", params={"since": token}).json()
+    assert (data["decks"], data["cards"]) == ([], [])
+    
+    # The subscribed deck's older rows come with the next delta
+    client.post(f"/users/{user_id}/subscriptions", json={"deck_id": other_deck_id})
+    data = client.get(f"/users/{user_id}/sync", params={"since": token}).json()
+    assert [deck["id"] for deck in data["decks"]] == [other_deck_id]
+    assert [card["id"] for card in data["cards"]] == [other_card_id, other_card_id + 1]